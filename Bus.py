@@ -1,5 +1,3 @@
-from SingletonBase import *
-
 import numpy as np
 from Registers import Byte
 from Registers import Word
@@ -11,14 +9,9 @@ class MemoryAccessError(Exception):
         super().__init__(self.message)
 
 
-class Bus(SingletonBase):
-    
-    _initialized = False
+class Bus:
 
     def __init__(self):
-        if hasattr(self, '_initialized') and self._initialized:
-            return
-        
         self.wram = np.zeros(0x2000, dtype=Byte)
         self.hram = np.zeros(0x80, dtype=Byte)
         self.ext_ram = np.zeros(0x2000, dtype=Byte)
@@ -26,12 +19,15 @@ class Bus(SingletonBase):
         self.ie_reg = Byte(0)
 
         self.rom_data = np.zeros(0x8000, dtype=Byte)
+        # ROM bank mapped at 0x4000-0x7FFF. Fixed at 1 until a memory bank controller is implemented.
+        self.romBank = 1
 
         ### Instances of other components
         self.cpu = None
         self.ppu = None
-
-        self._initialized = True
+        self.interrupts = None
+        self.joypad = None
+        self.serial = None
         
     def reset(self):
         self.wram.fill(0)
@@ -39,6 +35,12 @@ class Bus(SingletonBase):
         self.ext_ram.fill(0)
         self.io_regs.fill(0)
         self.ie_reg = Byte(0)
+        if self.interrupts is not None:
+            self.interrupts.reset()
+        if self.joypad is not None:
+            self.joypad.reset()
+        if self.serial is not None:
+            self.serial.reset()
         
         # Note: We don't clear ROM or VRAM/OAM here as VRAM/OAM belongs to PPU
         # and ROM should persist. PPU reset should be handled if needed.
@@ -47,6 +49,59 @@ class Bus(SingletonBase):
     def loadROM(self, rom_bytes: bytes):
         self.rom_data = np.frombuffer(rom_bytes, dtype=Byte)
 
+    # Returns (backing array, offset of addr within it, bytes remaining in the region, writable)
+    # for memory that can be accessed directly without side effects (ROM, VRAM, External RAM,
+    # WRAM, Echo RAM and HRAM). Returns None for OAM, IO registers and unusable areas.
+    def getMemoryRegion(self, addr: Word):
+        addr = int(addr)
+        if addr <= 0x7FFF:
+            return self.rom_data, addr, min(len(self.rom_data), 0x8000) - addr, False
+        elif addr <= 0x9FFF:
+            if self.ppu is None:
+                return None
+            return self.ppu.vram, addr - 0x8000, 0xA000 - addr, True
+        elif addr <= 0xBFFF:
+            return self.ext_ram, addr - 0xA000, 0xC000 - addr, True
+        elif addr <= 0xDFFF:
+            return self.wram, addr - 0xC000, 0xE000 - addr, True
+        elif addr <= 0xFDFF:
+            return self.wram, addr - 0xE000, 0xFE00 - addr, True
+        elif 0xFF80 <= addr <= 0xFFFE:
+            return self.hram, addr - 0xFF80, 0xFFFF - addr, True
+        return None
+
+    def readRange(self, start: Word, length: int):
+        """
+        Reads length bytes starting at start (wrapping at 0xFFFF) without side effects on
+        plain memory, and without being counted as emulated accesses. When the range lies
+        inside one memory region a read-only view of the backing array is returned,
+        otherwise the bytes are gathered into a new array.
+        """
+        start = int(start)
+        region = self.getMemoryRegion(start)
+        if region is not None and region[2] >= length:
+            mem, offset, _, _ = region
+            view = mem[offset:offset + length]
+            view.flags.writeable = False
+            return view
+
+        out = np.empty(length, dtype=Byte)
+        pos = 0
+        while pos < length:
+            addr = (start + pos) & 0xFFFF
+            region = self.getMemoryRegion(addr)
+            if region is None or region[2] <= 0:
+                # IO registers, OAM and unusable areas go through the normal read path. The
+                # class method, so these reads bypass instance level instrumentation (Coverage)
+                out[pos] = type(self).readByte(self, addr)
+                pos += 1
+                continue
+            mem, offset, available, _ = region
+            count = min(available, length - pos, 0x10000 - addr)
+            out[pos:pos + count] = mem[offset:offset + count]
+            pos += count
+        return out
+
     # Bus Read/Write Methods
 
     def readByte(self, addr: Word) -> Byte:
@@ -80,11 +135,19 @@ class Bus(SingletonBase):
             return self.ppu.readRegister(addr)
         elif 0xFF00 <= addr <= 0xFF7F:
             # Other IO Registers
+            if addr == 0xFF00 and self.joypad is not None:
+                return Byte(self.joypad.read())
+            if (addr == 0xFF01 or addr == 0xFF02) and self.serial is not None:
+                return Byte(self.serial.read(addr))
+            if addr == 0xFF0F and self.interrupts is not None:
+                return Byte(self.interrupts.IF)
             return self.io_regs[addr - 0xFF00]
         elif 0xFF80 <= addr <= 0xFFFE:
             # HRAM Area
             return self.hram[addr - 0xFF80]
         elif addr == 0xFFFF:
+            if self.interrupts is not None:
+                return Byte(self.interrupts.IE)
             return self.ie_reg
         else:
             # Other areas (I/O, OAM, etc.)
@@ -129,16 +192,20 @@ class Bus(SingletonBase):
         elif 0xFF00 <= addr <= 0xFF7F:
             # Other IO Registers
             self.io_regs[addr - 0xFF00] = value
-            
-            # Serial Port Implementation
-            if addr == 0xFF02 and value == 0x81:
-                char = chr(self.io_regs[0xFF01 - 0xFF00])
-                print(char, end="", flush=True)
+
+            if addr == 0xFF00 and self.joypad is not None:
+                self.joypad.write(value)
+            if (addr == 0xFF01 or addr == 0xFF02) and self.serial is not None:
+                self.serial.write(addr, value)
+            if addr == 0xFF0F and self.interrupts is not None:
+                self.interrupts.IF = value
         elif 0xFF80 <= addr <= 0xFFFE:
             # HRAM Area
             self.hram[addr - 0xFF80] = value
         elif addr == 0xFFFF:
             self.ie_reg = value
+            if self.interrupts is not None:
+                self.interrupts.IE = value
         else:
             # Other areas (I/O, OAM, etc.)
             raise MemoryAccessError(addr, f"Write to unhandled address: {hex(addr)} with value {hex(value)}")        
@@ -154,4 +221,65 @@ class Bus(SingletonBase):
         high = self.readByte(addr + 1)
         return (high.astype(Word) << 8) | low
 
-    
+
+class FlatBus(Bus):
+    """
+    64 KiB of plain RAM and nothing else: no ROM protection, IO registers, PPU, echo RAM
+    or interrupt routing. Every byte written through writeByte is also logged in order as
+    (address, value) in self.writes. For exercising the CPU on its own, e.g. by fuzzing or
+    single step test suites, where any address has to be readable and writable.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.memory = np.zeros(0x10000, dtype=Byte)
+        self.writes = []
+
+    def reset(self):
+        self.memory.fill(0)
+        self.writes.clear()
+        if self.interrupts is not None:
+            self.interrupts.reset()
+
+    def loadROM(self, rom_bytes: bytes):
+        rom = np.frombuffer(rom_bytes, dtype=Byte)[:0x10000]
+        self.memory[:len(rom)] = rom
+
+    def getMemoryRegion(self, addr: Word):
+        addr = int(addr)
+        return self.memory, addr, 0x10000 - addr, True
+
+    def readByte(self, addr: Word) -> Byte:
+        return self.memory[int(addr) & 0xFFFF]
+
+    def writeByte(self, addr: Word, value: Byte):
+        addr = int(addr) & 0xFFFF
+        value = int(value) & 0xFF
+        self.memory[addr] = value
+        self.writes.append((addr, value))
+
+
+class RegionBus(FlatBus):
+    """
+    A FlatBus that reports the Game Boy memory layout from getMemoryRegion: ROM is read
+    only, VRAM, external RAM, WRAM, echo RAM and HRAM are separate regions, and OAM, IO
+    and IE have none. Reads and writes stay plain, so stepping still behaves like on a
+    FlatBus while bulk paths hit the same region boundaries and fallbacks as on Bus.
+    """
+
+    # (first address, end address, writable) of every region backed by plain memory
+    REGIONS = (
+        (0x0000, 0x8000, False),
+        (0x8000, 0xA000, True),
+        (0xA000, 0xC000, True),
+        (0xC000, 0xE000, True),
+        (0xE000, 0xFE00, True),
+        (0xFF80, 0xFFFF, True),
+    )
+
+    def getMemoryRegion(self, addr: Word):
+        addr = int(addr)
+        for start, end, writable in self.REGIONS:
+            if start <= addr < end:
+                return self.memory, addr, end - addr, writable
+        return None
@@ -1,5 +1,3 @@
-from SingletonBase import *
-
 from Registers import Byte
 from Registers import Word
 from Registers import RegByte
@@ -10,29 +8,49 @@ import numpy as np
 
 
 from Bus import Bus
+from Idioms import IdiomRecognizer
+from PPU import CYCLES_PER_FRAME
+import types
 
 # from Memory import Memory
 
-class CPU(SingletonBase):
-
-    _initialized = False # Flag to ensure __init__ runs only once
-
-    def __init__(self):
-        # Initialization Guard
-        if hasattr(self, '_initialized') and self._initialized:
-            print(f"... Skipping CPU __init__ due to existing initialization {id(self)}")
-            return
-
-        print(f"Iniitalizing CPU instance {id(self)}")
-
-        # self.Memory = Memory()
-        self.Bus = Bus()
+# Interrupt bits and handler addresses in priority order: VBLANK, LCD STAT, TIMER, SERIAL, JOYPAD
+INTERRUPT_VECTORS = (
+    (0x01, 0x40),
+    (0x02, 0x48),
+    (0x04, 0x50),
+    (0x08, 0x58),
+    (0x10, 0x60),
+)
+
+# Precomputed for every 5 bit IE & IF combination: (bit, handler address) of the interrupt to service
+INTERRUPT_DISPATCH = tuple(
+    next(((bit, vector) for bit, vector in INTERRUPT_VECTORS if mask & bit), None)
+    for mask in range(0x20)
+)
+
+# Cycles taken to dispatch an interrupt (2 wait states, push PC, jump)
+INTERRUPT_CYCLES = 20
+
+class Breakpoint(Exception):
+    """Raised by an opcode trap to end run_cycles/run_frame before the trapped instruction."""
+    def __init__(self, opCode, pc):
+        self.opCode = opCode
+        self.pc = pc
+        super().__init__(f"Breakpoint on opcode {opCode:02X} at {pc:04X}")
+
+class CPU:
+
+    def __init__(self, bus = None):
+        # The CPU talks to the rest of the machine through the bus it is given
+        self.Bus = bus if bus is not None else Bus()
+        self.Bus.cpu = self
         self.CoreReg = RegByte()
         self.Flags = Flag()
         self.CoreWords = RegWord(self.CoreReg,self.Flags)
         self.InterruptMask = InterruptMask(self.Bus)
+        self.Bus.interrupts = self.InterruptMask
 
-        self._initialized = True
         self.scheduleIMEEnabled = False 
         self.Halted = False
         self.Stopped = False
@@ -40,7 +58,25 @@ class CPU(SingletonBase):
 
         self.init_opCodes()
 
+        # Bulk execution of memcpy/memset style loops
+        self.Idioms = IdiomRecognizer(self, self.Bus)
+
         self.cycles = 0
+        # Instructions dispatched (a bulk executed loop counts once), sampled by the performance HUD
+        self.instructions = 0
+        # Set by the opcode profiler while profiling is enabled
+        self.profiler = None
+        # Set by the call stack profiler while it is enabled
+        self.callStackProfiler = None
+        # Set by Coverage while execution and memory access counting is enabled
+        self.coverage = None
+        # Opcode -> wrapEntry handle, for opcodes replaced by setTrap
+        self._traps = {}
+        # (id(table), key) -> [table, key, whether the key was present, base entry, wraps]
+        # for every entry replaced through wrapEntry
+        self._wrapped = {}
+        # Breakpoint that ended the last run_cycles/run_frame, if any
+        self.breakpoint = None
         
         self.reset()
 
@@ -56,12 +92,33 @@ class CPU(SingletonBase):
 
         # State
         self.cycles = 0
+        self.instructions = 0
         self.Halted = False
         self.Stopped = False
         self.scheduleIMEEnabled = False
         self.InterruptMask.IME = 0
 
+    # EI takes effect after the instruction that follows it. The delay is tracked by InterruptMask
+    # so that a scheduled EI also raises the pending bit checked by the execution loop.
+    @property
+    def scheduleIMEEnabled(self):
+        return self.InterruptMask.imeDelay != 0
+
+    @scheduleIMEEnabled.setter
+    def scheduleIMEEnabled(self, value):
+        self.InterruptMask.imeDelay = 2 if value else 0
+
     def step(self):
+        serial = self.Bus.serial
+        if serial is not None and self.cycles >= serial.due:
+            serial.complete()
+
+        # Service interrupts before fetching. In the common case this is a single boolean check.
+        if self.InterruptMask.pending:
+            interruptCycles = self.interruptHandler()
+            if interruptCycles:
+                return interruptCycles
+
         # Handle Stopped State first
         if self.Stopped:
             # The CPU is in a low-power state and does nothing until a Joypad
@@ -74,7 +131,7 @@ class CPU(SingletonBase):
         # Handle Halted State first
         if self.Halted:
             # Check for pending interrupts to exit HALT
-            if (self.InterruptMask.IE & self.InterruptMask.IF) != 0:
+            if self.InterruptMask.requested != 0:
                 self.Halted = False
             else:
                 # Remain halted, consume 4 cycles
@@ -86,6 +143,14 @@ class CPU(SingletonBase):
 
         opCode = self.Bus.readByte(currentPC)
 
+        # Copy/clear loops are executed in one go when their operands live in plain memory
+        if opCode in self.Idioms.heads:
+            idiomCycles = self.Idioms.tryExecute(currentPC)
+            if idiomCycles is not None:
+                self.cycles += idiomCycles
+                self.instructions += 1
+                return idiomCycles
+
         if opCode in self.lr35902_opCodes:
             opCodeFunc, length, cycles, _ = self.lr35902_opCodes[opCode]
 
@@ -108,63 +173,212 @@ class CPU(SingletonBase):
 
             self.CoreWords.PC = currentPC
             self.cycles += actualCycles
+            self.instructions += 1
 
             #Return number of cycles taken
             return actualCycles
 
-    # Call interrupt handler at the end of each execution of step
-    def interruptHandler(self, interruptByte):
-        # # Check if IME is scheduled to be enabled
-        if self.scheduleIMEEnabled:
-            self.InterruptMask.IME = 1
-            self.scheduleIMEEnabled = False
-
-            return # Do not process interrupt if IME is scheduled to be enabled wait for cycle delay to begin processing interrupts
-        
-        ie_reg = self.InterruptMask._IE
-        if_reg = self.InterruptMask._IF
-
-        # Interrupt priorities and their handler addresses
-        interrupt_priorities = [
-            (self.InterruptMask.VBLANK_POS, 0x40),  # VBLANK
-            (self.InterruptMask.LCD_STAT_POS, 0x48),  # LCD STAT
-            (self.InterruptMask.TIMER_POS, 0x50),  # TIMER
-            (self.InterruptMask.SERIAL_POS, 0x58),  # SERIAL
-            (self.InterruptMask.JOYPAD_POS, 0x60),  # JOYPAD
-        ]
-
-        pendingAndEnable = ie_reg & if_reg
-        if pendingAndEnable == 0:
+    def wrapEntry(self, table, key, wrap, default=None):
+        """
+        Replaces table[key] (an opcode table entry, or a method shadowed in an instance
+        __dict__) with wrap(entry), and returns a handle for unwrapEntry. When the key is
+        missing from the table, `default` is the entry wrapped and the key is deleted again
+        once every wrapper is removed. Wrappers can be removed in any order: the ones
+        installed after a removed wrapper are rebuilt around the entry it wrapped.
+        """
+        chain = self._wrapped.get((id(table), key))
+        if chain is None or table.get(key) is not chain[4][-1][1]:
+            # First wrapper, or the entry was replaced behind our back: start over from it
+            present = key in table
+            chain = [table, key, present, table[key] if present else default, []]
+            self._wrapped[(id(table), key)] = chain
+        entry = wrap(table.get(key, default))
+        chain[4].append([wrap, entry])
+        table[key] = entry
+        return (table, key, wrap)
+
+    def unwrapEntry(self, handle):
+        """Removes a wrapper installed by wrapEntry, keeping any wrappers around it."""
+        table, key, wrap = handle
+        chain = self._wrapped.get((id(table), key))
+        if chain is None:
             return
-        
-        for interruptBit, handlerAddress in interrupt_priorities:
-            if (pendingAndEnable & interruptBit) != 0:
-
-                self.Halted = False  # Exit HALT state if in it
-
-                if self.Stopped and (interruptBit == self.InterruptMask.JOYPAD_POS):
-                    self.Stopped = False  # Exit STOP state on JOYPAD interrupt
+        wraps = chain[4]
+        index = next((i for i, (w, _) in enumerate(wraps) if w is wrap), None)
+        if index is None:
+            return
+        if table.get(key) is not wraps[-1][1]:
+            # Replaced behind our back, leave the new entry alone
+            del self._wrapped[(id(table), key)]
+            return
+        del wraps[index]
+        entry = chain[3] if index == 0 else wraps[index - 1][1]
+        for link in wraps[index:]:
+            entry = link[1] = link[0](entry)
+        if wraps:
+            table[key] = entry
+        else:
+            del self._wrapped[(id(table), key)]
+            if chain[2]:
+                table[key] = entry
+            else:
+                del table[key]
+
+    def setTrap(self, opCode, callback):
+        """
+        Calls callback(cpu) before every execution of opCode (e.g. 0x40, LD B,B, which test ROMs
+        use as a software breakpoint). If the callback returns True the run stops with PC on the
+        instruction and `breakpoint` set; otherwise the instruction executes normally.
+        The opcode table entry itself is swapped, so untrapped opcodes cost nothing extra.
+        """
+        self.clearTrap(opCode)
+
+        def trap(entry):
+            func, length, cycles, flags = entry
+
+            def trapped(operandAddr):
+                if callback(self):
+                    raise Breakpoint(opCode, (operandAddr - 1) & 0xFFFF)
+                return func(operandAddr)
+            return (trapped, length, cycles, flags)
+
+        self._traps[opCode] = self.wrapEntry(self.lr35902_opCodes, opCode, trap)
+
+    def clearTrap(self, opCode):
+        if opCode in self._traps:
+            self.unwrapEntry(self._traps.pop(opCode))
+
+    def run_cycles(self, cycles):
+        """
+        Runs the CPU (and the PPU when attached to the Bus) for at least `cycles` cycles.
+        Returns the number of cycles actually executed, which may overshoot by the length
+        of the last instruction, or fall short if the CPU locked up on an illegal opcode,
+        an opcode trap hit a breakpoint or a serial sink requested a stop.
+        """
+        return self._run(cycles, False)
+
+    def run_frame(self):
+        """
+        Runs until the PPU finishes the current frame (start of VBlank). With the LCD
+        turned off a frame's worth of cycles is executed instead.
+        Returns the number of cycles executed.
+        """
+        return self._run(CYCLES_PER_FRAME, True)
+
+    def _run(self, budget, stopAtFrame):
+        # Everything touched per instruction is hoisted into locals. Work that is rarely
+        # needed (interrupts, HALT/STOP, illegal opcodes) is pushed onto the slow path.
+        bus = self.Bus
+        readByte = bus.readByte
+        opCodes = self.lr35902_opCodes
+        regs = self.CoreWords
+        imask = self.InterruptMask
+        idioms = self.Idioms
+        idiomHeads = idioms.heads
+        tryIdiom = idioms.tryExecute
+        ppu = bus.ppu
+        ppuStep = ppu.step if ppu is not None else None
+        startFrame = ppu.frameCount if ppu is not None else 0
+        serial = bus.serial
+
+        executed = 0
+        dispatched = 0
+        self.breakpoint = None
+        try:
+            while executed < budget:
+                # Serial.due is IDLE (never reached) while no transfer is running
+                if serial is not None and self.cycles >= serial.due:
+                    serial.complete()
+                    if serial.stopRequested:
+                        break
+
+                if imask.pending:
+                    spent = self.interruptHandler()
+                    if spent:
+                        executed += spent
+                        if ppuStep is not None:
+                            ppuStep(spent)
+                        continue
+
+                if self.Halted or self.Stopped:
+                    spent = self.step()
+                else:
+                    pc = regs.PC
+                    opCode = readByte(pc)
+
+                    spent = None
+                    if opCode in idiomHeads:
+                        spent = tryIdiom(pc)
+                        if spent is not None:
+                            self.cycles += spent
+
+                    if spent is None:
+                        entry = opCodes.get(opCode)
+                        if entry is None:
+                            # Illegal opcode, the real CPU locks up here
+                            break
+
+                        func, length, baseCycles, _ = entry
+                        nextPc, cycleOverride = func((pc + 1) & 0xFFFF)
+
+                        spent = baseCycles[0] if cycleOverride is None else cycleOverride
+                        regs.PC = (pc + length) & 0xFFFF if nextPc is None else nextPc
+                        self.cycles += spent
+                    dispatched += 1
+
+                executed += spent
+
+                if ppuStep is not None:
+                    ppuStep(spent)
+                    if stopAtFrame and ppu.frameCount != startFrame:
+                        break
+        except Breakpoint as hit:
+            # Raised before the trapped instruction ran, PC still points at it
+            self.breakpoint = hit
+
+        self.instructions += dispatched
+        return executed
+
+    # Called before an instruction whenever InterruptMask.pending is set: either an EI is
+    # waiting to take effect or IME is set with an enabled interrupt flagged.
+    # Returns the number of cycles spent dispatching (0 if nothing was serviced).
+    def interruptHandler(self):
+        imask = self.InterruptMask
+
+        # EI: the instruction following it still runs with interrupts disabled
+        if imask.imeDelay:
+            imask.imeDelay -= 1
+            if imask.imeDelay:
+                return 0
+            imask.IME = 1
+
+        requested = imask.requested
+        if not (imask.IME and requested):
+            return 0
+
+        interruptBit, handlerAddress = INTERRUPT_DISPATCH[requested]
+
+        self.Halted = False  # Exit HALT state if in it
 
-                if self.Stopped:
-                    return  # Do not process other interrupts if in STOP state
+        if self.Stopped:
+            if interruptBit != imask.JOYPAD_POS:
+                return 0  # Only the joypad can wake the CPU from STOP
+            self.Stopped = False
 
-                # Clear the interrupt flag
-                if_reg &= ~interruptBit
-                self.InterruptMask._IF = if_reg
+        # Acknowledge the interrupt and disable further interrupts until re-enabled
+        imask.IF = imask.IF & ~interruptBit
+        imask.IME = 0
 
-                # Push the current PC onto the stack
-                self.Bus.writeWord(self.CoreWords.SP - 2, self.CoreWords.SP)
-                self.Bus.writeWord(self.CoreWords.SP, self.CoreWords.PC)
+        # Push the return address (current PC) onto the stack
+        self.CoreWords.SP = (self.CoreWords.SP - 2) & 0xFFFF
+        self.Bus.writeWord(self.CoreWords.SP, self.CoreWords.PC)
 
-                # Set the PC to the handler address
-                self.CoreWords.PC = handlerAddress
+        # Set the PC to the handler address
+        self.CoreWords.PC = handlerAddress
 
-                # Set IME to 0 to disable further interrupts until re-enabled
-                self.InterruptMask.IME = 0
+        self.cycles += INTERRUPT_CYCLES
+        return INTERRUPT_CYCLES
 
-                break
-        
- 
     # Maps opcode hex value to a tuple: (handler_method, instruction_length_bytes, base_cycles)
     def init_opCodes(self):
         self.lr35902_opCodes = {
@@ -410,7 +624,7 @@ class CPU(SingletonBase):
             0xF9: (self._ld_sp_hl,      1,[8],        "----"),
             0xF3: (self._di,            1,[4],        "----"),
             0xFB: (self._ei,            1,[4],        "----"),
-            # 0xCB: (self.cb_prefix_table),
+            0xCB: (self._cb_prefix,     2,[ 8],       "----"),
             0x76: (self._halt,          1,[ 4],       "----"),
             0x10: (self._stop_0,        2,[ 4],       "----"),
             # 0xDB: ("N/A"),
@@ -426,6 +640,10 @@ class CPU(SingletonBase):
             # 0xED: ("N/A"),
         }
 
+        # Handler names of the base opcodes, kept before profilers, traces or traps wrap the
+        # table entries. The disassembler formats instructions from these.
+        self.opCodeNames = {opCode: entry[0].__name__ for opCode, entry in self.lr35902_opCodes.items()}
+
         # --- Dynamically generate BIT, RES, SET methods ---
         registers = ['B', 'C', 'D', 'E', 'H', 'L', 'mhl', 'A']
         for bit in range(8):
@@ -768,8 +986,21 @@ class CPU(SingletonBase):
             0xFF: (self._cb_set_7_a,   2, [8],  "----"), # SET 7, A
         }
 
+        # The generated BIT/RES/SET handlers are plain functions taking the CPU explicitly.
+        # Bind them here so every entry of the table can be called as func(operandAddr).
+        for cbOpCode, (func, length, cycles, flags) in self.cb_prefix_table.items():
+            if not hasattr(func, "__self__"):
+                self.cb_prefix_table[cbOpCode] = (types.MethodType(func, self), length, cycles, flags)
+
         # ---  opCode Implementations --- #
 
+    # 0xCB prefix: operandAddr points at the second opcode byte.
+    # The CB table cycle counts already include the prefix fetch.
+    def _cb_prefix(self, operandAddr):
+        func, _, cycles, _ = self.cb_prefix_table[self.Bus.readByte(operandAddr)]
+        func(operandAddr)
+        return None, cycles[0]
+
     def _nop(self, operandAddr):
         # Program Counters won't do anything. Step Function will increment the cycles correctly
         return None, None
@@ -2031,7 +2262,7 @@ class CPU(SingletonBase):
             self.Halted = True
         else:
             # Check for HALT bug
-            if (self.InterruptMask.IE & self.InterruptMask.IF) != 0:
+            if self.InterruptMask.requested != 0:
                 # HALT bug: PC fails to increment.
                 # To emulate, we'll just execute the next instruction by not halting
                 # and letting the PC increment normally in the step function.
@@ -0,0 +1,226 @@
+import os
+
+# Profiles the emulated program rather than the emulator. CALL, RST and interrupt entry
+# push a frame onto a shadow call stack, RET and RETI pop it, and the CPU cycles spent
+# between two such events are charged to the stack that was current. The result is
+# exported in the folded format read by flamegraph.pl, speedscope and inferno:
+#
+#   start;main;DrawSpectrum;FFT 123456
+#
+# Routine names come from an RGBDS/no$gmb style .sym file when one is given.
+
+CALLS = (0xCD, 0xC4, 0xCC, 0xD4, 0xDC)
+RSTS = tuple(0xC7 + 8 * i for i in range(8))
+RETURNS = (0xC9, 0xD9, 0xC0, 0xC8, 0xD0, 0xD8)
+
+INTERRUPT_NAMES = {0x40: "VBlank", 0x48: "STAT", 0x50: "Timer", 0x58: "Serial", 0x60: "Joypad"}
+
+ROOT = "start"
+
+# Deeper stacks mean the program is not using CALL/RET as calls (e.g. recursion gone
+# wrong or SP reloaded); the oldest frames are dropped instead of growing without bound
+MAX_DEPTH = 64
+
+
+def loadSymbols(path):
+    """
+    Reads a .sym file ("BB:AAAA Name" per line, ';' comments) into a dict mapping
+    (bank, address) to name.
+    """
+    symbols = {}
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.split(";", 1)[0].strip()
+            if not line:
+                continue
+            location, _, name = line.partition(" ")
+            bank, _, addr = location.partition(":")
+            try:
+                symbols[(int(bank, 16), int(addr, 16))] = name.strip()
+            except ValueError:
+                continue
+    return symbols
+
+
+class CallStackProfiler:
+    """
+    Shadow call stack of the emulated program. Like OpcodeProfiler it works by swapping
+    the CALL/RST/RET/RETI opcode table entries (and the CPU's interrupt handler) for
+    instrumented versions, so it costs nothing while disabled and only a little on the
+    instructions that change the stack while enabled.
+
+    Frames remember the SP right after their return address was pushed. A return pops
+    every frame at or below the SP it returns from, so code that discards a return
+    address or uses PUSH/RET as a jump does not leave the stack out of step for long.
+    """
+
+    def __init__(self, cpu, symbols=None):
+        self.cpu = cpu
+        self.symbols = symbols or {}
+        # CPU.wrapEntry handles for every wrapped entry, while enabled
+        self._handles = []
+        self.reset()
+
+    @property
+    def enabled(self):
+        return bool(self._handles)
+
+    def reset(self):
+        # (bank, address, sp) per active call, innermost last
+        self.frames = []
+        # Stack key (tuple of (bank, address)) -> cycles
+        self.cycles = {}
+        self._key = ()
+        self._lastCycles = self.cpu.cycles
+
+    def enable(self):
+        if self.enabled:
+            return self
+        cpu = self.cpu
+        table = cpu.lr35902_opCodes
+        for opCode in CALLS:
+            self._wrap(table, opCode, self._afterCall)
+        for opCode in RSTS:
+            self._wrap(table, opCode, self._afterCall)
+        for opCode in RETURNS:
+            self._wrap(table, opCode, self._afterReturn)
+
+        def wrapInterruptHandler(interruptHandler):
+            def profiledInterruptHandler():
+                sp = int(cpu.CoreWords.SP)
+                spent = interruptHandler()
+                if spent:
+                    # The dispatch cycles are already counted, they belong to the handler
+                    self._push(int(cpu.CoreWords.PC), sp, -spent)
+                return spent
+            return profiledInterruptHandler
+
+        # Shadows the method on this instance only; _run and step look it up each time
+        self._handles.append(cpu.wrapEntry(cpu.__dict__, "interruptHandler", wrapInterruptHandler,
+                                           default=cpu.interruptHandler))
+
+        self._lastCycles = cpu.cycles
+        cpu.callStackProfiler = self
+        return self
+
+    def disable(self):
+        self._charge()
+        for handle in self._handles:
+            self.cpu.unwrapEntry(handle)
+        self._handles = []
+        if self.cpu.callStackProfiler is self:
+            self.cpu.callStackProfiler = None
+
+    def _wrap(self, table, opCode, after):
+        regs = self.cpu.CoreWords
+
+        def wrap(entry):
+            func, length, cycles, flags = entry
+
+            def profiled(operandAddr):
+                sp = int(regs.SP)
+                result = func(operandAddr)
+                after(result, sp, cycles[0] if result[1] is None else result[1])
+                return result
+            return (profiled, length, cycles, flags)
+
+        self._handles.append(self.cpu.wrapEntry(table, opCode, wrap))
+
+    # The CPU adds an instruction's cycles after its handler returns, so at this point
+    # cpu.cycles does not include them yet. CALLs are charged to the callee, returns
+    # (spent, passed in as the charge offset) to the routine returning.
+
+    def _afterCall(self, result, sp, spent):
+        # A taken CALL/RST pushed the return address
+        if self.cpu.CoreWords.SP == (sp - 2) & 0xFFFF:
+            self._push(int(result[0]), sp)
+
+    def _afterReturn(self, result, sp, spent):
+        if self.cpu.CoreWords.SP == (sp + 2) & 0xFFFF:
+            self._pop(sp, spent)
+
+    def _push(self, target, sp, offset=0):
+        self._charge(offset)
+        frames = self.frames
+        frames.append((self.bankOf(target), target, (sp - 2) & 0xFFFF))
+        if len(frames) > MAX_DEPTH:
+            del frames[0]
+        self._key = tuple(frame[:2] for frame in frames)
+
+    def _pop(self, sp, offset=0):
+        frames = self.frames
+        if not frames or frames[-1][2] > sp:
+            # Returning through an address this profiler did not see pushed
+            return
+        self._charge(offset)
+        while frames and frames[-1][2] <= sp:
+            frames.pop()
+        self._key = tuple(frame[:2] for frame in frames)
+
+    def _charge(self, offset=0):
+        """Charges the cycles since the last stack change (up to cpu.cycles + offset) to the current stack."""
+        now = self.cpu.cycles + offset
+        spent = now - self._lastCycles
+        if spent:
+            self.cycles[self._key] = self.cycles.get(self._key, 0) + spent
+        self._lastCycles = now
+
+    def bankOf(self, addr):
+        if 0x4000 <= addr <= 0x7FFF:
+            return self.cpu.Bus.romBank
+        return 0
+
+    def name(self, bank, addr):
+        name = self.symbols.get((bank, addr))
+        if name is not None:
+            return name
+        if bank == 0 and addr in INTERRUPT_NAMES:
+            return INTERRUPT_NAMES[addr]
+        if bank == 0 and addr < 0x40 and addr % 8 == 0:
+            return f"RST_{addr:02X}"
+        return f"{bank:02X}:{addr:04X}" if 0x4000 <= addr <= 0x7FFF else f"${addr:04X}"
+
+    def folded(self):
+        """The profile in folded stack format, one "frame;frame;... cycles" line per stack."""
+        self._charge()
+        lines = []
+        for key, cycles in self.cycles.items():
+            names = [ROOT] + [self.name(bank, addr) for bank, addr in key]
+            lines.append(f"{';'.join(names)} {cycles}")
+        lines.sort()
+        return "\n".join(lines)
+
+    def writeFolded(self, path):
+        with open(path, "w") as f:
+            f.write(self.folded() + "\n")
+
+    def selfCycles(self):
+        """Cycles spent in each routine itself (excluding its callees), as name -> cycles."""
+        self._charge()
+        return self._selfCycles()
+
+    def _selfCycles(self):
+        totals = {}
+        for key, cycles in list(self.cycles.items()):
+            name = self.name(*key[-1]) if key else ROOT
+            totals[name] = totals.get(name, 0) + cycles
+        return totals
+
+    def top(self, n):
+        """
+        The n routines with the most self cycles as (name, percent). Safe to call from
+        another thread (the performance HUD); cycles since the last stack change are
+        left out rather than charged from that thread.
+        """
+        totals = self._selfCycles()
+        total = sum(totals.values())
+        if not total:
+            return []
+        ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:n]
+        return [(name, 100.0 * cycles / total) for name, cycles in ranked]
+
+
+def symbolsForROM(romPath):
+    """Loads the .sym file next to a ROM (same name, .sym extension) if there is one."""
+    path = os.path.splitext(romPath)[0] + ".sym"
+    return loadSymbols(path) if os.path.exists(path) else {}
@@ -0,0 +1,197 @@
+import numpy as np
+
+# Execution coverage and memory access heatmaps. While enabled, Coverage counts
+#   executed - instructions started at each address of the 64 KiB map
+#   rom      - the same per ROM bank, so banked code (0x4000-0x7FFF) is attributed to
+#              the bank that was mapped when it ran
+#   reads    - Bus.readByte calls per address (instruction fetches included)
+#   writes   - Bus.writeByte calls per address
+# The counts are plain Python lists while running (an increment is a list store) and
+# are turned into numpy arrays for export:
+#
+#   coverage = Coverage(gameboy.cpu).enable()
+#   ...
+#   coverage.save("coverage.npz")    # np.load() gives executed, reads, writes and rom
+
+ADDRESS_SPACE = 0x10000
+ROM_BANK_SIZE = 0x4000
+
+# Names of the IO registers for the MMIO report
+IO_REGISTER_NAMES = {
+    0xFF00: "P1", 0xFF01: "SB", 0xFF02: "SC", 0xFF04: "DIV", 0xFF05: "TIMA", 0xFF06: "TMA",
+    0xFF07: "TAC", 0xFF0F: "IF", 0xFF40: "LCDC", 0xFF41: "STAT", 0xFF42: "SCY", 0xFF43: "SCX",
+    0xFF44: "LY", 0xFF45: "LYC", 0xFF46: "DMA", 0xFF47: "BGP", 0xFF48: "OBP0", 0xFF49: "OBP1",
+    0xFF4A: "WY", 0xFF4B: "WX", 0xFFFF: "IE",
+}
+for _addr in range(0xFF10, 0xFF27):
+    IO_REGISTER_NAMES[_addr] = f"NR{(_addr - 0xFF10) // 5 + 1}{(_addr - 0xFF10) % 5}"
+for _addr in range(0xFF30, 0xFF40):
+    IO_REGISTER_NAMES[_addr] = f"WAVE{_addr - 0xFF30:X}"
+IO_REGISTER_NAMES.update({0xFF24: "NR50", 0xFF25: "NR51", 0xFF26: "NR52"})
+
+# Heatmap colours from no accesses to the most accessed address: black, red, yellow, white
+HEAT_LUT = np.zeros((256, 3), dtype=np.uint8)
+_ramp = np.arange(256)
+HEAT_LUT[:, 0] = np.clip(_ramp * 3, 0, 255)
+HEAT_LUT[:, 1] = np.clip(_ramp * 3 - 255, 0, 255)
+HEAT_LUT[:, 2] = np.clip(_ramp * 3 - 510, 0, 255)
+
+
+class Coverage:
+    """
+    Opt-in coverage and access counters. enable() wraps the base opcode table entries
+    (like OpcodeProfiler) and shadows bus.readByte/writeByte on the bus instance, so
+    with coverage disabled nothing is counted and nothing costs anything. run_cycles
+    picks up the shadowed bus methods on its next call.
+
+    Loops bulk executed by the idiom recognizer bypass both the opcode tables and the
+    bus, and are counted once at their first instruction at most.
+    """
+
+    def __init__(self, cpu):
+        self.cpu = cpu
+        self.bus = cpu.Bus
+        # CPU.wrapEntry handles for every wrapped entry and bus method, while enabled
+        self._handles = []
+        self.executed = [0] * ADDRESS_SPACE
+        self.reads = [0] * ADDRESS_SPACE
+        self.writes = [0] * ADDRESS_SPACE
+        self.banked = [[0] * ROM_BANK_SIZE for _ in range(self.bankCount())]
+
+    @property
+    def enabled(self):
+        return bool(self._handles)
+
+    def bankCount(self):
+        return max(2, -(-len(self.bus.rom_data) // ROM_BANK_SIZE))
+
+    def reset(self):
+        # Cleared in place, the installed wrappers hold references to these lists
+        self.executed[:] = [0] * ADDRESS_SPACE
+        self.reads[:] = [0] * ADDRESS_SPACE
+        self.writes[:] = [0] * ADDRESS_SPACE
+        self.banked[:] = [[0] * ROM_BANK_SIZE for _ in range(self.bankCount())]
+
+    def enable(self):
+        if self.enabled:
+            return self
+        cpu = self.cpu
+        bus = self.bus
+        if len(self.banked) != self.bankCount():
+            # A ROM was loaded since the counters were made
+            self.reset()
+
+        table = cpu.lr35902_opCodes
+        for opCode in list(table):
+            self._wrap(table, opCode)
+
+        reads = self.reads
+        writes = self.writes
+
+        def wrapReadByte(readByte):
+            def countedReadByte(addr):
+                reads[addr & 0xFFFF] += 1
+                return readByte(addr)
+            return countedReadByte
+
+        def wrapWriteByte(writeByte):
+            def countedWriteByte(addr, value):
+                writes[addr & 0xFFFF] += 1
+                writeByte(addr, value)
+            return countedWriteByte
+
+        # Shadows the methods on this bus instance only
+        self._handles.append(cpu.wrapEntry(bus.__dict__, "readByte", wrapReadByte,
+                                           default=bus.readByte))
+        self._handles.append(cpu.wrapEntry(bus.__dict__, "writeByte", wrapWriteByte,
+                                           default=bus.writeByte))
+
+        cpu.coverage = self
+        return self
+
+    def disable(self):
+        for handle in self._handles:
+            self.cpu.unwrapEntry(handle)
+        self._handles = []
+        if self.cpu.coverage is self:
+            self.cpu.coverage = None
+
+    def _wrap(self, table, opCode):
+        executed = self.executed
+        banked = self.banked
+        bankCount = len(banked)
+        bus = self.bus
+
+        def wrap(entry):
+            func, length, cycles, flags = entry
+
+            def covered(operandAddr):
+                pc = (operandAddr - 1) & 0xFFFF
+                executed[pc] += 1
+                if 0x4000 <= pc <= 0x7FFF:
+                    # Bank numbers wrap around the ROM size, as on a real MBC
+                    banked[bus.romBank % bankCount][pc - 0x4000] += 1
+                return func(operandAddr)
+            return (covered, length, cycles, flags)
+
+        self._handles.append(self.cpu.wrapEntry(table, opCode, wrap))
+
+    def arrays(self):
+        """The counters as numpy arrays: executed, reads and writes (65536,), rom (banks, 16384)."""
+        rom = np.array(self.banked, dtype=np.uint64)
+        # Bank 0 is always mapped at 0x0000-0x3FFF
+        rom[0] = self.executed[:ROM_BANK_SIZE]
+        return {
+            "executed": np.array(self.executed, dtype=np.uint64),
+            "reads": np.array(self.reads, dtype=np.uint64),
+            "writes": np.array(self.writes, dtype=np.uint64),
+            "rom": rom,
+        }
+
+    def save(self, path):
+        np.savez_compressed(path, **self.arrays())
+
+    def romCoverage(self):
+        """Per ROM bank, the number of distinct instruction addresses executed."""
+        return [int(count) for count in np.count_nonzero(self.arrays()["rom"], axis=1)]
+
+    def hotspots(self, n=10):
+        """The n most executed addresses as (address, count), hottest first."""
+        executed = np.array(self.executed, dtype=np.uint64)
+        order = np.argsort(executed, kind="stable")[::-1][:n]
+        return [(int(addr), int(executed[addr])) for addr in order if executed[addr]]
+
+    def ioAccesses(self, n=None):
+        """IO registers (0xFF00-0xFF7F and IE) by total accesses as (name, reads, writes)."""
+        rows = []
+        for addr in list(range(0xFF00, 0xFF80)) + [0xFFFF]:
+            reads, writes = self.reads[addr], self.writes[addr]
+            if reads or writes:
+                rows.append((IO_REGISTER_NAMES.get(addr, f"${addr:04X}"), reads, writes))
+        rows.sort(key=lambda row: row[1] + row[2], reverse=True)
+        return rows[:n]
+
+
+def loadCoverage(path):
+    """Reads a file written by Coverage.save back as a dict of arrays."""
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def heatmapImage(counts):
+    """
+    Colours 65536 per address counts as a (256, 256, 3) image, one row per high address
+    byte. Counts are log scaled so rarely touched addresses still show up next to hot ones.
+    """
+    heat = np.log1p(np.asarray(counts, dtype=np.float64)).reshape(256, 256)
+    peak = heat.max()
+    if peak:
+        heat *= 255.0 / peak
+    return HEAT_LUT[heat.astype(np.uint8)]
+
+
+def heatmapPPM(counts, scale=2):
+    """The heatmap of counts as binary PPM bytes, each address drawn as a scale x scale block."""
+    image = heatmapImage(counts).repeat(scale, axis=0).repeat(scale, axis=1)
+    height, width, _ = image.shape
+    return f"P6\n{width} {height}\n255\n".encode("ascii") + image.tobytes()
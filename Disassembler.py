@@ -1,141 +1,213 @@
-import numpy as np
+from Bus import MemoryAccessError
+from RomAnalysis import loadAnalysis
+
+# CB prefixed opcodes are laid out systematically: bits 0-2 select the register,
+# bits 3-5 the operation (or bit number) and bits 6-7 the group.
+CB_OPERATIONS = ("RLC", "RRC", "RL", "RR", "SLA", "SRA", "SWAP", "SRL")
+CB_GROUPS = (None, "BIT", "RES", "SET")
+CB_REGISTERS = ("B", "C", "D", "E", "H", "L", "(HL)", "A")
+
+# Operand tokens in handler names that are printed as something other than upper case
+OPERAND_NAMES = {
+    'mhl': "(HL)",
+    'mbc': "(BC)",
+    'mde': "(DE)",
+    'mhlp': "(HL+)",
+    'mhlm': "(HL-)",
+    'mc': "(C)",
+    '00h': "$00",
+    '08h': "$08",
+    '10h': "$10",
+    '18h': "$18",
+    '20h': "$20",
+    '28h': "$28",
+    '30h': "$30",
+    '38h': "$38",
+}
+
+# Operand tokens that take immediate bytes, and how the immediate value is printed
+IMMEDIATE_FORMATS = {
+    'd8': "${:02X}",
+    'd16': "${:04X}",
+    'a16': "${:04X}",
+    'r8': "{:+d}",
+    'ma8': "($FF{:02X})",
+    'ma16': "(${:04X})",
+}
+
+# Handlers whose names do not follow the mnemonic_operand_operand convention
+FORMAT_OVERRIDES = {
+    0x08: ("LD {},SP", 'ma16'),
+    0x10: ("STOP", None),
+    0xF8: ("LD HL,SP{}", 'r8'),
+}
+
+
+def decodeCB(cbOpCode):
+    reg = CB_REGISTERS[cbOpCode & 0x07]
+    op = (cbOpCode >> 3) & 0x07
+    group = cbOpCode >> 6
+    if group == 0:
+        return f"{CB_OPERATIONS[op]} {reg}"
+    return f"{CB_GROUPS[group]} {op},{reg}"
+
+
+def formatFromName(func_name):
+    """Turns a handler name like _ld_bc_d16 into ("LD BC,{}", "d16")."""
+    parts = func_name.lstrip('_').split('_')
+    operands = []
+    kind = None
+    for op in parts[1:]:
+        if op in IMMEDIATE_FORMATS:
+            kind = op
+            operands.append("{}")
+        else:
+            operands.append(OPERAND_NAMES.get(op, op.upper()))
+
+    mnemonic = parts[0].upper()
+    if operands:
+        mnemonic += " " + ",".join(operands)
+    return mnemonic, kind
+
 
 class Disassembler:
-    def __init__(self, cpu, bus):
+    """
+    Decodes instructions through a per-opcode format table built once from the names of
+    the CPU's opcode handlers (cpu.opCodeNames, so wrapped table entries do not matter).
+    Decoded lines are cached by (ROM bank, address).
+
+    ROM entries stay valid until a different ROM is loaded. Entries for code running
+    from RAM remember their raw bytes and are re-decoded only when those bytes change.
+    With analyze, every ROM is run through RomAnalysis (cached on disk) as it is
+    loaded and the instructions it finds are preloaded.
+    """
+
+    def __init__(self, cpu, bus, analyze=False, cacheDir=None):
         self.cpu = cpu
         self.bus = bus
+        self.analyze = analyze
+        self.cacheDir = cacheDir
+        self.analysis = None
+
+        # opcode -> (length, template, immediate kind)
+        self.formats = {}
+        for opcode, (_, length, _, _) in cpu.lr35902_opCodes.items():
+            if opcode == 0xCB:
+                continue
+            template, kind = FORMAT_OVERRIDES.get(opcode) or formatFromName(cpu.opCodeNames[opcode])
+            self.formats[opcode] = (length, template, kind)
+        self.cbFormats = tuple(decodeCB(op) for op in range(0x100))
+
+        # (bank, addr) -> (line, length, raw bytes or None for ROM)
+        self.cache = {}
+        self.clear()
+
+    def clear(self):
+        self.cache.clear()
+        self._rom = self.bus.rom_data
+        if self.analyze:
+            kwargs = {} if self.cacheDir is None else {"cacheDir": self.cacheDir}
+            self.analysis = loadAnalysis(self._rom, self, **kwargs)
+            self.preload(self.analysis)
+
+    def preload(self, analysis, romBank=1):
+        """
+        Fills the ROM cache with the instructions found by a RomAnalysis of the loaded ROM.
+        romBank is the bank the analysis saw mapped at 0x4000-0x7FFF.
+        """
+        for addr, length, line in analysis.lines():
+            self.cache[(0 if addr <= 0x3FFF else romBank, addr)] = (line, length, None)
 
-    def get_mnemonic(self, func_name, operands_bytes):
-        name = func_name.lstrip('_')
-        parts = name.split('_')
-        
-        mnemonic = parts[0].upper()
-        operands = parts[1:]
-        
-        # Handle CB prefix
-        if parts[0] == 'cb':
-            mnemonic = parts[1].upper()
-            operands = parts[2:]
-            
-        formatted_operands = []
-        
-        for op in operands:
-            if op == 'd16':
-                val = (operands_bytes[1].astype(np.uint16) << 8) | operands_bytes[0]
-                formatted_operands.append(f"${val:04X}")
-            elif op == 'd8':
-                val = operands_bytes[0]
-                formatted_operands.append(f"${val:02X}")
-            elif op == 'a16':
-                val = (operands_bytes[1].astype(np.uint16) << 8) | operands_bytes[0]
-                formatted_operands.append(f"${val:04X}")
-            elif op == 'r8':
-                val = int(operands_bytes[0])
-                # Signed 8-bit offset
-                if val & 0x80:
-                    val -= 0x100
-                formatted_operands.append(f"{val:+d}") # e.g. -5 or +10
-            elif op == 'mhl':
-                formatted_operands.append("(HL)")
-            elif op == 'mbc':
-                formatted_operands.append("(BC)")
-            elif op == 'mde':
-                formatted_operands.append("(DE)")
-            elif op == 'mhlp':
-                formatted_operands.append("(HL+)")
-            elif op == 'mhlm':
-                formatted_operands.append("(HL-)")
-            elif op == 'ma8':
-                val = operands_bytes[0]
-                formatted_operands.append(f"($FF{val:02X})")
-            elif op == 'ma16':
-                val = (operands_bytes[1].astype(np.uint16) << 8) | operands_bytes[0]
-                formatted_operands.append(f"(${val:04X})")
-            elif op == 'mc':
-                formatted_operands.append("(C)")
-            elif op == '00h':
-                formatted_operands.append("$00")
-            elif op == '08h':
-                formatted_operands.append("$08")
-            elif op == '10h':
-                formatted_operands.append("$10")
-            elif op == '18h':
-                formatted_operands.append("$18")
-            elif op == '20h':
-                formatted_operands.append("$20")
-            elif op == '28h':
-                formatted_operands.append("$28")
-            elif op == '30h':
-                formatted_operands.append("$30")
-            elif op == '38h':
-                formatted_operands.append("$38")
-            else:
-                formatted_operands.append(op.upper())
-                
-        return f"{mnemonic} {','.join(formatted_operands)}"
+    def bankOf(self, addr):
+        if addr <= 0x3FFF:
+            return 0
+        if addr <= 0x7FFF:
+            return self.bus.romBank
+        return -1
+
+    def decode(self, addr):
+        """Returns (line, length) for the instruction at addr."""
+        key = (self.bankOf(addr), addr)
+        entry = self.cache.get(key)
+
+        if addr <= 0x7FFF:
+            if entry is not None:
+                return entry[0], entry[1]
+            line, length, raw = self.decodeUncached(addr)
+            self.cache[key] = (line, length, None)
+            return line, length
+
+        region = self.bus.getMemoryRegion(addr)
+        if region is None:
+            # IO registers and OAM are never cached
+            line, length, _ = self.decodeUncached(addr)
+            return line, length
+
+        mem, offset, available, _ = region
+        if entry is not None:
+            line, length, raw = entry
+            if length <= available and mem[offset:offset + length].tobytes() == raw:
+                return line, length
+
+        line, length, raw = self.decodeUncached(addr)
+        if length <= available:
+            self.cache[key] = (line, length, raw)
+        return line, length
+
+    def instructionLength(self, opcode):
+        """Length in bytes of the instruction starting with opcode, or None for illegal opcodes."""
+        if opcode == 0xCB:
+            return 2
+        entry = self.formats.get(opcode)
+        return entry[0] if entry is not None else None
+
+    def formatInstruction(self, addr, raw):
+        """Formats the instruction whose bytes are raw (as sized by instructionLength)."""
+        opcode = raw[0]
+        if opcode == 0xCB:
+            text = self.cbFormats[raw[1]]
+        elif opcode in self.formats:
+            _, template, kind = self.formats[opcode]
+            text = template
+            if kind is not None:
+                if len(raw) > 2:
+                    value = raw[1] | (raw[2] << 8)
+                else:
+                    value = raw[1]
+                    if kind == 'r8' and value & 0x80:
+                        # Signed 8-bit offset
+                        value -= 0x100
+                text = template.format(IMMEDIATE_FORMATS[kind].format(value))
+        else:
+            return f"{addr:04X}: {opcode:02X} ???"
+
+        return f"{addr:04X} {raw.hex().upper():<8} {text}"
+
+    def decodeUncached(self, addr):
+        """Returns (line, length, raw bytes) for the instruction at addr."""
+        # Through readRange, so decoding is not counted as emulated memory access
+        opcode = int(self.bus.readRange(addr, 1)[0])
+        length = self.instructionLength(opcode) or 1
+        raw = self.bus.readRange(addr, length).tobytes()
+        return self.formatInstruction(addr, raw), length, raw
 
     def disassemble(self, start_addr, count):
+        if self.bus.rom_data is not self._rom:
+            self.clear()
+
         lines = []
         addr = start_addr
-        
+
         for _ in range(count):
             if addr > 0xFFFF:
                 break
-                
+
             try:
-                opcode = self.bus.readByte(addr)
-                
-                length = 1
-                func = None
-                
-                if opcode == 0xCB:
-                    cb_opcode = self.bus.readByte(addr + 1)
-                    if cb_opcode in self.cpu.cb_prefix_table:
-                        func, length, _, _ = self.cpu.cb_prefix_table[cb_opcode]
-                        # CB instructions are 2 bytes long (Prefix CB + Opcode)
-                        # The table says length 2, which is correct.
-                    else:
-                        lines.append(f"{addr:04X}: CB {cb_opcode:02X} ???")
-                        addr += 2
-                        continue
-                elif opcode in self.cpu.lr35902_opCodes:
-                    func, length, _, _ = self.cpu.lr35902_opCodes[opcode]
-                else:
-                    lines.append(f"{addr:04X}: {opcode:02X} ???")
-                    addr += 1
-                    continue
-                
-                # Read operands
-                operands_bytes = []
-                raw_bytes_str = f"{opcode:02X}"
-                
-                if opcode == 0xCB:
-                     raw_bytes_str += f"{self.bus.readByte(addr+1):02X}"
-                
-                for i in range(1, length):
-                    # For CB, the length is 2, so we read 1 more byte (the opcode).
-                    # But wait, the operands are AFTER the instruction.
-                    # For normal ops: Opcode (1 byte) + Operands (length - 1 bytes)
-                    # For CB ops: CB (1 byte) + Opcode (1 byte) -> Total 2 bytes. 
-                    # The table says length 2. But CB instructions don't have immediate operands usually?
-                    # BIT b, r is 2 bytes. 
-                    # So operands_bytes should be empty for CB instructions unless they have immediate data?
-                    # Actually, my get_mnemonic logic assumes operands_bytes contains immediate data like d16/d8.
-                    # CB instructions don't have d16/d8.
-                    
-                    if opcode != 0xCB:
-                         val = self.bus.readByte(addr + i)
-                         operands_bytes.append(val)
-                         raw_bytes_str += f"{val:02X}"
-                
-                mnemonic = self.get_mnemonic(func.__name__, operands_bytes)
-                
-                lines.append(f"{addr:04X} {raw_bytes_str:<8} {mnemonic}")
-                
-                addr += length
-                
-            except Exception as e:
-                lines.append(f"{addr:04X}: Error {e}")
-                addr += 1
-                
+                line, length = self.decode(addr)
+            except MemoryAccessError as e:
+                line, length = f"{addr:04X}: Error {e}", 1
+
+            lines.append(line)
+            addr += length
+
         return lines
@@ -0,0 +1,184 @@
+import queue
+import threading
+import time
+import traceback
+
+import numpy as np
+
+from FramePacer import FramePacer
+
+# Commands accepted by EmulationWorker.post
+PAUSE = "pause"
+RESUME = "resume"
+STEP = "step"
+RESET = "reset"
+QUIT = "quit"
+# Posted as (SPEED, multiple of real time), 0 for unthrottled
+SPEED = "speed"
+
+
+class FrameSnapshot:
+    """A completed frame plus the machine state the debug views need."""
+
+    def __init__(self):
+        self.framebuffer = np.zeros((144, 160, 3), dtype=np.uint8)
+        self.registers = {"AF": 0, "BC": 0, "DE": 0, "HL": 0, "SP": 0, "PC": 0}
+        self.flags = 0
+        self.frameCount = 0
+        self.cycles = 0
+        self.paused = True
+        self.error = None
+
+    def capture(self, gameboy, paused, error=None):
+        cpu = gameboy.cpu
+        words = cpu.CoreWords
+        np.copyto(self.framebuffer, gameboy.ppu.framebuffer)
+
+        self.flags = int(cpu.Flags.F)
+        self.registers["AF"] = (int(cpu.CoreReg.A) << 8) | self.flags
+        self.registers["BC"] = int(words.BC)
+        self.registers["DE"] = int(words.DE)
+        self.registers["HL"] = int(words.HL)
+        self.registers["SP"] = int(words.SP)
+        self.registers["PC"] = int(words.PC)
+        self.frameCount = gameboy.ppu.frameCount
+        self.cycles = cpu.cycles
+        self.paused = paused
+        self.error = error
+
+
+class TripleBuffer:
+    """
+    Single producer, single consumer handoff of the latest value.
+
+    The producer fills back(), then publish() swaps it with the shared middle slot.
+    The consumer's latest() swaps the middle slot into its front slot when something
+    new was published. Only slot indices are exchanged under the lock, so neither side
+    ever waits on the other copying a frame, and the consumer always gets the newest
+    complete frame (older unread frames are simply overwritten).
+    """
+
+    def __init__(self, factory):
+        self._slots = [factory(), factory(), factory()]
+        self._back = 0
+        self._middle = 1
+        self._front = 2
+        self._fresh = False
+        self._lock = threading.Lock()
+
+    def back(self):
+        return self._slots[self._back]
+
+    def publish(self):
+        with self._lock:
+            self._back, self._middle = self._middle, self._back
+            self._fresh = True
+
+    def latest(self):
+        """Returns the newest published value, or None if nothing new was published since the last call."""
+        with self._lock:
+            if not self._fresh:
+                return None
+            self._front, self._middle = self._middle, self._front
+            self._fresh = False
+        return self._slots[self._front]
+
+
+class EmulationWorker:
+    """
+    Runs a GameBoy on its own thread. Control happens through commands posted with
+    post(); completed frames and register snapshots are published through `frames`.
+    """
+
+    def __init__(self, gameboy, speed=1.0):
+        self.gameboy = gameboy
+        self.pacer = FramePacer(speed)
+        self.commands = queue.Queue()
+        self.frames = TripleBuffer(FrameSnapshot)
+        self.paused = True
+        self.error = None
+        # Seconds spent inside run_frame (excluding pacing), sampled by the performance HUD
+        self.emulationTime = 0.0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="EmulationWorker", daemon=True)
+        self._thread.start()
+
+    def post(self, command):
+        self.commands.put(command)
+
+    def stop(self, timeout=None):
+        self.post(QUIT)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run(self):
+        self.publish()
+        while True:
+            if self.paused:
+                # Nothing to emulate, sleep until the GUI asks for something
+                if not self.handle(self.commands.get()):
+                    return
+                continue
+
+            try:
+                while True:
+                    if not self.handle(self.commands.get_nowait()):
+                        return
+            except queue.Empty:
+                pass
+
+            if not self.paused:
+                self.execute(self.runFrame)
+
+    def runFrame(self):
+        start = time.perf_counter()
+        cycles = self.gameboy.run_frame()
+        self.emulationTime += time.perf_counter() - start
+        if cycles == 0:
+            # The CPU locked up on an illegal opcode, stop instead of spinning
+            self.paused = True
+            return
+        self.pacer.wait(cycles)
+
+    def handle(self, command):
+        """Applies one command. Returns False when the worker should exit."""
+        if isinstance(command, tuple):
+            command, argument = command
+        if command == QUIT:
+            return False
+        if command == PAUSE:
+            self.paused = True
+            self.publish()
+        elif command == RESUME:
+            self.paused = False
+            self.pacer.reset()
+        elif command == SPEED:
+            self.pacer.setSpeed(argument)
+        elif command == STEP:
+            if self.paused:
+                self.execute(self.gameboy.cpu.step)
+        elif command == RESET:
+            self.gameboy.reset()
+            self.error = None
+            self.paused = True
+            self.publish()
+        else:
+            raise ValueError(f"Unknown worker command: {command}")
+        return True
+
+    def execute(self, action):
+        try:
+            action()
+        except Exception as e:
+            # Keep the thread alive so the debugger can inspect the state that failed
+            traceback.print_exc()
+            self.error = e
+            self.paused = True
+        self.publish()
+
+    def publish(self):
+        self.frames.back().capture(self.gameboy, self.paused, self.error)
+        self.frames.publish()
@@ -0,0 +1,104 @@
+import collections
+import math
+import time
+
+from PPU import CYCLES_PER_FRAME
+
+CPU_CLOCK_HZ = 4194304
+# 4194304 / 70224 = 59.7275 frames per second
+FRAME_RATE = CPU_CLOCK_HZ / CYCLES_PER_FRAME
+
+# Sleep until this close to the deadline, then spin. time.sleep can overshoot by a
+# millisecond or more, which shows up directly as frame jitter.
+SPIN_MARGIN = 0.0015
+
+# When this far behind (e.g. after a debugger stop or a slow frame) the schedule is
+# restarted instead of running flat out to catch up
+MAX_LAG = 0.1
+
+# Number of recent frame intervals kept for the jitter statistics
+STATS_WINDOW = 120
+
+
+class FramePacer:
+    """
+    Paces emulation against a monotonic clock. Call wait() after emulating each frame
+    (or chunk of cycles). Speed is a multiple of real time: 1.0 is real time, 0.5 slow
+    motion, 2.0 double speed; 0 or None runs unthrottled (turbo) and only gathers stats.
+    """
+
+    def __init__(self, speed=1.0, clock=time.perf_counter, sleep=time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self.speed = speed
+        self.reset()
+
+    @property
+    def turbo(self):
+        return not self.speed
+
+    def setSpeed(self, speed):
+        self.speed = speed
+        self.reset()
+
+    def reset(self):
+        """Restarts the schedule and the statistics, e.g. after a pause."""
+        now = self.clock()
+        self._epoch = now
+        self._emulated = 0.0
+        self._last = now
+        self._intervals = collections.deque(maxlen=STATS_WINDOW)
+        self.frames = 0
+        self.statsStart = now
+        self.statsEmulated = 0.0
+
+    def wait(self, cycles=CYCLES_PER_FRAME):
+        """Blocks until `cycles` more emulated cycles are due. Returns the time slept."""
+        emulated = cycles / CPU_CLOCK_HZ
+        self._emulated += emulated
+        self.statsEmulated += emulated
+        self.frames += 1
+
+        slept = 0.0
+        now = self.clock()
+        if not self.turbo:
+            deadline = self._epoch + self._emulated / self.speed
+            remaining = deadline - now
+            if remaining < -MAX_LAG:
+                # Too far behind to catch up, start a new schedule from here
+                self._epoch = now
+                self._emulated = 0.0
+            elif remaining > 0:
+                if remaining > SPIN_MARGIN:
+                    self.sleep(remaining - SPIN_MARGIN)
+                while self.clock() < deadline:
+                    pass
+                slept = remaining
+                now = self.clock()
+
+        self._intervals.append(now - self._last)
+        self._last = now
+        return slept
+
+    def stats(self):
+        """
+        Returns a dict with the achieved frame rate, the percentage of real time
+        achieved and the mean and standard deviation (jitter) of recent frame times.
+        """
+        elapsed = self.clock() - self.statsStart
+        intervals = self._intervals
+        if intervals:
+            mean = sum(intervals) / len(intervals)
+            jitter = math.sqrt(sum((x - mean) ** 2 for x in intervals) / len(intervals))
+            worst = max(intervals)
+        else:
+            mean = jitter = worst = 0.0
+
+        return {
+            "frames": self.frames,
+            "fps": self.frames / elapsed if elapsed > 0 else 0.0,
+            "realtime_percent": 100.0 * self.statsEmulated / elapsed if elapsed > 0 else 0.0,
+            "frame_ms": mean * 1000,
+            "jitter_ms": jitter * 1000,
+            "worst_ms": worst * 1000,
+        }
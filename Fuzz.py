@@ -0,0 +1,342 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Bus import FlatBus, RegionBus
+from CPU import CPU
+from Idioms import IDIOMS
+
+# Differential fuzzing of the CPU's execution engines. Random register and memory states
+# are executed by the reference engine (CPU.step, one instruction at a time through the
+# opcode handlers, idioms off) and by an optimized engine, on a FlatBus so any address
+# can be read and written, or on a RegionBus, which adds the real region boundaries. The
+# two results are compared field by field: registers, F, SP, PC, cycles, instruction
+# count, IME/HALT state, the final memory and (for engines that go through the bus) the
+# ordered log of writes. Usage:
+#
+#   python Fuzz.py                          every engine, 20000 cases each
+#   python Fuzz.py run --cases 1000000      one engine, spread over all cores
+#   python Fuzz.py idioms --seed 7 --json fuzz.json
+#   python Fuzz.py run --strict             also fail on cases that raise in both engines
+#
+# Cases are generated in numpy batches from (seed, batch index), so any reported case is
+# reproduced by rerunning with the same seed. Interrupts are not fuzzed: IME is clear.
+
+DEFAULT_CASES = 20000
+DEFAULT_BATCH = 500
+# Mismatches kept per batch; the counts are always complete
+MAX_REPORTED = 20
+
+MATCH = "match"
+MISMATCH = "mismatch"
+# Both engines raised the same exception (a bug shared by both, reported separately)
+ERROR = "error"
+
+STATE_FIELDS = ("A", "F", "B", "C", "D", "E", "H", "L", "SP", "PC", "cycles", "instructions",
+                "IME", "imeDelay", "Halted", "Stopped")
+
+# Most iterations a fuzzed idiom loop runs, and the most instructions the reference may
+# step to finish one
+MAX_LOOP = 64
+MAX_BLOCK_STEPS = 8 * MAX_LOOP + 16
+
+# Region boundaries of the memory map; loops placed around them exercise the idiom fallbacks
+REGION_BOUNDARIES = (0x0000, 0x8000, 0xA000, 0xC000, 0xE000, 0xFE00, 0xFF00, 0xFF80, 0xFFFF)
+
+
+#==========================================
+#           STATE
+#==========================================
+
+def makeCPU(idioms=False, bus=FlatBus):
+    cpu = CPU(bus())
+    cpu.Idioms.enabled = idioms
+    return cpu
+
+
+def loadState(cpu, case):
+    """Puts the CPU and its bus into the state described by case."""
+    cpu.reset()
+    bus = cpu.Bus
+    bus.memory[:] = np.random.default_rng(case["seed"]).integers(0, 0x100, 0x10000, dtype=np.uint8)
+    for offset, byte in enumerate(case["code"]):
+        bus.memory[(case["PC"] + offset) & 0xFFFF] = byte
+    bus.writes.clear()
+
+    regs = cpu.CoreReg
+    regs.A, regs.B, regs.C, regs.D = case["A"], case["B"], case["C"], case["D"]
+    regs.E, regs.H, regs.L = case["E"], case["H"], case["L"]
+    cpu.Flags.F = case["F"]
+    cpu.CoreWords.SP = case["SP"]
+    cpu.CoreWords.PC = case["PC"]
+
+
+def captureState(cpu):
+    regs = cpu.CoreReg
+    imask = cpu.InterruptMask
+    return {
+        "A": int(regs.A), "F": int(cpu.Flags.F), "B": int(regs.B), "C": int(regs.C),
+        "D": int(regs.D), "E": int(regs.E), "H": int(regs.H), "L": int(regs.L),
+        "SP": int(cpu.CoreWords.SP), "PC": int(cpu.CoreWords.PC),
+        "cycles": cpu.cycles, "instructions": cpu.instructions,
+        "IME": int(imask.IME), "imeDelay": imask.imeDelay,
+        "Halted": bool(cpu.Halted), "Stopped": bool(cpu.Stopped),
+    }
+
+
+#==========================================
+#           ENGINES
+#==========================================
+
+class Engine:
+    """
+    An optimized engine under test. execute(cpu, case) runs the case on a CPU made by
+    makeCPU(idioms); reference(cpu, case) runs the same case the reference way.
+    exactWrites is False for engines that write memory in bulk instead of through
+    bus.writeByte, for which only the final memory is compared. ignore names state
+    fields the engine is allowed to differ in. bus is the bus class both CPUs run on.
+    """
+
+    def __init__(self, name, generate, execute, reference, idioms=False, exactWrites=True, ignore=(),
+                 bus=FlatBus):
+        self.name = name
+        self.generate = generate
+        self.execute = execute
+        self.reference = reference
+        self.idioms = idioms
+        self.exactWrites = exactWrites
+        self.ignore = ignore
+        self.bus = bus
+
+
+def randomCases(rng, count):
+    """count random register states as a list of dicts, generated in one go."""
+    regs = rng.integers(0, 0x100, size=(count, 8))
+    # The low nibble of F always reads as zero
+    regs[:, 1] &= 0xF0
+    words = rng.integers(0, 0x10000, size=(count, 2))
+    seeds = rng.integers(0, 2**63, size=count)
+    return [
+        {"A": int(r[0]), "F": int(r[1]), "B": int(r[2]), "C": int(r[3]),
+         "D": int(r[4]), "E": int(r[5]), "H": int(r[6]), "L": int(r[7]),
+         "SP": int(w[0]), "PC": int(w[1]), "seed": int(seed), "code": []}
+        for r, w, seed in zip(regs, words, seeds)
+    ]
+
+
+def instructionCases(rng, count, opcodes):
+    """One instruction per case. The opcode at PC is drawn from opcodes; its operands (and a CB opcode) are random memory."""
+    cases = randomCases(rng, count)
+    for case, opCode in zip(cases, rng.choice(opcodes, size=count)):
+        case["code"] = [int(opCode)]
+    return cases
+
+
+def idiomCases(rng, count, opcodes=None):
+    """A copy or fill loop per case, with a small iteration count so the reference can step it."""
+    signatures = list(IDIOMS)
+    cases = randomCases(rng, count)
+    picks = rng.integers(0, len(signatures), size=count)
+    loops = rng.integers(1, MAX_LOOP + 1, size=count)
+    for case, pick, loop in zip(cases, picks, loops):
+        sig = signatures[pick]
+        case["code"] = list(sig)
+        kind, param = IDIOMS[sig]
+        if kind == "copy":
+            case["B"], case["C"] = 0, int(loop)
+        else:
+            case[param[0]] = int(loop)
+    return cases
+
+
+def regionIdiomCases(rng, count, opcodes=None):
+    """Idiom cases whose HL and DE start within one loop length of a memory region boundary."""
+    cases = idiomCases(rng, count)
+    starts = rng.choice(REGION_BOUNDARIES, size=(count, 2)) + rng.integers(-MAX_LOOP, MAX_LOOP + 1, size=(count, 2))
+    for case, (hl, de) in zip(cases, starts & 0xFFFF):
+        case["H"], case["L"] = int(hl) >> 8, int(hl) & 0xFF
+        case["D"], case["E"] = int(de) >> 8, int(de) & 0xFF
+    return cases
+
+
+def stepOne(cpu, case):
+    cpu.step()
+
+
+def runOne(cpu, case):
+    # A one cycle budget runs exactly one instruction through the run_cycles loop
+    cpu.run_cycles(1)
+
+
+def stepBlock(cpu, case):
+    """Steps until PC leaves the loop at the end of the case's code."""
+    end = (case["PC"] + len(case["code"])) & 0xFFFF
+    for _ in range(MAX_BLOCK_STEPS):
+        cpu.step()
+        if cpu.CoreWords.PC == end:
+            return
+
+
+ENGINES = {
+    # The run_cycles/run_frame loop against CPU.step
+    "run": Engine("run", instructionCases, runOne, stepOne),
+    # Bulk executed copy/fill loops against stepping them instruction by instruction. A
+    # bulk executed loop counts as one instruction.
+    "idioms": Engine("idioms", idiomCases, stepBlock, stepBlock, idioms=True, exactWrites=False,
+                     ignore=("instructions",)),
+    # The same around region boundaries, ROM and IO, where the idioms have to fall back to stepping
+    "regions": Engine("regions", regionIdiomCases, stepBlock, stepBlock, idioms=True, exactWrites=False,
+                      ignore=("instructions",), bus=RegionBus),
+}
+
+
+#==========================================
+#           COMPARISON
+#==========================================
+
+def runCase(engine, reference, candidate, case):
+    """
+    Runs case on both CPUs. Returns (status, details): details is None on a match, the
+    exception name for ERROR, or the differences for MISMATCH.
+    """
+    results = []
+    for cpu, execute in ((reference, engine.reference), (candidate, engine.execute)):
+        loadState(cpu, case)
+        try:
+            execute(cpu, case)
+        except Exception as e:
+            results.append(type(e).__name__)
+        else:
+            results.append(captureState(cpu))
+
+    expected, actual = results
+    if isinstance(expected, str) or isinstance(actual, str):
+        if expected == actual:
+            return ERROR, expected
+        return MISMATCH, {"exception": [result if isinstance(result, str) else None for result in results]}
+
+    diffs = {}
+    for name in STATE_FIELDS:
+        if name not in engine.ignore and expected[name] != actual[name]:
+            diffs[name] = [expected[name], actual[name]]
+
+    refMemory, candMemory = reference.Bus.memory, candidate.Bus.memory
+    if not np.array_equal(refMemory, candMemory):
+        changed = np.flatnonzero(refMemory != candMemory)
+        diffs["memory"] = [[int(addr), int(refMemory[addr]), int(candMemory[addr])] for addr in changed[:8]]
+    if engine.exactWrites and reference.Bus.writes != candidate.Bus.writes:
+        diffs["writes"] = [reference.Bus.writes[:8], candidate.Bus.writes[:8]]
+
+    return (MISMATCH, diffs) if diffs else (MATCH, None)
+
+
+def describeCase(case):
+    code = " ".join(f"{byte:02X}" for byte in case["code"])
+    regs = " ".join(f"{name}:{case[name]:02X}" for name in ("A", "F", "B", "C", "D", "E", "H", "L"))
+    return f"[{code}] at PC:{case['PC']:04X} SP:{case['SP']:04X} {regs} seed {case['seed']}"
+
+
+def runBatch(engineName, seed, index, size, opcodes=None):
+    """
+    Generates and checks batch `index` of an engine's cases. Returns counts per status,
+    errors per first code byte and up to MAX_REPORTED mismatches.
+    """
+    engine = ENGINES[engineName]
+    reference = makeCPU(idioms=False, bus=engine.bus)
+    candidate = makeCPU(idioms=engine.idioms, bus=engine.bus)
+    if opcodes is None:
+        opcodes = sorted(reference.lr35902_opCodes)
+
+    rng = np.random.default_rng([seed, index])
+    counts = {MATCH: 0, MISMATCH: 0, ERROR: 0}
+    errors = {}
+    mismatches = []
+    for case in engine.generate(rng, size, opcodes):
+        # Random states make the handlers' numpy arithmetic wrap all the time
+        with np.errstate(over="ignore"):
+            status, details = runCase(engine, reference, candidate, case)
+        counts[status] += 1
+        if status == ERROR:
+            key = f"{case['code'][0]:02X} {details}"
+            errors[key] = errors.get(key, 0) + 1
+        elif status == MISMATCH and len(mismatches) < MAX_REPORTED:
+            mismatches.append({"case": describeCase(case), "differences": details})
+    return {"engine": engineName, "counts": counts, "errors": errors, "mismatches": mismatches}
+
+
+def runFuzz(engineName, cases=DEFAULT_CASES, seed=0, jobs=None, batch=DEFAULT_BATCH, opcodes=None):
+    """Checks `cases` cases of one engine in batches spread over jobs worker processes, and merges the results."""
+    batches = max(1, -(-cases // batch))
+    sizes = [min(batch, cases - i * batch) for i in range(batches)]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        results = [runBatch(engineName, seed, i, size, opcodes) for i, size in enumerate(sizes)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, batches)) as executor:
+            results = list(executor.map(runBatch, [engineName] * batches, [seed] * batches,
+                                        range(batches), sizes, [opcodes] * batches))
+
+    merged = {"engine": engineName, "seed": seed, "counts": {MATCH: 0, MISMATCH: 0, ERROR: 0},
+              "errors": {}, "mismatches": []}
+    for result in results:
+        for status, count in result["counts"].items():
+            merged["counts"][status] += count
+        for key, count in result["errors"].items():
+            merged["errors"][key] = merged["errors"].get(key, 0) + count
+        merged["mismatches"].extend(result["mismatches"][:MAX_REPORTED - len(merged["mismatches"])])
+    return merged
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Differential fuzzing of the optimized CPU engines against CPU.step")
+    parser.add_argument("engines", nargs="*", help=f"Engines to fuzz: {', '.join(sorted(ENGINES))} (default: all)")
+    parser.add_argument("--cases", type=int, default=DEFAULT_CASES, help="Cases per engine")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the case generator")
+    parser.add_argument("--jobs", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="Cases per worker task")
+    parser.add_argument("--opcodes", help="Comma separated hex opcodes to fuzz (run engine only)")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--strict", action="store_true",
+                        help="Exit nonzero when a case raises in both engines, not only on mismatches")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.engines if name not in ENGINES]
+    if unknown:
+        parser.error(f"unknown engine {unknown[0]}, choose from {', '.join(sorted(ENGINES))}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    opcodes = [int(op, 16) for op in args.opcodes.split(",")] if args.opcodes else None
+
+    results = []
+    for name in args.engines or sorted(ENGINES):
+        start = time.perf_counter()
+        result = runFuzz(name, args.cases, args.seed, args.jobs, args.batch, opcodes)
+        elapsed = time.perf_counter() - start
+        results.append(result)
+
+        counts = result["counts"]
+        print(f"{name:8} {sum(counts.values())} cases in {elapsed:.1f}s: {counts[MATCH]} match, "
+              f"{counts[MISMATCH]} mismatch, {counts[ERROR]} raised in both engines")
+        for key, count in sorted(result["errors"].items()):
+            print(f"  both raise  {key} ({count})")
+        for mismatch in result["mismatches"]:
+            print(f"  MISMATCH {mismatch['case']}")
+            for field, values in mismatch["differences"].items():
+                print(f"    {field}: {values}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    failing = (MISMATCH, ERROR) if args.strict else (MISMATCH,)
+    return 1 if any(result["counts"][outcome] for result in results for outcome in failing) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,18 +1,49 @@
 import tkinter as tk
 from tkinter import ttk
 from Disassembler import Disassembler
-from Registers import Word
+import EmulationWorker
+import time
+from Screen import ScreenBuffer
+from utils import hexDump
+from PerfMonitor import PerfMonitor, formatStats, SAMPLE_INTERVAL
+from Coverage import heatmapPPM
+
+SCREEN_SCALE = 3
+# The 64 KiB heatmap is 256x256 addresses, drawn at this scale
+HEATMAP_SCALE = 2
+HEATMAP_INTERVAL_MS = 500
+
+# Keyboard keysyms mapped to Game Boy buttons
+KEY_BINDINGS = {
+    "Up": "UP",
+    "Down": "DOWN",
+    "Left": "LEFT",
+    "Right": "RIGHT",
+    "x": "A",
+    "z": "B",
+    "Return": "START",
+    "BackSpace": "SELECT",
+}
+
+# How often the Tk thread checks the worker for a new frame. The debug views are
+# redrawn at most this often, and only when the worker published something new.
+POLL_INTERVAL_MS = 16
 
 class GUI:
-    def __init__(self, cpu, bus):
+    def __init__(self, cpu, bus, worker):
         self.cpu = cpu
         self.bus = bus
+        # Emulation runs on the worker thread; the GUI only posts commands to it
+        self.worker = worker
         
         self.root = tk.Tk()
         self.root.title("SDRBoy - Game Boy Emulator")
         self.root.geometry("800x600")
         self.root.configure(bg="#202020")
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.root.bind("<KeyPress>", self.handle_input)
+        self.root.bind("<KeyRelease>", self.handle_input)
+        self.held_keys = set()
         self.running = True
 
         # Main Layout
@@ -31,6 +62,11 @@ class GUI:
         self.canvas = tk.Canvas(self.screen_frame, width=160*3, height=144*3, bg="#9bbc0f", highlightthickness=0)
         self.canvas.pack()
 
+        # One persistent image on the canvas. Each frame is a single bulk PPM put into it.
+        self.screen_buffer = ScreenBuffer(SCREEN_SCALE)
+        self.screen_image = tk.PhotoImage(width=self.screen_buffer.width, height=self.screen_buffer.height)
+        self.canvas.create_image(0, 0, image=self.screen_image, anchor=tk.NW)
+
         # Buttons Area
         self.buttons_frame = tk.Frame(self.left_frame, bg="#202020")
         self.buttons_frame.pack(pady=20, fill=tk.X)
@@ -45,7 +81,13 @@ class GUI:
         self.create_debug_pane()
         self.create_memory_view()
         
-        self.disassembler = Disassembler(cpu, bus)
+        # Statically analyzes each ROM once (cached on disk) so the disassembly pane
+        # starts out with every reachable instruction decoded
+        self.disassembler = Disassembler(cpu, bus, analyze=True)
+
+        self.perf_monitor = PerfMonitor(worker.gameboy)
+        # Seconds spent redrawing the GUI, sampled by the performance HUD
+        self.gui_time = 0.0
 
     def create_buttons(self):
         # D-Pad
@@ -74,9 +116,18 @@ class GUI:
     def create_visual_button(self, parent, text, col, row, width=4, height=2, color="#303030"):
         btn = tk.Button(parent, text=text, width=width, height=height, bg=color, fg="white", font=("Arial", 8, "bold"), relief="raised")
         btn.grid(column=col, row=row, padx=5, pady=5)
+        # The on screen buttons are held down with the mouse like the real ones
+        btn.bind("<ButtonPress-1>", lambda event: self.worker.gameboy.joypad.press(text))
+        btn.bind("<ButtonRelease-1>", lambda event: self.worker.gameboy.joypad.release(text))
         return btn
 
     def create_debug_pane(self):
+        # Performance HUD
+        tk.Label(self.right_frame, text="Performance", bg="#303030", fg="#00ff00", font=("Courier", 12, "bold")).pack(pady=(10, 5))
+
+        self.perf_label = tk.Label(self.right_frame, text="\n".join(formatStats(None)), bg="#303030", fg="white", font=("Courier", 9), justify=tk.LEFT, anchor="w")
+        self.perf_label.pack(fill=tk.X, padx=10)
+
         # Registers
         tk.Label(self.right_frame, text="Registers", bg="#303030", fg="#00ff00", font=("Courier", 12, "bold")).pack(pady=(10, 5))
         
@@ -132,11 +183,19 @@ class GUI:
         self.btn_reset = tk.Button(self.control_frame, text="Reset", command=self.reset_cpu, bg="#8b0000", fg="white", width=8)
         self.btn_reset.pack(side=tk.RIGHT, padx=5)
 
+        # Only offered when the emulator was started with coverage counting (--coverage)
+        if self.cpu is not None and self.cpu.coverage is not None:
+            tk.Button(self.right_frame, text="Heatmap", command=self.open_heatmap, bg="#505050", fg="white", width=8).pack(side=tk.BOTTOM, pady=(0, 5))
+        self.heatmap_window = None
+
         self.paused = True
-        self.step_requested = False
 
     def toggle_pause(self):
         self.paused = not self.paused
+        self.worker.post(EmulationWorker.PAUSE if self.paused else EmulationWorker.RESUME)
+        self.show_paused()
+
+    def show_paused(self):
         if self.paused:
             self.btn_pause.config(text="Resume", bg="#008000")
             self.btn_step.config(state="normal")
@@ -145,42 +204,66 @@ class GUI:
             self.btn_step.config(state="disabled")
 
     def step_cpu(self):
-        self.step_requested = True
+        self.worker.post(EmulationWorker.STEP)
 
     def reset_cpu(self):
-        self.cpu.reset()
-        self.bus.reset()
+        self.worker.post(EmulationWorker.RESET)
         self.paused = True
-        self.btn_pause.config(text="Resume", bg="#008000")
-        self.btn_step.config(state="normal")
-        self.update()
+        self.show_paused()
 
     def on_closing(self):
         self.running = False
+        self.worker.post(EmulationWorker.QUIT)
         self.root.destroy()
 
-    def update(self):
+    def run(self):
+        """Runs the Tk main loop, picking up frames from the worker with root.after."""
+        self.root.after(0, self.poll)
+        self.root.after(int(SAMPLE_INTERVAL * 1000), self.update_perf)
+        self.root.mainloop()
+
+    def poll(self):
         if not self.running:
             return
+
+        frame = self.worker.frames.latest()
+        if frame is not None:
+            start = time.perf_counter()
+            if frame.paused and not self.paused:
+                # The worker stopped on its own (e.g. an exception while running)
+                self.paused = True
+                self.show_paused()
+            self.refresh_views(frame)
+            self.gui_time += time.perf_counter() - start
+
+        self.root.after(POLL_INTERVAL_MS, self.poll)
+
+    def update_perf(self):
+        if not self.running:
+            return
+
+        stats = self.perf_monitor.sample(self.worker.emulationTime, self.gui_time)
+        self.perf_label.config(text="\n".join(formatStats(stats)))
+        self.root.after(int(SAMPLE_INTERVAL * 1000), self.update_perf)
+
+    def refresh_views(self, frame):
+        # Update Screen
+        self.screen_image.put(self.screen_buffer.update(frame.framebuffer))
+
         # Update Registers
         if self.cpu:
-            af = (self.cpu.CoreReg.A.astype(Word) << 8) | self.cpu.Flags.F
-            self.reg_labels["AF"].config(text=f"{af:04X}")
-            self.reg_labels["BC"].config(text=f"{self.cpu.CoreWords.BC:04X}")
-            self.reg_labels["DE"].config(text=f"{self.cpu.CoreWords.DE:04X}")
-            self.reg_labels["HL"].config(text=f"{self.cpu.CoreWords.HL:04X}")
-            self.reg_labels["SP"].config(text=f"{self.cpu.CoreWords.SP:04X}")
-            self.reg_labels["PC"].config(text=f"{self.cpu.CoreWords.PC:04X}")
+            for reg, value in frame.registers.items():
+                self.reg_labels[reg].config(text=f"{value:04X}")
 
             # Update Flags
-            f = self.cpu.Flags.F
+            f = frame.flags
             self.flag_vars["Z"].set(bool(f & 0x80))
             self.flag_vars["N"].set(bool(f & 0x40))
             self.flag_vars["H"].set(bool(f & 0x20))
             self.flag_vars["C"].set(bool(f & 0x10))
 
             # Update Disassembly View
-            pc = int(self.cpu.CoreWords.PC)
+            pc = frame.registers["PC"]
             # We want to show some lines before PC if possible, but disassembly is variable length.
             # Simple approach: Show from PC onwards.
             # Better approach: Disassemble a block starting from PC.
@@ -204,11 +287,79 @@ class GUI:
             # Update Memory View
             self.update_memory_view()
 
-        self.root.update_idletasks()
-        self.root.update()
+    def open_heatmap(self):
+        if self.heatmap_window is not None:
+            self.heatmap_window.lift()
+            return
 
-    def handle_input(self):
-        pass
+        window = tk.Toplevel(self.root)
+        window.title("Memory Heatmap")
+        window.configure(bg="#303030")
+        window.protocol("WM_DELETE_WINDOW", self.close_heatmap)
+        self.heatmap_window = window
+
+        # Which counter to show: executed instructions, reads or writes
+        self.heatmap_kind = tk.StringVar(value="executed")
+        kinds_frame = tk.Frame(window, bg="#303030")
+        kinds_frame.pack(fill=tk.X, padx=10, pady=5)
+        for kind in ("executed", "reads", "writes"):
+            tk.Radiobutton(kinds_frame, text=kind.capitalize(), value=kind, variable=self.heatmap_kind, command=self.update_heatmap, bg="#303030", fg="white", selectcolor="#505050", activebackground="#303030", font=("Courier", 10)).pack(side=tk.LEFT)
+
+        size = 256 * HEATMAP_SCALE
+        canvas = tk.Canvas(window, width=size, height=size, bg="black", highlightthickness=0)
+        canvas.pack(padx=10)
+        self.heatmap_image = tk.PhotoImage(width=size, height=size)
+        canvas.create_image(0, 0, image=self.heatmap_image, anchor=tk.NW)
+        canvas.bind("<Motion>", self.heatmap_hover)
+
+        # Address and count under the mouse
+        self.heatmap_label = tk.Label(window, text="", bg="#303030", fg="#00ff00", font=("Courier", 10), anchor="w")
+        self.heatmap_label.pack(fill=tk.X, padx=10, pady=5)
+
+        self.poll_heatmap()
+
+    def close_heatmap(self):
+        self.heatmap_window.destroy()
+        self.heatmap_window = None
+
+    def poll_heatmap(self):
+        if self.heatmap_window is None or not self.running:
+            return
+        self.update_heatmap()
+        self.root.after(HEATMAP_INTERVAL_MS, self.poll_heatmap)
+
+    def update_heatmap(self):
+        coverage = self.cpu.coverage
+        if self.heatmap_window is None or coverage is None:
+            return
+        # The worker keeps counting while the lists are read; a frame of skew does not matter here
+        self.heatmap_image.put(heatmapPPM(getattr(coverage, self.heatmap_kind.get()), HEATMAP_SCALE))
+
+    def heatmap_hover(self, event):
+        coverage = self.cpu.coverage
+        if coverage is None:
+            return
+        row = min(max(event.y // HEATMAP_SCALE, 0), 255)
+        col = min(max(event.x // HEATMAP_SCALE, 0), 255)
+        addr = (row << 8) | col
+        self.heatmap_label.config(text=f"${addr:04X}  executed {coverage.executed[addr]}  reads {coverage.reads[addr]}  writes {coverage.writes[addr]}")
+
+    def handle_input(self, event):
+        # Called on the Tk thread. Events are queued on the Joypad and applied by the
+        # worker at the start of the next frame.
+        button = KEY_BINDINGS.get(event.keysym)
+        if button is None or isinstance(event.widget, tk.Entry):
+            return
+
+        joypad = self.worker.gameboy.joypad
+        if event.type == tk.EventType.KeyPress:
+            # Ignore auto repeat while the key is held
+            if event.keysym not in self.held_keys:
+                self.held_keys.add(event.keysym)
+                joypad.press(button)
+        else:
+            self.held_keys.discard(event.keysym)
+            joypad.release(button)
 
     def create_memory_view(self):
         tk.Label(self.right_frame, text="Memory Viewer", bg="#303030", fg="#00ff00", font=("Courier", 12, "bold")).pack(pady=(20, 5))
@@ -255,44 +406,13 @@ class GUI:
     def update_memory_view(self):
         if not self.cpu:
             return
-            
-        start_addr = self.current_mem_addr
-        lines = []
-        
-        # Display 8 lines of 8 bytes
-        for i in range(8):
-            row_addr = start_addr + (i * 8)
-            if row_addr > 0xFFFF:
-                break
-                
-            hex_bytes = []
-            ascii_chars = ""
-            
-            for j in range(8):
-                addr = row_addr + j
-                if addr > 0xFFFF:
-                    break
-                
-                try:
-                    val = self.bus.readByte(addr)
-                    hex_bytes.append(f"{val:02X}")
-                    
-                    # ASCII representation (replace non-printable with .)
-                    if 32 <= val <= 126:
-                        ascii_chars += chr(val)
-                    else:
-                        ascii_chars += "."
-                except Exception:
-                    hex_bytes.append("??")
-                    ascii_chars += "."
-            
-            hex_str = " ".join(hex_bytes)
-            lines.append(f"{row_addr:04X}  {hex_str:<23}  {ascii_chars}")
-            
-        view_str = "\n".join(lines)
-        
+
+        # Display 8 lines of 8 bytes, stopping at the end of the address space
+        start_addr = self.current_mem_addr & 0xFFFF
+        length = min(64, 0x10000 - start_addr)
+        view_str = hexDump(start_addr, self.bus.readRange(start_addr, length))
+
         self.hex_text.config(state="normal")
         self.hex_text.delete(1.0, tk.END)
         self.hex_text.insert(tk.END, view_str)
         self.hex_text.config(state="disabled")
-
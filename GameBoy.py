@@ -0,0 +1,42 @@
+from Bus import Bus
+from CPU import CPU
+from PPU import PPU
+from Joypad import Joypad
+from Serial import Serial
+
+
+class GameBoy:
+    """
+    Owns one complete emulator: the bus and every component attached to it.
+    Components are wired by reference, so any number of GameBoy instances can
+    live side by side in the same process.
+    """
+
+    def __init__(self, rom_bytes: bytes = None):
+        self.bus = Bus()
+        self.ppu = PPU(self.bus)
+        self.cpu = CPU(self.bus)
+        self.joypad = Joypad(self.bus)
+        self.serial = Serial(self.bus)
+
+        if rom_bytes is not None:
+            self.loadROM(rom_bytes)
+
+    def loadROM(self, rom_bytes: bytes):
+        self.bus.loadROM(rom_bytes)
+
+    def reset(self):
+        self.bus.reset()
+        self.ppu.reset()
+        self.cpu.reset()
+
+    def step(self):
+        return self.cpu.step()
+
+    def run_cycles(self, n):
+        return self.cpu.run_cycles(n)
+
+    def run_frame(self):
+        # Input is applied once per frame rather than polled per instruction
+        self.joypad.processEvents()
+        return self.cpu.run_frame()
@@ -0,0 +1,137 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+from GameBoy import GameBoy
+from Headless import runHeadless
+from PPU import DMG_COLORS
+from Screen import encodePNG
+
+# Golden frame regression testing. A ROM is run headless for a fixed number of frames and
+# the final framebuffer, reduced to 2 bit shade indices, is hashed. The hash is compared
+# against the manifest checked into tests/. Images are only written for mismatches, so a
+# passing run costs one hash per ROM instead of a pixel diff. Usage:
+#
+#   python GoldenFrames.py                 check every manifest entry whose ROM is present
+#   python GoldenFrames.py --update        record the current hashes as the new goldens
+#
+# Manifest entries are keyed by ROM path relative to a ROM root, gb-test-roms or
+# tests/roms (small synthetic ROMs checked in so some goldens are always checked):
+#   {"dmg-acid2.gb": {"frames": 60, "hash": "..."}}
+# A null hash means no golden has been recorded yet.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MANIFEST = os.path.join(BASE_DIR, "tests", "golden_frames.json")
+DEFAULT_ROM_ROOT = os.path.join(BASE_DIR, "gb-test-roms")
+TEST_ROM_ROOT = os.path.join(BASE_DIR, "tests", "roms")
+DEFAULT_ROM_ROOTS = (DEFAULT_ROM_ROOT, TEST_ROM_ROOT)
+
+# Red channel value -> shade index. The DMG palette is gray so one channel is enough.
+SHADE_LUT = np.zeros(256, dtype=np.uint8)
+for shade, (red, _, _) in enumerate(DMG_COLORS):
+    SHADE_LUT[red] = shade
+
+
+def shadeIndices(framebuffer):
+    """Reduces a (144, 160, 3) RGB framebuffer to a (144, 160) array of shades 0-3."""
+    return SHADE_LUT[framebuffer[:, :, 0]]
+
+
+def frameHash(framebuffer):
+    """BLAKE2b of the shade indices packed four pixels to a byte, as hex."""
+    shades = shadeIndices(framebuffer).reshape(-1, 4)
+    packed = (shades[:, 0] << 6) | (shades[:, 1] << 4) | (shades[:, 2] << 2) | shades[:, 3]
+    return hashlib.blake2b(packed.tobytes(), digest_size=16).hexdigest()
+
+
+def findROM(rom, roots=DEFAULT_ROM_ROOTS):
+    """The path of the manifest entry rom under the first root that has it, or None."""
+    for root in roots:
+        path = os.path.join(root, rom)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def renderROM(path, frames):
+    """Runs the ROM at path for `frames` frames and returns the final framebuffer."""
+    with open(path, "rb") as f:
+        gameboy = GameBoy(f.read())
+    runHeadless(gameboy, frames=frames)
+    return gameboy.ppu.framebuffer
+
+
+def checkFrame(framebuffer, expected, pngPath=None):
+    """
+    Returns the hash of framebuffer. When it differs from `expected` and pngPath is
+    given, the frame is written there as a PNG for inspection.
+    """
+    actual = frameHash(framebuffer)
+    if actual != expected and pngPath is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(pngPath)), exist_ok=True)
+        with open(pngPath, "wb") as f:
+            f.write(encodePNG(framebuffer))
+    return actual
+
+
+def loadManifest(path=DEFAULT_MANIFEST):
+    with open(path) as f:
+        return json.load(f)
+
+
+def saveManifest(manifest, path=DEFAULT_MANIFEST):
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check (or record) golden frame hashes")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="Golden frame manifest (JSON)")
+    parser.add_argument("--roms", action="append",
+                        help="Directory the manifest ROM paths are relative to (repeatable, default: gb-test-roms and tests/roms)")
+    parser.add_argument("--out", default="golden_failures", help="Directory for PNGs of mismatching frames")
+    parser.add_argument("--update", action="store_true", help="Record the current hashes in the manifest")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    manifest = loadManifest(args.manifest)
+    roots = args.roms or DEFAULT_ROM_ROOTS
+
+    mismatches = 0
+    for rom, entry in sorted(manifest.items()):
+        path = findROM(rom, roots)
+        if path is None:
+            print(f"SKIP     {rom}: ROM not found")
+            continue
+
+        framebuffer = renderROM(path, entry["frames"])
+        if args.update:
+            entry["hash"] = frameHash(framebuffer)
+            print(f"RECORDED {rom}: {entry['hash']}")
+            continue
+        if entry["hash"] is None:
+            print(f"SKIP     {rom}: no golden hash recorded")
+            continue
+
+        pngPath = os.path.join(args.out, os.path.splitext(rom)[0] + ".png")
+        actual = checkFrame(framebuffer, entry["hash"], pngPath)
+        if actual == entry["hash"]:
+            print(f"OK       {rom}")
+        else:
+            mismatches += 1
+            print(f"MISMATCH {rom}: {actual}, expected {entry['hash']}. Frame written to {pngPath}")
+
+    if args.update:
+        saveManifest(manifest, args.manifest)
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
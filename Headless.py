@@ -0,0 +1,86 @@
+import time
+import numpy as np
+
+from PPU import CYCLES_PER_FRAME
+from Screen import ScreenBuffer, encodePNG
+
+# Headless execution for CI and batch runs. Nothing in here touches tkinter.
+
+# Cycles run between budget checks when only a cycle or time budget is given
+CHUNK_CYCLES = CYCLES_PER_FRAME
+
+
+class HeadlessResult:
+    def __init__(self, cycles, frames, seconds, reason):
+        self.cycles = cycles
+        self.frames = frames
+        self.seconds = seconds
+        # "cycles", "frames", "seconds", "serial" (a serial sink requested a stop),
+        # "breakpoint" (an opcode trap stopped the CPU) or "locked" (CPU stopped making progress)
+        self.reason = reason
+
+    def __repr__(self):
+        return (f"HeadlessResult(cycles={self.cycles}, frames={self.frames}, "
+                f"seconds={self.seconds:.3f}, reason={self.reason!r})")
+
+
+def runHeadless(gameboy, cycles=None, frames=None, seconds=None, pacer=None):
+    """
+    Runs the emulator without a display until the first budget is used up.
+    At least one of cycles, frames or seconds must be given. Frames are counted
+    as calls to run_frame, so a frame budget also works with the LCD turned off.
+    With a FramePacer the run is throttled to its speed, otherwise it runs flat out.
+    A serial sink returning True (e.g. a PatternSink seeing "Passed") or an opcode trap
+    (CPU.setTrap) ends the run early.
+    Returns a HeadlessResult.
+    """
+    if cycles is None and frames is None and seconds is None:
+        raise ValueError("At least one of cycles, frames or seconds is required")
+
+    cpu = gameboy.cpu
+    gameboy.serial.stopRequested = False
+    start = time.perf_counter()
+    deadline = start + seconds if seconds is not None else None
+
+    executed = 0
+    framesRun = 0
+    reason = None
+    while reason is None:
+        if cycles is not None and executed >= cycles:
+            reason = "cycles"
+        elif frames is not None and framesRun >= frames:
+            reason = "frames"
+        elif deadline is not None and time.perf_counter() >= deadline:
+            reason = "seconds"
+        else:
+            if frames is not None:
+                spent = gameboy.run_frame()
+                framesRun += 1
+            else:
+                chunk = CHUNK_CYCLES if cycles is None else min(CHUNK_CYCLES, cycles - executed)
+                spent = cpu.run_cycles(chunk)
+
+            executed += spent
+            if gameboy.serial.stopRequested:
+                reason = "serial"
+            elif cpu.breakpoint is not None:
+                reason = "breakpoint"
+            elif spent == 0:
+                reason = "locked"
+            elif pacer is not None:
+                pacer.wait(spent)
+
+    return HeadlessResult(executed, framesRun, time.perf_counter() - start, reason)
+
+
+def dumpFramebuffer(ppu, path):
+    """Writes the PPU framebuffer as raw numpy (.npy), a PNG (.png) or a binary PPM image (anything else)."""
+    if str(path).endswith(".npy"):
+        np.save(path, ppu.framebuffer)
+        return
+
+    with open(path, "wb") as f:
+        if str(path).endswith(".png"):
+            f.write(encodePNG(ppu.framebuffer))
+        else:
+            f.write(ScreenBuffer().update(ppu.framebuffer))
@@ -0,0 +1,184 @@
+from Registers import Byte
+
+# Byte signatures of the memcpy/memset loops commonly found in game code.
+# Each loop is recognized at its entry PC (the first byte of the loop body).
+
+# LD A,(HL+) ; LD (DE),A ; INC DE ; DEC BC ; LD A,B ; OR C ; JR NZ,-8
+COPY_LOOP_BC = bytes([0x2A, 0x12, 0x13, 0x0B, 0x78, 0xB1, 0x20, 0xF8])
+# LD A,(HL+) ; LD (DE),A ; INC DE ; DEC BC ; LD A,C ; OR B ; JR NZ,-8
+COPY_LOOP_CB = bytes([0x2A, 0x12, 0x13, 0x0B, 0x79, 0xB0, 0x20, 0xF8])
+
+# LD (HL+),A ; DEC B ; JR NZ,-4
+FILL_LOOP_INC_B = bytes([0x22, 0x05, 0x20, 0xFC])
+# LD (HL+),A ; DEC C ; JR NZ,-4
+FILL_LOOP_INC_C = bytes([0x22, 0x0D, 0x20, 0xFC])
+# LD (HL-),A ; DEC B ; JR NZ,-4
+FILL_LOOP_DEC_B = bytes([0x32, 0x05, 0x20, 0xFC])
+# LD (HL-),A ; DEC C ; JR NZ,-4
+FILL_LOOP_DEC_C = bytes([0x32, 0x0D, 0x20, 0xFC])
+
+# Maps signature to (kind, parameter). For fills the parameter is (counter register, HL step)
+IDIOMS = {
+    COPY_LOOP_BC:       ("copy", None),
+    COPY_LOOP_CB:       ("copy", None),
+    FILL_LOOP_INC_B:    ("fill", ("B", 1)),
+    FILL_LOOP_INC_C:    ("fill", ("C", 1)),
+    FILL_LOOP_DEC_B:    ("fill", ("B", -1)),
+    FILL_LOOP_DEC_C:    ("fill", ("C", -1)),
+}
+
+JR_NZ = 0x20
+
+
+class IdiomRecognizer:
+    """
+    Recognizes copy and clear loops at their entry PC and executes the whole
+    loop as a single numpy slice copy/fill.
+
+    The final register, flag and cycle results are identical to stepping the
+    loop one instruction at a time. Loops are only bulk executed when every
+    byte touched lives in plain memory (ROM as a source, VRAM, External RAM,
+    WRAM, Echo RAM or HRAM) and does not cross a region boundary; anything
+    else falls back to normal stepping.
+    """
+
+    def __init__(self, cpu, bus):
+        self.cpu = cpu
+        self.bus = bus
+        self.enabled = True
+
+        # First opcode of every known signature, used by CPU.step as a cheap pre-filter
+        self.heads = frozenset(sig[0] for sig in IDIOMS)
+        self._maxLength = max(len(sig) for sig in IDIOMS)
+
+        # ROM is immutable, so matches at ROM addresses are remembered. RAM code is re-checked.
+        self._romCache = {}
+
+        # Cycle costs are derived from the opcode table so they always agree with step()
+        self._loopCycles = {}
+        for sig in IDIOMS:
+            body = 0
+            for op in sig[:-2]:
+                body += cpu.lr35902_opCodes[op][2][0]
+            taken, notTaken = cpu.lr35902_opCodes[JR_NZ][2]
+            self._loopCycles[sig] = (body + taken, body + notTaken)
+
+    def match(self, pc):
+        pc = int(pc)
+        if pc in self._romCache:
+            return self._romCache[pc]
+
+        region = self.bus.getMemoryRegion(pc)
+        if region is None:
+            return None
+        mem, offset, available, writable = region
+
+        found = None
+        if available > 0:
+            code = mem[offset:offset + min(available, self._maxLength)].tobytes()
+            for sig in IDIOMS:
+                if code.startswith(sig):
+                    found = sig
+                    break
+
+        if not writable:
+            self._romCache[pc] = found
+        return found
+
+    def tryExecute(self, pc):
+        """
+        Executes the loop starting at pc in bulk.
+        Returns the number of cycles consumed, or None if the loop was not handled.
+        """
+        if not self.enabled:
+            return None
+
+        sig = self.match(pc)
+        if sig is None:
+            return None
+
+        kind, param = IDIOMS[sig]
+        if kind == "copy":
+            iterations = self._copy(pc, len(sig))
+        else:
+            iterations = self._fill(pc, len(sig), *param)
+
+        if iterations is None:
+            return None
+
+        loopTaken, loopExit = self._loopCycles[sig]
+        self.cpu.CoreWords.PC = (int(pc) + len(sig)) & 0xFFFF
+        return loopTaken * (iterations - 1) + loopExit
+
+    def _overlapsCode(self, pc, length, mem, offset, count):
+        # Self-modifying loops have to be stepped. Compared as offsets into the backing
+        # array, so a write through echo RAM into the WRAM holding the loop is caught too
+        code = self.bus.getMemoryRegion(pc)
+        if code is None or code[0] is not mem:
+            return False
+        return offset < code[1] + length and code[1] < offset + count
+
+    def _copy(self, pc, length):
+        regs = self.cpu.CoreWords
+        count = int(regs.BC) or 0x10000
+        src = int(regs.HL)
+        dst = int(regs.DE)
+
+        srcRegion = self.bus.getMemoryRegion(src)
+        dstRegion = self.bus.getMemoryRegion(dst)
+        if srcRegion is None or dstRegion is None:
+            return None
+
+        srcMem, srcOff, srcAvail, _ = srcRegion
+        dstMem, dstOff, dstAvail, dstWritable = dstRegion
+        if not dstWritable or srcAvail < count or dstAvail < count:
+            return None
+
+        # A forward byte copy into a destination that starts inside the source
+        # replicates data, which a slice copy does not. Leave those to the CPU.
+        if srcMem is dstMem and srcOff < dstOff < srcOff + count:
+            return None
+        if self._overlapsCode(pc, length, dstMem, dstOff, count):
+            return None
+
+        dstMem[dstOff:dstOff + count] = srcMem[srcOff:srcOff + count]
+
+        # Loop exits once BC reaches zero: A = B | C = 0, OR clears N, H and C
+        regs.HL = (src + count) & 0xFFFF
+        regs.DE = (dst + count) & 0xFFFF
+        regs.BC = 0
+        self.cpu.CoreReg.A = 0
+        flags = self.cpu.Flags
+        flags.z = 1
+        flags.n = 0
+        flags.h = 0
+        flags.c = 0
+        return count
+
+    def _fill(self, pc, length, counter, direction):
+        cpuRegs = self.cpu.CoreReg
+        regs = self.cpu.CoreWords
+        count = int(getattr(cpuRegs, counter)) or 0x100
+        hl = int(regs.HL)
+
+        start = hl if direction > 0 else hl - count + 1
+        if start < 0:
+            return None
+
+        region = self.bus.getMemoryRegion(start)
+        if region is None:
+            return None
+        mem, offset, available, writable = region
+        if not writable or available < count or self._overlapsCode(pc, length, mem, offset, count):
+            return None
+
+        mem[offset:offset + count] = Byte(cpuRegs.A)
+
+        # Final DEC takes the counter from 1 to 0: Z and N set, no half borrow, C untouched
+        regs.HL = (hl + direction * count) & 0xFFFF
+        setattr(cpuRegs, counter, 0)
+        flags = self.cpu.Flags
+        flags.z = 1
+        flags.n = 1
+        flags.h = 0
+        return count
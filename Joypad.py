@@ -0,0 +1,88 @@
+import queue
+
+# Buttons as (group, bit). The direction group is read when P1 bit 4 is low,
+# the action group when P1 bit 5 is low. A low bit means pressed.
+DIRECTIONS = 0
+ACTIONS = 1
+
+BUTTONS = {
+    "RIGHT":  (DIRECTIONS, 0x01),
+    "LEFT":   (DIRECTIONS, 0x02),
+    "UP":     (DIRECTIONS, 0x04),
+    "DOWN":   (DIRECTIONS, 0x08),
+    "A":      (ACTIONS, 0x01),
+    "B":      (ACTIONS, 0x02),
+    "SELECT": (ACTIONS, 0x04),
+    "START":  (ACTIONS, 0x08),
+}
+
+SELECT_DIRECTIONS = 0x10
+SELECT_ACTIONS = 0x20
+
+JOYPAD_INTERRUPT = 0x10
+
+
+class Joypad:
+    """
+    The P1 (0xFF00) register. Button events may be posted from any thread with
+    press()/release(); they are applied by processEvents(), which the emulator calls
+    once per frame. A button line going from high to low raises the joypad interrupt
+    and wakes the CPU from STOP.
+    """
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.bus.joypad = self
+        self.events = queue.SimpleQueue()
+        self.reset()
+
+    def reset(self):
+        # Pressed buttons per group, 1 = pressed
+        self.state = [0, 0]
+        # P1 bits 4-5 as last written
+        self.select = SELECT_DIRECTIONS | SELECT_ACTIONS
+        while not self.events.empty():
+            self.events.get_nowait()
+
+    def press(self, button):
+        self.events.put((button, True))
+
+    def release(self, button):
+        self.events.put((button, False))
+
+    def processEvents(self):
+        if self.events.empty():
+            return
+        before = self.lines()
+        while not self.events.empty():
+            button, pressed = self.events.get_nowait()
+            group, bit = BUTTONS[button]
+            if pressed:
+                self.state[group] |= bit
+            else:
+                self.state[group] &= ~bit
+        self._edge(before)
+
+    def lines(self):
+        """Bits 0-3 of P1: low for each pressed button in a selected group."""
+        pressed = 0
+        if not self.select & SELECT_DIRECTIONS:
+            pressed |= self.state[DIRECTIONS]
+        if not self.select & SELECT_ACTIONS:
+            pressed |= self.state[ACTIONS]
+        return ~pressed & 0x0F
+
+    def read(self):
+        return 0xC0 | self.select | self.lines()
+
+    def write(self, value):
+        before = self.lines()
+        self.select = int(value) & 0x30
+        self._edge(before)
+
+    def _edge(self, before):
+        if before & ~self.lines():
+            if self.bus.interrupts is not None:
+                self.bus.interrupts.request(JOYPAD_INTERRUPT)
+            if self.bus.cpu is not None:
+                self.bus.cpu.Stopped = False
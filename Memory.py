@@ -1,4 +1,3 @@
-from SingletonBase import *
 import numpy as np
 from Registers import Byte
 from Registers import Word
@@ -6,19 +5,9 @@ from Registers import Word
 
 GAMEBOY_MEMORY_SIZE = 0x10000 # 64KB
 
-class Memory(SingletonBase):
-    _initialized = False
+class Memory:
 
     def __init__(self):
-
-                # Initialization Guard
-        if hasattr(self, '_initialized') and self._initialized:
-            print(f"... Skipping Flag __init__ due to existing initialization {id(self)}")
-            return
-
-        print(f"Iniitalizing Flag instance {id(self)}")
-
-
         self.memBank = np.zeros(GAMEBOY_MEMORY_SIZE, dtype=Byte)
         self.memoryMap = {
             "ROM_BANK_0"    : (0x0000, 0x3FFF),
@@ -32,7 +21,6 @@ class Memory(SingletonBase):
             "HRAM"          : (0xFF80, 0xFFFE),
             "IE_REGISTER"   : (0xFFFF, 0xFFFF),
         }
-        self._initialized = True
         
     def loadRom(self,byte, addr):
         romN_start, romN_end = self.memoryMap["ROM_BANK_N"]
@@ -0,0 +1,143 @@
+import json
+import time
+
+from Disassembler import FORMAT_OVERRIDES, decodeCB, formatFromName
+
+# Opcode indices: 0x000-0x0FF are the base opcodes, 0x100-0x1FF the CB prefixed ones
+CB_OFFSET = 0x100
+OPCODE_COUNT = 0x200
+
+# Time one dispatch in this many per opcode. Counting is cheap; reading the clock twice
+# around every handler would distort the numbers it is measuring.
+DEFAULT_SAMPLE_EVERY = 16
+
+
+class OpcodeProfiler:
+    """
+    Opt-in per-opcode profiler. enable() swaps every entry of the CPU opcode tables for
+    a wrapper that counts executions and times every sampleEvery-th one; disable()
+    removes the wrappers again, leaving any installed by other tools in place. Nothing
+    in the CPU checks whether profiling is on, so with the profiler disabled there is
+    no overhead at all.
+
+    The CB prefix dispatch itself (opcode 0xCB) is not wrapped; its cost is attributed
+    to the CB opcode it dispatches to. Loops bulk executed by the idiom recognizer
+    bypass the tables and are not counted.
+    """
+
+    def __init__(self, cpu, sampleEvery=DEFAULT_SAMPLE_EVERY, clock=time.perf_counter):
+        self.cpu = cpu
+        self.sampleEvery = sampleEvery
+        self.clock = clock
+        self.names = [None] * OPCODE_COUNT
+        # CPU.wrapEntry handles for every wrapped entry, while enabled
+        self._handles = []
+        self.counts = [0] * OPCODE_COUNT
+        self.sampled = [0] * OPCODE_COUNT
+        self.sampledTime = [0.0] * OPCODE_COUNT
+
+    @property
+    def enabled(self):
+        return bool(self._handles)
+
+    def reset(self):
+        # Cleared in place, the installed wrappers hold references to these lists
+        self.counts[:] = [0] * OPCODE_COUNT
+        self.sampled[:] = [0] * OPCODE_COUNT
+        self.sampledTime[:] = [0.0] * OPCODE_COUNT
+
+    def enable(self):
+        if self.enabled:
+            return self
+        cpu = self.cpu
+        for opCode in list(cpu.lr35902_opCodes):
+            if opCode == 0xCB:
+                continue
+            self._wrap(cpu.lr35902_opCodes, opCode, opCode)
+        for cbOpCode in list(cpu.cb_prefix_table):
+            self._wrap(cpu.cb_prefix_table, cbOpCode, CB_OFFSET + cbOpCode)
+        cpu.profiler = self
+        return self
+
+    def disable(self):
+        for handle in self._handles:
+            self.cpu.unwrapEntry(handle)
+        self._handles = []
+        if self.cpu.profiler is self:
+            self.cpu.profiler = None
+
+    def _wrap(self, table, key, index):
+        if index < CB_OFFSET:
+            template, kind = FORMAT_OVERRIDES.get(index) or formatFromName(self.cpu.opCodeNames[index])
+            self.names[index] = template.format(kind) if kind else template
+        else:
+            self.names[index] = "CB " + decodeCB(key)
+
+        counts = self.counts
+        sampled = self.sampled
+        sampledTime = self.sampledTime
+        sampleEvery = self.sampleEvery
+        clock = self.clock
+
+        def wrap(entry):
+            func, length, cycles, flags = entry
+
+            def profiled(operandAddr):
+                count = counts[index] + 1
+                counts[index] = count
+                if count % sampleEvery:
+                    return func(operandAddr)
+                start = clock()
+                result = func(operandAddr)
+                sampledTime[index] += clock() - start
+                sampled[index] += 1
+                return result
+            return (profiled, length, cycles, flags)
+
+        self._handles.append(self.cpu.wrapEntry(table, key, wrap))
+
+    def stats(self):
+        """
+        One row per executed opcode, most expensive first. Total time is estimated from
+        the mean of the sampled dispatches times the execution count.
+        """
+        rows = []
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            mean = self.sampledTime[index] / self.sampled[index] if self.sampled[index] else 0.0
+            rows.append({
+                "opcode": f"CB {index - CB_OFFSET:02X}" if index >= CB_OFFSET else f"{index:02X}",
+                "name": self.names[index],
+                "count": count,
+                "mean_ns": mean * 1e9,
+                "estimated_seconds": mean * count,
+            })
+
+        total = sum(row["estimated_seconds"] for row in rows)
+        executed = sum(row["count"] for row in rows)
+        for row in rows:
+            row["time_percent"] = 100.0 * row["estimated_seconds"] / total if total else 0.0
+            row["count_percent"] = 100.0 * row["count"] / executed
+        rows.sort(key=lambda row: (row["estimated_seconds"], row["count"]), reverse=True)
+        return rows
+
+    def top(self, n):
+        """The n most expensive opcodes as (name, percent of estimated time)."""
+        return [(row["name"], row["time_percent"]) for row in self.stats()[:n]]
+
+    def table(self, n=None):
+        rows = self.stats()[:n]
+        lines = [f"{'Opcode':7} {'Instruction':16} {'Count':>12} {'Count%':>7} {'ns':>9} {'Time%':>7}"]
+        for row in rows:
+            lines.append(f"{row['opcode']:7} {row['name']:16} {row['count']:12d} {row['count_percent']:6.2f}% "
+                         f"{row['mean_ns']:9.0f} {row['time_percent']:6.2f}%")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """Writes the statistics as JSON (.json) or as the text table (anything else)."""
+        with open(path, "w") as f:
+            if str(path).endswith(".json"):
+                json.dump({"sample_every": self.sampleEvery, "opcodes": self.stats()}, f, indent=2)
+            else:
+                f.write(self.table() + "\n")
@@ -1,5 +1,3 @@
-from SingletonBase import *
-
 from Registers import Byte
 from Registers import Word
 from Registers import RegByte
@@ -7,6 +5,7 @@ from Registers import RegWord
 from Registers import Flag
 from Registers import InterruptMask
 import numpy as np
+import time
 
 from Bus import Bus
 
@@ -15,21 +14,22 @@ CYCLES_PER_SCANLINE = 456
 VISIBLE_SCANLINES = 144
 VBLANK_SCANLINES = 10
 TOTAL_SCANLINES = VISIBLE_SCANLINES + VBLANK_SCANLINES
+CYCLES_PER_FRAME = CYCLES_PER_SCANLINE * TOTAL_SCANLINES
 
+# RGB for each DMG shade: 0 = White, 1 = Light Gray, 2 = Dark Gray, 3 = Black
+DMG_COLORS = (
+    (255, 255, 255),
+    (192, 192, 192),
+    (96, 96, 96),
+    (0, 0, 0),
+)
 
-class PPU(SingletonBase):
-    _initialized = False
-
-    def __init__(self):
-
-        # Initialization Guard
-        if hasattr(self, '_initialized') and self._initialized:
-            print(f"... Skipping PPU __init__ due to existing initialization {id(self)}")
-            return
 
-        print(f"Iniitalizing PPU instance {id(self)}")
+class PPU:
 
-        self.Bus = Bus()
+    def __init__(self, bus = None):
+        self.Bus = bus if bus is not None else Bus()
+        self.Bus.ppu = self
 
         # PPU Registers
         self.registers = {
@@ -49,10 +49,14 @@ class PPU(SingletonBase):
 
         self.oam = np.zeros((0xA0), dtype=Byte)
         self.vram = np.zeros((0x2000), dtype=Byte)
+        self.framebuffer = np.zeros((144, 160, 3), dtype=np.uint8)
 
 
         self.cycleCounter = 0
-        self._initialized = True
+        # Number of frames completed (incremented on entering VBlank)
+        self.frameCount = 0
+        # Seconds spent rendering scanlines, sampled by the performance HUD
+        self.renderTime = 0.0
 
     def step(self, cycles):
         # Check if LCD is enabled (Bit 7 of LCDC)
@@ -64,57 +68,57 @@ class PPU(SingletonBase):
 
         self.cycleCounter += cycles
 
-        current_mode = self.STAT & 0x03
+        # A single call may cover several scanlines (e.g. after a bulk executed loop)
+        while True:
+            if self.LY >= VISIBLE_SCANLINES:
+                # VBlank (Mode 1)
+                self.STAT = (self.STAT & 0xFC) | 0x01
 
-        if self.LY >= 144:
-            # VBlank (Mode 1)
-            mode = 1
-            self.STAT = (self.STAT & 0xFC) | 0x01
-            
-            # Check for end of scanline
-            if self.cycleCounter >= 456:
-                self.cycleCounter -= 456
+                # Check for end of scanline
+                if self.cycleCounter < CYCLES_PER_SCANLINE:
+                    return
+                self.cycleCounter -= CYCLES_PER_SCANLINE
                 self.LY += 1
-                
+
                 if self.LY > 153:
                     self.LY = 0
                     # End of VBlank, start of new frame
                     # Reset to Mode 2 (OAM Scan)
                     self.STAT = (self.STAT & 0xFC) | 0x02
-        else:
-            # Visible Scanlines
-            if self.cycleCounter < 80:
-                # Mode 2 (OAM Scan)
-                mode = 2
-                self.STAT = (self.STAT & 0xFC) | 0x02
-            elif self.cycleCounter < 252: # 80 + 172
-                # Mode 3 (Drawing)
-                mode = 3
-                self.STAT = (self.STAT & 0xFC) | 0x03
             else:
-                # Mode 0 (HBlank)
-                mode = 0
-                self.STAT = (self.STAT & 0xFC) | 0x00
-                
-            # Check for end of scanline
-            if self.cycleCounter >= 456:
-                self.cycleCounter -= 456
-                self.LY += 1
-                
-                # Render the line we just finished
+                # Visible Scanlines
+                if self.cycleCounter < CYCLES_PER_SCANLINE:
+                    if self.cycleCounter < 80:
+                        # Mode 2 (OAM Scan)
+                        self.STAT = (self.STAT & 0xFC) | 0x02
+                    elif self.cycleCounter < 252: # 80 + 172
+                        # Mode 3 (Drawing)
+                        self.STAT = (self.STAT & 0xFC) | 0x03
+                    else:
+                        # Mode 0 (HBlank)
+                        self.STAT = (self.STAT & 0xFC) | 0x00
+                    return
+
+                # End of scanline: render the line we just finished before moving on
+                renderStart = time.perf_counter()
                 self.renderScanline()
-                
-                if self.LY == 144:
+                self.renderTime += time.perf_counter() - renderStart
+                self.cycleCounter -= CYCLES_PER_SCANLINE
+                self.LY += 1
+
+                if self.LY == VISIBLE_SCANLINES:
                     # Enter VBlank
                     self.STAT = (self.STAT & 0xFC) | 0x01
+                    self.frameCount += 1
                     # Request VBlank Interrupt (Bit 0 of IF)
                     if_reg = self.Bus.readByte(0xFF0F)
                     self.Bus.writeByte(0xFF0F, if_reg | 0x01)
 
     def reset(self):
         self.cycleCounter = 0
-        self.LY = 0
-        self.STAT = 0
+        self.frameCount = 0
+        for addr in self.registers:
+            self.registers[addr] = Byte(0)
         self.vram = np.zeros((0x2000), dtype=Byte)
         self.oam = np.zeros((0xA0), dtype=Byte)
         # Framebuffer: 160x144 pixels, storing RGB values (3 bytes per pixel)
@@ -157,7 +161,7 @@ class PPU(SingletonBase):
             tile_address = tile_map_base + (tile_row * 32) + tile_col
             
             # Get the tile index
-            tile_index = self.vram[tile_address]
+            tile_index = int(self.vram[tile_address])
             
             # Calculate the address of the tile data
             if is_signed_addressing:
@@ -199,15 +203,7 @@ class PPU(SingletonBase):
             palette_color = (self.BGP >> (color_id * 2)) & 0x03
             
             # Map palette_color (0-3) to RGB
-            # 0 = White, 1 = Light Gray, 2 = Dark Gray, 3 = Black
-            colors = [
-                [255, 255, 255], # 0: White
-                [192, 192, 192], # 1: Light Gray
-                [96, 96, 96],    # 2: Dark Gray
-                [0, 0, 0]        # 3: Black
-            ]
-            
-            self.framebuffer[self.LY, x] = colors[palette_color]
+            self.framebuffer[self.LY, x] = DMG_COLORS[palette_color]
 
     def renderFrame(self):
         # Placeholder for full frame rendering if needed
@@ -0,0 +1,75 @@
+import time
+
+from FramePacer import CPU_CLOCK_HZ
+
+# How often the HUD samples the counters
+SAMPLE_INTERVAL = 1.0
+
+
+class PerfMonitor:
+    """
+    Turns the cumulative counters kept by the core (CPU.cycles, CPU.instructions,
+    PPU.frameCount, PPU.renderTime) plus the emulation and GUI busy times into rates
+    over the time since the previous sample. Sampling is meant to happen about once a
+    second, so the counters themselves are the only per-instruction cost.
+    """
+
+    def __init__(self, gameboy, clock=time.perf_counter):
+        self.gameboy = gameboy
+        self.clock = clock
+        self._last = None
+        self.sample()
+
+    def _counters(self, emulationTime, guiTime):
+        cpu = self.gameboy.cpu
+        ppu = self.gameboy.ppu
+        return (self.clock(), cpu.cycles, cpu.instructions, ppu.frameCount,
+                ppu.renderTime, emulationTime, guiTime)
+
+    def sample(self, emulationTime=0.0, guiTime=0.0):
+        """
+        emulationTime and guiTime are cumulative seconds spent emulating and drawing.
+        Returns the rates since the last call, or None on the first call or after the
+        counters went backwards (a reset).
+        """
+        now = self._counters(emulationTime, guiTime)
+        last, self._last = self._last, now
+        if last is None:
+            return None
+
+        elapsed, cycles, instructions, frames, render, emulation, gui = (b - a for a, b in zip(last, now))
+        if elapsed <= 0 or cycles < 0 or instructions < 0 or frames < 0:
+            return None
+
+        cpuTime = max(emulation - render, 0.0)
+        stats = {
+            "mips": instructions / elapsed / 1e6,
+            "fps": frames / elapsed,
+            "realtime_percent": 100.0 * cycles / CPU_CLOCK_HZ / elapsed,
+            "cpu_percent": 100.0 * cpuTime / elapsed,
+            "ppu_percent": 100.0 * render / elapsed,
+            "gui_percent": 100.0 * gui / elapsed,
+            "top": None,
+        }
+
+        profiler = self.gameboy.cpu.profiler
+        if profiler is not None:
+            top = profiler.top(1)
+            if top:
+                stats["top"] = top[0]
+        return stats
+
+
+def formatStats(stats):
+    """Formats a PerfMonitor sample as the lines shown in the HUD."""
+    if stats is None:
+        return ["MIPS --   FPS --   Speed --", "CPU --  PPU --  GUI --"]
+
+    lines = [
+        f"MIPS {stats['mips']:.2f}  FPS {stats['fps']:.1f}  Speed {stats['realtime_percent']:.0f}%",
+        f"CPU {stats['cpu_percent']:.0f}%  PPU {stats['ppu_percent']:.0f}%  GUI {stats['gui_percent']:.0f}%",
+    ]
+    if stats["top"] is not None:
+        name, share = stats["top"]
+        lines.append(f"Top {name} {share:.0f}%")
+    return lines
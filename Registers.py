@@ -1,5 +1,4 @@
 import numpy as np
-from SingletonBase import SingletonBase
 
 Byte = np.uint8
 Word = np.uint16
@@ -7,25 +6,14 @@ Word = np.uint16
 INIT_STACK_POINTER = 0xFFFE
 INIT_PROG_COUNTER = 0x0100 # Post Boot ROM program counter. Entry point for the game cartridge
 
-class Flag(SingletonBase):
-    _initialized = False # Flag to ensure __init__ runs only once
-
+class Flag:
     def __init__(self):
-
-        # Initialization Guard
-        if hasattr(self, '_initialized') and self._initialized:
-            print(f"... Skipping Flag __init__ due to existing initialization {id(self)}")
-            return
-
-        print(f"Iniitalizing Flag instance {id(self)}")
-
         # Initializing for DMG post bootstrap ROM. These values may differ per version of gameboy and game boy color
         self._z = 1
         self._n = 0
         self._h = 1
         self._c = 1
         self._flag = Byte(self.z << 7 | self.n << 6 | self.h << 5 | self.c << 4)
-        self._initialized = True
 
   
     
@@ -82,24 +70,9 @@ class Flag(SingletonBase):
             raise ValueError(f"bit = {bit}: Bit must be [0|1]")
         self._z = bit
 
-class RegByte(SingletonBase):
-    _initialized = False # Flag to ensure __init__ runs only once
-
+class RegByte:
     def __init__(self):
-        """
-        Initializes the instance state *only the first time*.
-        """
-        # Check if this specific instance has already been initialized
-
-        # Initialization Guard
-        if hasattr(self, '_initialized') and self._initialized:
-            print(f"... Skipping Flag __init__ due to existing initialization {id(self)}")
-            return
-
-
-        print(f"Iniitalizing RegByte instance {id(self)}")
-        print(f"Initializing to magical post boot ROM values.")
-        self._initialized = True
+        # Initializing to magical post boot ROM values.
         self._A = Byte(0X01)
         self._B = Byte(0x00)
         self._C = Byte(0x13)
@@ -158,25 +131,15 @@ class RegByte(SingletonBase):
     def L(self, value):
         self._L = Byte(value)
 
-class RegWord(SingletonBase):
+class RegWord:
 
     # Main Question with this class, do the words here need to track their respective bytes real time?  YES
     # Seemingly would need real time, pointer like behavior. 
     # TODO To satisfy this, implement the subject/observer data pattern of RegByte instance
 
-    _initialized = False # Flag to ensure __init__ runs only once
-
     def __init__(self, byte : RegByte, flag : Flag):
-        # Initialization Guard
-        if hasattr(self, '_initialized') and self._initialized:
-            print(f"... Skipping RegWord __init__ due to existing initialization {id(self)}")
-            return
-
-        print(f"Iniitalizing Flag instance {id(self)}")
-
         self.byte = byte
         self.flag = flag
-        self._initialized = True
 
         # self._AF = Word((self.byte.A << 8) | self.flag.F) # Need to explicitly tell python to access the flags property
         # self._BC = Word((self.byte.B << 8) | self.byte.C)
@@ -256,20 +219,10 @@ class RegWord(SingletonBase):
         self.byte.H = (word & 0xFF00) >> 8
         self.byte.L = (word & 0xFF)
 
-class InterruptMask(SingletonBase):
-    _initialized = False # Flag to ensure __init__ runs only once
-
+class InterruptMask:
     def __init__(self, memoryInstance):
-        # Initialization Guard
-        if hasattr(self, '_initialized') and self._initialized:
-            print(f"... Skipping Flag __init__ due to existing initialization {id(self)}")
-            return
-
-        print(f"Iniitalizing Flag instance {id(self)}")
-
         self.memory = memoryInstance
         self._ime = 0
-        self._initialized = True
 
         self.VBLANK_POS = 0x01
         self.LCD_STAT_POS = 0x02
@@ -277,6 +230,7 @@ class InterruptMask(SingletonBase):
         self.SERIAL_POS = 0x08
         self.JOYPAD_POS = 0x10
 
+        # IF (0xFF0F) and IE (0xFFFF) live here; the Bus routes accesses to them.
         self._IE = 0x00
         self._IF = 0x01
         self._vblank = 0
@@ -285,6 +239,31 @@ class InterruptMask(SingletonBase):
         self._serial = 0
         self._joypad = 0
 
+        # Instructions left before a scheduled EI takes effect (0 = nothing scheduled)
+        self._imeDelay = 0
+
+        # Derived state, recomputed only when IF, IE, IME or the EI delay change:
+        #   requested - enabled interrupts that are flagged (also wakes HALT)
+        #   pending   - the CPU has to look at interrupts before the next instruction
+        self.requested = 0
+        self.pending = False
+        self._update()
+
+    def reset(self):
+        self._IE = 0x00
+        self._IF = 0x01
+        self._ime = 0
+        self._imeDelay = 0
+        self._update()
+
+    def _update(self):
+        self.requested = self._IE & self._IF & 0x1F
+        self.pending = bool(self._imeDelay or (self._ime and self.requested))
+
+    def request(self, interruptBit):
+        self._IF |= interruptBit
+        self._update()
+
     @property
     def IME(self):
         return self._ime
@@ -293,25 +272,34 @@ class InterruptMask(SingletonBase):
         if not (bit == 1 or bit == 0):
             raise ValueError(f"bit = {bit}: Bit must be [0|1]")
         self._ime = bit
+        self._update()
+
+    # Number of instructions to execute before IME is set by EI. Writing 0 cancels it (DI).
+    @property
+    def imeDelay(self):
+        return self._imeDelay
+    @imeDelay.setter
+    def imeDelay(self, count):
+        self._imeDelay = count
+        self._update()
 
     @property
     def IE(self):
-        self._IE = self.memory.readByte(0xFFFF)
         return self._IE
 
     @IE.setter
     def IE(self, byte):
-        self._IE = byte
-        self.memory.writeByte(byte, 0xFFFF)
+        self._IE = int(byte) & 0xFF
+        self._update()
 
+    # The upper 3 bits of IF are unused and read back as 1
     @property
     def IF(self):
-        self._IF = self.memory.readByte(0xFF0F)
-        return self._IF
+        return self._IF | 0xE0
     @IF.setter
     def IF(self, byte):
-        self._IF = byte
-        self.memory.writeByte(byte, 0xFF0F)
+        self._IF = int(byte) & 0x1F
+        self._update()
 
 
     @property
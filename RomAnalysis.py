@@ -0,0 +1,303 @@
+import hashlib
+import os
+import pickle
+
+# Static (recursive descent) disassembly of the ROM mapped at 0x0000-0x7FFF.
+#
+# Starting from the cartridge entry point, the RST vectors and the interrupt vectors,
+# every reachable instruction is decoded once and grouped into basic blocks. Blocks are
+# connected by typed edges forming the control flow graph. The result is pickled to a
+# cache file keyed by the SHA-1 of the ROM so later loads skip the analysis entirely.
+
+# Bump when the analysis output changes so stale cache files are ignored
+ANALYSIS_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sdrboy")
+
+ENTRY_POINT = 0x0100
+RST_VECTORS = (0x00, 0x08, 0x10, 0x18, 0x20, 0x28, 0x30, 0x38)
+INTERRUPT_VECTORS = (0x40, 0x48, 0x50, 0x58, 0x60)
+
+# Opcode classes used to end basic blocks
+JUMPS = {0xC3: "a16", 0x18: "r8"}
+CONDITIONAL_JUMPS = {0xC2: "a16", 0xCA: "a16", 0xD2: "a16", 0xDA: "a16",
+                     0x20: "r8", 0x28: "r8", 0x30: "r8", 0x38: "r8"}
+CALLS = {0xCD}
+CONDITIONAL_CALLS = {0xC4, 0xCC, 0xD4, 0xDC}
+RSTS = {0xC7 + 8 * i: 8 * i for i in range(8)}
+RETURNS = {0xC9, 0xD9}
+CONDITIONAL_RETURNS = {0xC0, 0xC8, 0xD0, 0xD8}
+JP_HL = 0xE9
+
+# Jump table heuristics: a table entry must point at code past the cartridge header
+TABLE_MIN_TARGET = 0x0150
+TABLE_MAX_ENTRIES = 256
+# A call target is a jump table dispatcher if straight line code from it reaches JP HL
+DISPATCHER_SEARCH_LIMIT = 32
+
+# Edge kinds
+FALL = "fall"
+JUMP = "jump"
+BRANCH = "branch"
+CALL = "call"
+TABLE = "table"
+
+
+class BasicBlock:
+    """Straight line code from start up to (not including) end."""
+
+    __slots__ = ("start", "end", "instructions", "successors")
+
+    def __init__(self, start):
+        self.start = start
+        self.end = start
+        # (addr, length, line)
+        self.instructions = []
+        # (edge kind, target address)
+        self.successors = []
+
+    def __repr__(self):
+        return f"BasicBlock(${self.start:04X}-${self.end:04X}, {len(self.instructions)} instructions)"
+
+
+class RomAnalysis:
+    def __init__(self, romHash):
+        self.romHash = romHash
+        self.version = ANALYSIS_VERSION
+        # start address -> BasicBlock
+        self.blocks = {}
+        # Call targets and vectors that were reached
+        self.functions = set()
+        # table address -> list of targets
+        self.jumpTables = {}
+        # Targets outside the ROM (code copied to RAM, e.g. the OAM DMA routine in HRAM)
+        self.externalTargets = set()
+        # Addresses that were reached but do not hold a legal instruction
+        self.illegal = set()
+        # instruction address -> block start
+        self._owner = {}
+
+    def blockAt(self, addr):
+        """Returns the basic block containing the instruction at addr, or None."""
+        start = self._owner.get(addr)
+        return self.blocks[start] if start is not None else None
+
+    def predecessors(self, start):
+        return [block.start for block in self.blocks.values()
+                if any(target == start for _, target in block.successors)]
+
+    def lines(self):
+        """Every decoded instruction as (addr, length, line), in address order."""
+        instructions = [ins for block in self.blocks.values() for ins in block.instructions]
+        instructions.sort()
+        return instructions
+
+
+class RomAnalyzer:
+    def __init__(self, rom, disassembler, romBank=1):
+        self.rom = bytes(rom)
+        self.disassembler = disassembler
+        self.romBank = romBank
+        self.analysis = RomAnalysis(hashlib.sha1(self.rom).hexdigest())
+        self._worklist = []
+
+    def romOffset(self, addr):
+        if addr <= 0x3FFF:
+            return addr
+        return self.romBank * 0x4000 + (addr - 0x4000)
+
+    def isCode(self, addr):
+        return 0 <= addr <= 0x7FFF and self.romOffset(addr) < len(self.rom)
+
+    def byteAt(self, addr):
+        offset = self.romOffset(addr)
+        return self.rom[offset] if offset < len(self.rom) else 0xFF
+
+    def fetch(self, addr):
+        """Returns the raw bytes of the instruction at addr, or None for illegal opcodes."""
+        length = self.disassembler.instructionLength(self.byteAt(addr))
+        if length is None or not self.isCode(addr + length - 1):
+            return None
+        offset = self.romOffset(addr)
+        return self.rom[offset:offset + length]
+
+    def run(self):
+        for addr in (ENTRY_POINT,) + RST_VECTORS + INTERRUPT_VECTORS:
+            if self.isCode(addr):
+                self.analysis.functions.add(addr)
+                self._worklist.append(addr)
+
+        while self._worklist:
+            self.visit(self._worklist.pop())
+
+        return self.analysis
+
+    def addTarget(self, target):
+        if self.isCode(target):
+            self._worklist.append(target)
+        else:
+            self.analysis.externalTargets.add(target)
+
+    def visit(self, start):
+        analysis = self.analysis
+        if start in analysis.blocks:
+            return
+        if start in analysis._owner:
+            self.split(analysis._owner[start], start)
+            return
+
+        block = BasicBlock(start)
+        analysis.blocks[start] = block
+        addr = start
+        while True:
+            if addr != start and (addr in analysis.blocks or addr in analysis._owner):
+                # Ran into code that was already decoded
+                block.successors.append((FALL, addr))
+                self.addTarget(addr)
+                break
+
+            raw = self.fetch(addr)
+            if raw is None:
+                analysis.illegal.add(addr)
+                break
+
+            block.instructions.append((addr, len(raw), self.disassembler.formatInstruction(addr, raw)))
+            analysis._owner[addr] = start
+            nextAddr = addr + len(raw)
+            block.end = nextAddr
+
+            if self.endBlock(block, raw, nextAddr):
+                break
+            addr = nextAddr
+
+    def endBlock(self, block, raw, nextAddr):
+        """Adds the successors of a control flow instruction. Returns True if it ends the block."""
+        opcode = raw[0]
+
+        if opcode in JUMPS or opcode in CONDITIONAL_JUMPS:
+            target = self.branchTarget(raw, nextAddr)
+            block.successors.append((JUMP if opcode in JUMPS else BRANCH, target))
+            self.addTarget(target)
+            if opcode in CONDITIONAL_JUMPS:
+                self.fallThrough(block, nextAddr)
+            return True
+
+        if opcode in CALLS or opcode in CONDITIONAL_CALLS or opcode in RSTS:
+            target = RSTS[opcode] if opcode in RSTS else raw[1] | (raw[2] << 8)
+            block.successors.append((CALL, target))
+            self.addTarget(target)
+            if self.isCode(target):
+                self.analysis.functions.add(target)
+
+            if opcode in CONDITIONAL_CALLS or not self.isDispatcher(target):
+                self.fallThrough(block, nextAddr)
+            else:
+                # The bytes after a call to a jump table dispatcher are the table itself
+                for entry in self.readJumpTable(nextAddr):
+                    block.successors.append((TABLE, entry))
+                    self.addTarget(entry)
+            return True
+
+        if opcode in CONDITIONAL_RETURNS:
+            self.fallThrough(block, nextAddr)
+            return True
+
+        return opcode in RETURNS or opcode == JP_HL
+
+    def fallThrough(self, block, nextAddr):
+        block.successors.append((FALL, nextAddr))
+        self.addTarget(nextAddr)
+
+    @staticmethod
+    def branchTarget(raw, nextAddr):
+        if len(raw) == 3:
+            return raw[1] | (raw[2] << 8)
+        offset = raw[1] - 0x100 if raw[1] & 0x80 else raw[1]
+        return (nextAddr + offset) & 0xFFFF
+
+    def isDispatcher(self, target):
+        addr = target
+        for _ in range(DISPATCHER_SEARCH_LIMIT):
+            if not self.isCode(addr):
+                return False
+            raw = self.fetch(addr)
+            if raw is None:
+                return False
+            opcode = raw[0]
+            if opcode == JP_HL:
+                return True
+            if (opcode in JUMPS or opcode in CONDITIONAL_JUMPS or opcode in CALLS or opcode in CONDITIONAL_CALLS
+                    or opcode in RSTS or opcode in RETURNS or opcode in CONDITIONAL_RETURNS):
+                return False
+            addr += len(raw)
+        return False
+
+    def readJumpTable(self, tableAddr):
+        entries = []
+        addr = tableAddr
+        while len(entries) < TABLE_MAX_ENTRIES and self.isCode(addr + 1):
+            # Stop at code that is already known to follow the table
+            if entries and (addr in self.analysis.blocks or addr in self.analysis._owner):
+                break
+            target = self.byteAt(addr) | (self.byteAt(addr + 1) << 8)
+            if not (TABLE_MIN_TARGET <= target <= 0x7FFF) or self.fetch(target) is None:
+                break
+            entries.append(target)
+            addr += 2
+
+        if entries:
+            self.analysis.jumpTables[tableAddr] = entries
+        return entries
+
+    def split(self, blockStart, addr):
+        """Splits the block starting at blockStart so that a new block starts at addr."""
+        analysis = self.analysis
+        block = analysis.blocks[blockStart]
+        index = next(i for i, ins in enumerate(block.instructions) if ins[0] == addr)
+
+        tail = BasicBlock(addr)
+        tail.instructions = block.instructions[index:]
+        tail.successors = block.successors
+        tail.end = block.end
+        for ins in tail.instructions:
+            analysis._owner[ins[0]] = addr
+        analysis.blocks[addr] = tail
+
+        block.instructions = block.instructions[:index]
+        block.end = addr
+        block.successors = [(FALL, addr)]
+
+
+def analyzeROM(rom, disassembler, romBank=1):
+    return RomAnalyzer(rom, disassembler, romBank).run()
+
+
+def loadAnalysis(rom, disassembler, cacheDir=DEFAULT_CACHE_DIR, romBank=1):
+    """
+    Returns the analysis of rom, loading it from cacheDir when a cached copy for the
+    same ROM contents exists and analyzing (then caching) it otherwise.
+    """
+    romHash = hashlib.sha1(bytes(rom)).hexdigest()
+    path = os.path.join(cacheDir, f"{romHash}-bank{romBank}-v{ANALYSIS_VERSION}.pickle")
+
+    try:
+        with open(path, "rb") as f:
+            analysis = pickle.load(f)
+        if isinstance(analysis, RomAnalysis) and analysis.romHash == romHash and analysis.version == ANALYSIS_VERSION:
+            return analysis
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+
+    analysis = analyzeROM(rom, disassembler, romBank)
+
+    try:
+        os.makedirs(cacheDir, exist_ok=True)
+        tmpPath = f"{path}.{os.getpid()}.tmp"
+        with open(tmpPath, "wb") as f:
+            pickle.dump(analysis, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpPath, path)
+    except OSError:
+        # The cache is an optimization only
+        pass
+
+    return analysis
@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+from FramePacer import CPU_CLOCK_HZ
+from GameBoy import GameBoy
+from Headless import runHeadless
+from Serial import PatternSink
+
+# Runs test ROMs headless, one per worker process. Blargg ROMs report their verdict over
+# the serial port. Mooneye ROMs execute LD B,B with a register signature in B,C,D,E,H,L,
+# which is trapped as a software breakpoint. Usage:
+#
+#   python RomHarness.py gb-test-roms/cpu_instrs/individual --json report.json --junit report.xml
+#   python RomHarness.py gb-test-roms --baseline report.json
+#   python RomHarness.py mooneye-test-suite/acceptance --mooneye
+#
+# With a baseline report only regressions (ROMs that passed before and do not now) make
+# the exit code nonzero, so known failures do not break CI.
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gb-test-roms", "cpu_instrs", "individual")
+
+# Emulated time allowed per ROM. The slowest cpu_instrs ROMs finish in well under a minute.
+DEFAULT_CYCLES = 60 * CPU_CLOCK_HZ
+# Wall clock time allowed per ROM
+DEFAULT_TIMEOUT = 600.0
+
+RESULT_PATTERNS = ("Passed", "Failed")
+
+BLARGG = "blargg"
+MOONEYE = "mooneye"
+
+# LD B,B, the Mooneye "test finished" breakpoint
+MOONEYE_BREAKPOINT = 0x40
+# B, C, D, E, H, L on success (Fibonacci numbers). Failures load 0x42 into all six.
+MOONEYE_PASS = (3, 5, 8, 13, 21, 34)
+
+PASSED = "passed"
+FAILED = "failed"
+# Ran out of cycles or wall clock time before printing a verdict
+TIMEOUT = "timeout"
+# Hit an illegal opcode
+LOCKED = "locked"
+# The emulator raised an exception
+ERROR = "error"
+
+
+def findRoms(root):
+    """Returns every .gb/.gbc file under root (or root itself if it is a file), sorted."""
+    if os.path.isfile(root):
+        return [root]
+
+    roms = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.lower().endswith((".gb", ".gbc")):
+                roms.append(os.path.join(dirpath, name))
+    roms.sort()
+    return roms
+
+
+def romId(path, root=None):
+    """
+    The ROM path relative to the test root, with / separators. Results are keyed by it:
+    suites reuse file names in different directories (mbc1/rom_512kb.gb, mbc5/rom_512kb.gb).
+    """
+    base = root if root is not None and os.path.isdir(root) else os.path.dirname(path)
+    return os.path.relpath(path, base).replace(os.sep, "/")
+
+
+def runRom(path, cycles=DEFAULT_CYCLES, seconds=DEFAULT_TIMEOUT, mode=BLARGG, root=None):
+    """Runs one ROM to its verdict and returns the result as a plain dict (it crosses a process boundary)."""
+    result = {"rom": path, "id": romId(path, root), "name": os.path.splitext(os.path.basename(path))[0],
+              "status": ERROR, "output": "", "cycles": 0, "seconds": 0.0, "message": ""}
+    start = time.perf_counter()
+    try:
+        with open(path, "rb") as f:
+            gameboy = GameBoy(f.read())
+        grade = (gradeMooneye if mode == MOONEYE else gradeBlargg)(gameboy)
+
+        run = runHeadless(gameboy, cycles=cycles, seconds=seconds)
+
+        result["cycles"] = run.cycles
+        result["status"], result["message"], result["output"] = grade()
+        if result["status"] is None:
+            if run.reason == "locked":
+                result["status"] = LOCKED
+                result["message"] = f"Illegal opcode at ${int(gameboy.cpu.CoreWords.PC):04X}"
+            else:
+                result["status"] = TIMEOUT
+                result["message"] = f"No verdict after {run.cycles} cycles ({run.reason} budget)"
+    except Exception as e:
+        result["message"] = f"{type(e).__name__}: {e}"
+        result["output"] += traceback.format_exc()
+
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+# A grader is set up on the GameBoy before the run and returns a function giving
+# (status or None without a verdict, message, output) afterwards.
+
+def gradeBlargg(gameboy):
+    sink = gameboy.serial.addSink(PatternSink(RESULT_PATTERNS))
+
+    def grade():
+        output = sink.text()
+        if sink.matched == "Passed":
+            return PASSED, "", output
+        if sink.matched == "Failed":
+            return FAILED, output.strip().splitlines()[-1], output
+        return None, "", output
+
+    return grade
+
+
+def gradeMooneye(gameboy):
+    signature = []
+
+    def onBreakpoint(cpu):
+        regs = cpu.CoreReg
+        signature[:] = [int(regs.B), int(regs.C), int(regs.D), int(regs.E), int(regs.H), int(regs.L)]
+        return True
+
+    gameboy.cpu.setTrap(MOONEYE_BREAKPOINT, onBreakpoint)
+
+    def grade():
+        if not signature:
+            return None, "", ""
+        registers = " ".join(f"{name}={value:02X}" for name, value in zip("BCDEHL", signature))
+        if tuple(signature) == MOONEYE_PASS:
+            return PASSED, "", registers
+        return FAILED, f"Register signature {registers}", registers
+
+    return grade
+
+
+def runSuite(roms, jobs=None, cycles=DEFAULT_CYCLES, seconds=DEFAULT_TIMEOUT, mode=BLARGG, root=None):
+    """
+    Runs the ROMs in parallel (jobs worker processes, default one per CPU). Results keep
+    the order of roms and are identified by their path relative to root.
+    """
+    if not roms:
+        return []
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        return [runRom(rom, cycles, seconds, mode, root) for rom in roms]
+
+    count = len(roms)
+    with ProcessPoolExecutor(max_workers=min(jobs, count)) as executor:
+        return list(executor.map(runRom, roms, [cycles] * count, [seconds] * count, [mode] * count,
+                                 [root] * count))
+
+
+def findRegressions(results, baseline):
+    """Ids of ROMs that passed in the baseline report but not in results."""
+    passedBefore = {r["id"] for r in baseline["results"] if r["status"] == PASSED}
+    return sorted(r["id"] for r in results if r["id"] in passedBefore and r["status"] != PASSED)
+
+
+def summarize(results):
+    counts = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    return counts
+
+
+def writeJson(results, path):
+    report = {"summary": summarize(results), "results": results}
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def loadJson(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def writeJUnit(results, path, suiteName="gb-test-roms"):
+    failures = sum(r["status"] in (FAILED, TIMEOUT, LOCKED) for r in results)
+    errors = sum(r["status"] == ERROR for r in results)
+    suite = ET.Element("testsuite", name=suiteName, tests=str(len(results)), failures=str(failures),
+                       errors=str(errors), time=f"{sum(r['seconds'] for r in results):.3f}")
+
+    for r in results:
+        case = ET.SubElement(suite, "testcase", classname=os.path.basename(os.path.dirname(r["rom"])) or suiteName,
+                             name=r["id"], time=f"{r['seconds']:.3f}")
+        if r["status"] == ERROR:
+            ET.SubElement(case, "error", message=r["message"]).text = r["output"]
+        elif r["status"] != PASSED:
+            ET.SubElement(case, "failure", message=r["message"] or r["status"], type=r["status"]).text = r["output"]
+        ET.SubElement(case, "system-out").text = r["output"]
+
+    ET.ElementTree(suite).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run test ROMs headless in parallel and report the results")
+    parser.add_argument("root", nargs="?", default=DEFAULT_ROOT, help="ROM file or directory searched recursively")
+    parser.add_argument("-j", "--jobs", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--cycles", type=int, default=DEFAULT_CYCLES, help="CPU cycle budget per ROM")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Wall clock seconds per ROM")
+    parser.add_argument("--json", help="Write a JSON report to this file")
+    parser.add_argument("--junit", help="Write a JUnit XML report to this file")
+    parser.add_argument("--mooneye", dest="mode", action="store_const", const=MOONEYE, default=BLARGG,
+                        help="Grade by the Mooneye LD B,B register signature instead of serial output")
+    parser.add_argument("--baseline", help="JSON report of a previous run. Only regressions against it fail the run.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    roms = findRoms(args.root)
+    if not roms:
+        print(f"No ROMs found under {args.root}")
+        return 2
+
+    start = time.perf_counter()
+    results = runSuite(roms, args.jobs, args.cycles, args.timeout, args.mode, args.root)
+    elapsed = time.perf_counter() - start
+
+    for r in results:
+        line = f"{r['status'].upper():8} {r['id']} ({r['seconds']:.1f}s)"
+        if r["message"] and r["status"] != PASSED:
+            line += f": {r['message']}"
+        print(line)
+    counts = ", ".join(f"{count} {status}" for status, count in sorted(summarize(results).items()))
+    print(f"\n{len(results)} ROMs in {elapsed:.1f}s: {counts}")
+
+    if args.json:
+        writeJson(results, args.json)
+    if args.junit:
+        writeJUnit(results, args.junit)
+
+    if args.baseline:
+        regressions = findRegressions(results, loadJson(args.baseline))
+        for rom in regressions:
+            print(f"REGRESSION {rom}")
+        return 1 if regressions else 0
+    return 0 if all(r["status"] == PASSED for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,71 +1,160 @@
 from Registers import *
 from utils import *
-from CPU import CPU
-from Bus import Bus
-from PPU import PPU
-from GUI import GUI
+from GameBoy import GameBoy
+import argparse
 import sys
 import os
 
-def main():
+def parse_args(argv=None):
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    default_rom = os.path.join(base_dir, "gb-test-roms/cpu_instrs/individual/06-ld r,r.gb")
 
-    print("=============================\nStarting Game Boy\n=============================\n")
+    parser = argparse.ArgumentParser(description="SDRBoy Game Boy emulator")
+    parser.add_argument("rom", nargs="?", default=default_rom, help="Path to the ROM file")
+    parser.add_argument("--headless", action="store_true", help="Run without the GUI (tkinter is never imported)")
+    parser.add_argument("--cycles", type=int, help="Headless: stop after this many CPU cycles")
+    parser.add_argument("--frames", type=int, help="Headless: stop after this many frames")
+    parser.add_argument("--seconds", type=float, help="Headless: stop after this much wall clock time")
+    parser.add_argument("--serial-out", help="Headless: write serial port output to this file instead of stdout")
+    parser.add_argument("--dump-frame", help="Headless: write the final framebuffer to this file (.npy, .png or .ppm)")
+    parser.add_argument("--profile", nargs="?", const="-", metavar="FILE",
+                        help="Count and time every opcode, print the table at exit or write it to FILE (.json or text)")
+    parser.add_argument("--callstack", metavar="FILE",
+                        help="Profile the emulated program's call stack, write folded stacks for flamegraphs to FILE")
+    parser.add_argument("--symbols", help="Symbol file (.sym) naming routines in the call stack profile "
+                                          "(default: the ROM path with a .sym extension, if it exists)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Record every executed instruction to FILE (binary, see Trace.py for diff and export)")
+    parser.add_argument("--coverage", metavar="FILE",
+                        help="Count executed addresses and memory reads/writes, save them to FILE (.npz) at exit")
+    parser.add_argument("--speed", type=float,
+                        help="Speed as a multiple of real time, 0 for unthrottled (default: 1 with the GUI, 0 headless)")
 
-    print("Initializing Core registers\n")
-    CoreRegisters = RegByte()
-    CoreFlags = Flag()
-    CoreWords = RegWord(CoreRegisters, CoreFlags)
+    args = parser.parse_args(argv)
+    if args.headless and args.cycles is None and args.frames is None and args.seconds is None:
+        parser.error("--headless needs at least one of --cycles, --frames or --seconds")
+    return args
 
-    print("Initializing Core components\n")
-    print("Initializing Memory\n")
-    Bus_instance = Bus()
-    CPU_instance = CPU()
-    PPU_instance = PPU()
-    
-    # Link PPU to Bus
-    Bus_instance.ppu = PPU_instance
+def run_headless(gameboy, args):
+    from Headless import runHeadless, dumpFramebuffer
+    from FramePacer import FramePacer
+    from Serial import FileSink, StreamSink
 
-    # Load ROM
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    rom_path = os.path.join(base_dir, "gb-test-roms/cpu_instrs/individual/06-ld r,r.gb")
-    
-    if len(sys.argv) > 1:
-        rom_path = sys.argv[1]
-    
-    print(f"Loading ROM: {rom_path}")
+    pacer = FramePacer(args.speed) if args.speed else None
+
+    sink = gameboy.serial.addSink(FileSink(args.serial_out) if args.serial_out else StreamSink(sys.stdout.buffer))
     try:
-        with open(rom_path, "rb") as f:
-            rom_data = f.read()
-            Bus_instance.loadROM(rom_data)
-    except FileNotFoundError:
-        print(f"Error: ROM file not found: {rom_path}")
-        return
+        result = runHeadless(gameboy, cycles=args.cycles, frames=args.frames, seconds=args.seconds, pacer=pacer)
+    finally:
+        sink.close()
+        gameboy.serial.removeSink(sink)
+
+    if args.dump_frame:
+        dumpFramebuffer(gameboy.ppu, args.dump_frame)
+
+    print(f"\nRan {result.cycles} cycles ({result.frames} frames) in {result.seconds:.3f}s, stopped on {result.reason}")
+    if pacer is not None:
+        stats = pacer.stats()
+        print(f"{stats['realtime_percent']:.1f}% of real time, frame time {stats['frame_ms']:.2f} ms, "
+              f"jitter {stats['jitter_ms']:.2f} ms, worst {stats['worst_ms']:.2f} ms")
+    return 1 if result.reason == "locked" else 0
+
+def run_gui(gameboy, speed):
+    from GUI import GUI
+    from EmulationWorker import EmulationWorker
+
+    from Serial import StreamSink
+
+    # Serial output (e.g. test ROM results) goes to the console
+    gameboy.serial.addSink(StreamSink(sys.stdout.buffer))
+
+    print("Starting Emulation Worker\n")
+    worker = EmulationWorker(gameboy, speed)
+    worker.start()
 
     print("Initializing GUI\n")
-    gui = GUI(CPU_instance, Bus_instance)
+    gui = GUI(gameboy.cpu, gameboy.bus, worker)
 
     print("Starting Main Loop\n")
     try:
-        while gui.running:
-            # Handle Execution Control
-            if not gui.paused or gui.step_requested:
-                # Step CPU
-                cycles = CPU_instance.step()
-                gui.step_requested = False
-            
-            # Update GUI
-            gui.update()
-            
-            # Handle GUI events (handled within gui.update/root.update for Tkinter)
-            
+        gui.run()
     except KeyboardInterrupt:
         pass
     except Exception as e:
         import traceback
         traceback.print_exc()
         print(f"An error occurred: {e}")
+    finally:
+        worker.stop(timeout=1.0)
+    return 0
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("=============================\nStarting Game Boy\n=============================\n")
+
+    print("Initializing Core components\n")
+    gameboy = GameBoy()
+
+    # Load ROM
+    rom_path = args.rom
+    print(f"Loading ROM: {rom_path}")
+    try:
+        with open(rom_path, "rb") as f:
+            rom_data = f.read()
+            gameboy.loadROM(rom_data)
+    except FileNotFoundError:
+        print(f"Error: ROM file not found: {rom_path}")
+        return 1
+
+    profiler = None
+    if args.profile:
+        from OpcodeProfiler import OpcodeProfiler
+        profiler = OpcodeProfiler(gameboy.cpu).enable()
+
+    call_stack = None
+    if args.callstack:
+        from CallStackProfiler import CallStackProfiler, loadSymbols, symbolsForROM
+        symbols = loadSymbols(args.symbols) if args.symbols else symbolsForROM(rom_path)
+        call_stack = CallStackProfiler(gameboy.cpu, symbols).enable()
+
+    # Before coverage, so the operand bytes the trace reads are not counted as accesses
+    trace = None
+    if args.trace:
+        from Trace import TraceRecorder
+        trace = TraceRecorder(gameboy.cpu, args.trace).enable()
+
+    coverage = None
+    if args.coverage:
+        from Coverage import Coverage
+        coverage = Coverage(gameboy.cpu).enable()
+
+    if args.headless:
+        exit_code = run_headless(gameboy, args)
+    else:
+        exit_code = run_gui(gameboy, 1.0 if args.speed is None else args.speed)
+
+    if coverage is not None:
+        coverage.disable()
+        coverage.save(args.coverage)
+
+    if trace is not None:
+        trace.disable()
+        print(f"Traced {trace.recorded} instructions to {args.trace}")
+
+    if call_stack is not None:
+        call_stack.disable()
+        call_stack.writeFolded(args.callstack)
+
+    if profiler is not None:
+        profiler.disable()
+        if args.profile == "-":
+            print(profiler.table(30))
+        else:
+            profiler.dump(args.profile)
 
     print("======================\nShutting down Game Boy\n======================")
+    return exit_code
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,208 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Bus import FlatBus
+from CPU import CPU
+
+# Runs the SM83 single step CPU tests (one JSON file per opcode, "00.json" ... "cb ff.json",
+# about 1000 cases each) against CPU on a FlatBus. Every case gives the registers and RAM
+# before and after one instruction plus the bus activity of each machine cycle:
+#
+#   {"name": "3e 0000",
+#    "initial": {"pc": 256, "sp": 65534, "a": 0, "b": 0, ..., "ime": 0, "ram": [[256, 62], [257, 18]]},
+#    "final":   {"pc": 258, ..., "ram": [[256, 62], [257, 18]]},
+#    "cycles":  [[256, 62, "r-m"], [257, 18, "r-m"]]}
+#
+# The final registers, IME, the listed RAM bytes, the cycle count (4 per machine cycle)
+# and the sequence of memory writes are compared. Files are sharded over a process pool.
+# Usage:
+#
+#   python SM83Tests.py path/to/sm83/v1
+#   python SM83Tests.py path/to/sm83/v1 --opcodes 27,cb 37 --limit 100 --json sm83.json
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sm83", "v1")
+
+REGISTERS = ("a", "f", "b", "c", "d", "e", "h", "l", "sp", "pc")
+
+# Failing cases kept per file; the counts are always complete
+MAX_REPORTED = 5
+
+
+def findTestFiles(root):
+    """Every .json file directly under root (or root itself if it is a file), sorted by opcode."""
+    if os.path.isfile(root):
+        return [root]
+    if not os.path.isdir(root):
+        return []
+    return sorted(os.path.join(root, name) for name in os.listdir(root) if name.endswith(".json"))
+
+
+def opcodeName(path):
+    """The opcode a test file covers, from its name: "3e" or "cb 37"."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def loadState(cpu, state):
+    cpu.reset()
+    bus = cpu.Bus
+    bus.memory.fill(0)
+    for addr, value in state["ram"]:
+        bus.memory[addr] = value
+    bus.writes.clear()
+
+    regs = cpu.CoreReg
+    regs.A, regs.B, regs.C, regs.D = state["a"], state["b"], state["c"], state["d"]
+    regs.E, regs.H, regs.L = state["e"], state["h"], state["l"]
+    cpu.Flags.F = state["f"]
+    cpu.CoreWords.SP = state["sp"]
+    cpu.CoreWords.PC = state["pc"]
+    cpu.InterruptMask.IME = state.get("ime", 0)
+
+
+def captureRegisters(cpu):
+    regs = cpu.CoreReg
+    return {
+        "a": int(regs.A), "f": int(cpu.Flags.F), "b": int(regs.B), "c": int(regs.C),
+        "d": int(regs.D), "e": int(regs.E), "h": int(regs.H), "l": int(regs.L),
+        "sp": int(cpu.CoreWords.SP), "pc": int(cpu.CoreWords.PC),
+    }
+
+
+def expectedWrites(cycles):
+    """(address, value) of every machine cycle that writes memory, in order."""
+    # Internal cycles are null or have null address and data
+    return [(cycle[0], cycle[1]) for cycle in cycles if cycle and cycle[2] and "w" in cycle[2]]
+
+
+def runCase(cpu, case):
+    """Runs one test case. Returns a list of differences, empty when the case passes."""
+    loadState(cpu, case["initial"])
+    try:
+        # Random states make the handlers' numpy arithmetic wrap all the time
+        with np.errstate(over="ignore"):
+            spent = cpu.step()
+    except Exception as e:
+        return [f"raised {type(e).__name__}: {e}"]
+
+    final = case["final"]
+    diffs = []
+    actual = captureRegisters(cpu)
+    for name in REGISTERS:
+        if actual[name] != final[name]:
+            width = 4 if name in ("sp", "pc") else 2
+            diffs.append(f"{name.upper()} {actual[name]:0{width}X}, expected {final[name]:0{width}X}")
+    if "ime" in final and int(cpu.InterruptMask.IME) != final["ime"]:
+        diffs.append(f"IME {int(cpu.InterruptMask.IME)}, expected {final['ime']}")
+
+    memory = cpu.Bus.memory
+    for addr, value in final["ram"]:
+        if memory[addr] != value:
+            diffs.append(f"({addr:04X}) {int(memory[addr]):02X}, expected {value:02X}")
+
+    cycles = 4 * len(case["cycles"])
+    if spent != cycles:
+        diffs.append(f"{spent} cycles, expected {cycles}")
+    writes = expectedWrites(case["cycles"])
+    if cpu.Bus.writes != writes:
+        diffs.append(f"writes {cpu.Bus.writes}, expected {writes}")
+    return diffs
+
+
+def runFile(path, limit=None):
+    """Runs the cases of one test file (the first `limit` of them). Returns a result dict."""
+    start = time.perf_counter()
+    cpu = CPU(FlatBus())
+    cpu.Idioms.enabled = False
+
+    result = {"file": os.path.basename(path), "opcode": opcodeName(path), "cases": 0, "passed": 0,
+              "failed": 0, "failures": [], "seconds": 0.0, "error": None}
+    try:
+        with open(path) as f:
+            cases = json.load(f)
+    except (OSError, ValueError) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+
+    for case in cases[:limit]:
+        diffs = runCase(cpu, case)
+        result["cases"] += 1
+        if not diffs:
+            result["passed"] += 1
+            continue
+        result["failed"] += 1
+        if len(result["failures"]) < MAX_REPORTED:
+            result["failures"].append({"name": case["name"], "differences": diffs})
+
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def runSuite(paths, jobs=None, limit=None):
+    """Runs the test files in parallel (jobs worker processes, default one per CPU). Results keep the order of paths."""
+    if not paths:
+        return []
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        return [runFile(path, limit) for path in paths]
+
+    count = len(paths)
+    with ProcessPoolExecutor(max_workers=min(jobs, count)) as executor:
+        return list(executor.map(runFile, paths, [limit] * count))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the SM83 single step JSON CPU tests")
+    parser.add_argument("root", nargs="?", default=DEFAULT_ROOT, help="Directory of <opcode>.json files, or one file")
+    parser.add_argument("--jobs", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--limit", type=int, help="Run only the first N cases of each file")
+    parser.add_argument("--opcodes", help='Comma separated opcodes to run, as in the file names ("3e,cb 37")')
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="Also list opcodes that pass, and every failing case kept")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    paths = findTestFiles(args.root)
+    if args.opcodes:
+        wanted = {name.strip().lower() for name in args.opcodes.split(",")}
+        paths = [path for path in paths if opcodeName(path).lower() in wanted]
+    if not paths:
+        print(f"No test files found under {args.root}")
+        return 2
+
+    start = time.perf_counter()
+    results = runSuite(paths, args.jobs, args.limit)
+    elapsed = time.perf_counter() - start
+
+    for r in results:
+        if r["error"] is not None:
+            print(f"ERROR    {r['opcode']}: {r['error']}")
+        elif r["failed"]:
+            print(f"FAILED   {r['opcode']}: {r['failed']} of {r['cases']} cases")
+            for failure in r["failures"][:None if args.verbose else 1]:
+                print(f"    {failure['name']}: {'; '.join(failure['differences'])}")
+        elif args.verbose:
+            print(f"PASSED   {r['opcode']}: {r['cases']} cases")
+
+    cases = sum(r["cases"] for r in results)
+    failed = sum(r["failed"] for r in results)
+    badOpcodes = sum(1 for r in results if r["failed"] or r["error"] is not None)
+    print(f"\n{cases} cases from {len(results)} opcodes in {elapsed:.1f}s: {cases - failed} passed, "
+          f"{failed} failed, {badOpcodes} opcodes with failures")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"root": args.root, "results": results}, f, indent=2)
+    return 1 if badOpcodes else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+import struct
+import zlib
+
+import numpy as np
+
+SCREEN_WIDTH = 160
+SCREEN_HEIGHT = 144
+
+
+class ScreenBuffer:
+    """
+    A binary PPM (P6) image of the Game Boy screen, scaled by an integer factor.
+
+    The header and pixel storage are allocated once. update() writes a framebuffer
+    into the existing pixel storage with a single broadcast assignment, so converting
+    a frame allocates nothing and the returned buffer can be handed straight to
+    tk.PhotoImage or written to a file.
+    """
+
+    def __init__(self, scale=1):
+        self.scale = scale
+        self.width = SCREEN_WIDTH * scale
+        self.height = SCREEN_HEIGHT * scale
+
+        header = f"P6\n{self.width} {self.height}\n255\n".encode("ascii")
+        self.ppm = bytearray(len(header) + self.width * self.height * 3)
+        self.ppm[:len(header)] = header
+
+        # View over the pixel bytes as (line, repeat, pixel, repeat, rgb). Each source
+        # pixel broadcasts over a scale x scale block.
+        pixels = np.frombuffer(self.ppm, dtype=np.uint8, offset=len(header))
+        self._blocks = pixels.reshape(SCREEN_HEIGHT, scale, SCREEN_WIDTH, scale, 3)
+        self.pixels = pixels.reshape(self.height, self.width, 3)
+
+    def update(self, framebuffer):
+        """Copies a (144, 160, 3) uint8 framebuffer into the image and returns the PPM bytes."""
+        self._blocks[...] = framebuffer[:, None, :, None, :]
+        return self.ppm
+
+
+def encodePNG(framebuffer):
+    """Encodes a (height, width, 3) uint8 framebuffer as an RGB PNG. Only needs the standard library."""
+    height, width, _ = framebuffer.shape
+    # Each row is prefixed with filter type 0 (None)
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = framebuffer.reshape(height, width * 3)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows.tobytes(), 6))
+            + chunk(b"IEND", b""))
@@ -0,0 +1,167 @@
+import re
+
+# Serial port registers
+SB = 0xFF01
+SC = 0xFF02
+
+SERIAL_INTERRUPT = 0x08
+
+# With the internal clock (8192 Hz) a transfer shifts 8 bits at 512 CPU cycles each
+CYCLES_PER_TRANSFER = 8 * 512
+
+# Far enough in the future to never be reached. An int keeps the per-instruction comparison cheap.
+IDLE = 1 << 62
+
+
+class Serial:
+    """
+    The serial port (SB/SC). Setting SC to 0x81 starts a transfer on the internal clock.
+    It completes CYCLES_PER_TRANSFER cycles later: the byte is handed to every sink, SB
+    reads back 0xFF (no link partner), SC bit 7 clears and the serial interrupt is
+    requested. Transfers on the external clock never complete, like on hardware with
+    no cable attached.
+
+    A sink is any object with write(value). A sink that returns True asks the emulator
+    to stop, which ends CPU.run_cycles/run_frame after the transfer.
+    """
+
+    def __init__(self, bus, sinks=None):
+        self.bus = bus
+        self.bus.serial = self
+        self.sinks = list(sinks) if sinks else []
+        self.reset()
+
+    def reset(self):
+        self.sb = 0
+        self.sc = 0
+        # CPU cycle count at which the current transfer completes
+        self.due = IDLE
+        self.stopRequested = False
+
+    def addSink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def removeSink(self, sink):
+        self.sinks.remove(sink)
+
+    def read(self, addr):
+        if addr == SB:
+            return self.sb
+        # Bits 1-6 of SC are unused and read as 1
+        return self.sc | 0x7E
+
+    def write(self, addr, value):
+        value = int(value)
+        if addr == SB:
+            self.sb = value
+            return
+
+        self.sc = value & 0x81
+        if value & 0x81 == 0x81:
+            cpu = self.bus.cpu
+            self.due = (cpu.cycles if cpu is not None else 0) + CYCLES_PER_TRANSFER
+        else:
+            self.due = IDLE
+
+    def complete(self):
+        """Finishes the transfer in progress. Called by the CPU once its cycle count reaches due."""
+        data = self.sb
+        self.sb = 0xFF
+        self.sc &= 0x7F
+        self.due = IDLE
+
+        if self.bus.interrupts is not None:
+            self.bus.interrupts.request(SERIAL_INTERRUPT)
+
+        for sink in self.sinks:
+            if sink.write(data):
+                self.stopRequested = True
+
+
+#==========================================
+#           SINKS
+#==========================================
+
+class BufferSink:
+    """Collects the output in memory."""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, value):
+        self.data.append(value)
+
+    def text(self):
+        return self.data.decode("latin-1")
+
+
+class StreamSink:
+    """
+    Writes to a binary stream (a file opened with "wb", sys.stdout.buffer, ...). The
+    stream does its own buffering; it is flushed at the end of each line so console
+    output still shows up promptly.
+    """
+
+    def __init__(self, stream, flushOnNewline=True):
+        self.stream = stream
+        self.flushOnNewline = flushOnNewline
+
+    def write(self, value):
+        self.stream.write(bytes((value,)))
+        if value == 0x0A and self.flushOnNewline:
+            self.stream.flush()
+
+    def close(self):
+        self.stream.flush()
+
+
+class FileSink(StreamSink):
+    def __init__(self, path):
+        super().__init__(open(path, "wb"), flushOnNewline=False)
+
+    def close(self):
+        self.stream.close()
+
+
+class CallbackSink:
+    """Calls callback(value) for every byte. A truthy return value requests a stop."""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def write(self, value):
+        return bool(self.callback(value))
+
+
+class PatternSink:
+    """
+    Watches the output for any of the given regular expressions and requests a stop
+    when one matches. Used by test ROM harnesses to stop as soon as the result line
+    (e.g. Blargg's "Passed" or "Failed #2") is complete. The matching pattern is kept in
+    `matched` and the match object in `match`.
+    """
+
+    def __init__(self, patterns=("Passed", "Failed")):
+        self.patterns = [re.compile(p) for p in patterns]
+        self.output = bytearray()
+        self.matched = None
+        self.match = None
+
+    def write(self, value):
+        self.output.append(value)
+        if self.matched is not None:
+            return True
+        # Results are reported on their own line, so only look at complete lines
+        if value == 0x0A:
+            text = self.text()
+            for pattern in self.patterns:
+                match = pattern.search(text)
+                if match:
+                    self.matched = pattern.pattern
+                    self.match = match
+                    return True
+        return False
+
+    def text(self):
+        return self.output.decode("latin-1")
@@ -0,0 +1,314 @@
+import argparse
+import queue
+import struct
+import sys
+import threading
+
+import numpy as np
+
+# Binary execution traces. One fixed size record per executed instruction, holding the
+# CPU state before the instruction ran, written as raw TRACE_DTYPE records after a short
+# header so a trace of any size opens instantly with np.memmap:
+#
+#   python SDRBoy.py --headless --frames 600 --trace run.trace rom.gb
+#   python Trace.py diff run.trace reference.trace      first divergence, exit 1 if any
+#   python Trace.py doctor run.trace run.log            gameboy-doctor text log
+#
+# gameboy-doctor logs can also be given to diff directly (files ending in .log or .txt);
+# they have no cycle counts, so cycles are not compared against them.
+
+TRACE_DTYPE = np.dtype([
+    ("cycles", "<u8"),
+    ("pc", "<u2"),
+    ("sp", "<u2"),
+    ("a", "u1"), ("f", "u1"), ("b", "u1"), ("c", "u1"),
+    ("d", "u1"), ("e", "u1"), ("h", "u1"), ("l", "u1"),
+    ("opcode", "u1"),
+    # The three bytes following the opcode, whether or not the instruction uses them
+    ("operands", "u1", (3,)),
+])
+RECORD = struct.Struct("<QHH12B")
+assert RECORD.size == TRACE_DTYPE.itemsize
+
+MAGIC = b"SDRTRACE"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+
+# Records per chunk handed to the writer thread, and chunks in the ring buffer
+DEFAULT_CHUNK = 1 << 16
+DEFAULT_CHUNKS = 4
+
+DOCTOR_FORMAT = ("A:{:02X} F:{:02X} B:{:02X} C:{:02X} D:{:02X} E:{:02X} H:{:02X} L:{:02X} "
+                 "SP:{:04X} PC:{:04X} PCMEM:{:02X},{:02X},{:02X},{:02X}")
+
+# Records compared per step by the diff, keeps memory flat for traces of any size
+DIFF_CHUNK = 1 << 20
+
+
+class TraceRecorder:
+    """
+    Records one TRACE_DTYPE record per executed instruction. Like the profilers it wraps
+    the opcode table entries, so with tracing disabled there is no cost at all.
+
+    Records are packed straight into a ring buffer of `chunks` chunks (a bytearray, seen
+    by numpy through recent()). With a path, each full chunk is queued for a background
+    thread that appends it to the file; the emulator only waits when the writer has
+    fallen a whole ring behind. Without a path the ring is a flight recorder holding the
+    last chunk * chunks instructions.
+
+    Loops bulk executed by the idiom recognizer bypass the tables and are not traced.
+    """
+
+    def __init__(self, cpu, path=None, chunk=DEFAULT_CHUNK, chunks=DEFAULT_CHUNKS):
+        self.cpu = cpu
+        self.path = path
+        self.chunkBytes = chunk * RECORD.size
+        self.ring = bytearray(self.chunkBytes * chunks)
+        # Byte offset of the next record in the ring
+        self._pos = 0
+        self.recorded = 0
+        self.error = None
+        # CPU.wrapEntry handles for every wrapped entry, while enabled
+        self._handles = []
+        self._file = None
+        self._queue = None
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return bool(self._handles)
+
+    def enable(self):
+        if self.enabled:
+            return self
+        if self.path is not None:
+            self._file = open(self.path, "wb")
+            self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+            self._queue = queue.Queue()
+            # Chunks the recorder may still fill; the one being filled is already taken
+            self._free = threading.Semaphore(len(self.ring) // self.chunkBytes - 1)
+            self._thread = threading.Thread(target=self._writer, name="TraceWriter", daemon=True)
+            self._thread.start()
+
+        table = self.cpu.lr35902_opCodes
+        for opCode in list(table):
+            self._wrap(table, opCode)
+        return self
+
+    def disable(self):
+        """Stops recording. With a file, writes out what is left and closes it."""
+        for handle in self._handles:
+            self.cpu.unwrapEntry(handle)
+        self._handles = []
+
+        if self._thread is not None:
+            start = self._pos - self._pos % self.chunkBytes
+            if self._pos > start:
+                self._queue.put((start, self._pos, False))
+            self._queue.put(None)
+            self._thread.join()
+            self._file.close()
+            self._thread = self._queue = self._file = None
+            if self.error is not None:
+                raise self.error
+
+    def _wrap(self, table, opCode):
+        cpu = self.cpu
+        regs = cpu.CoreReg
+        words = cpu.CoreWords
+        cpuFlags = cpu.Flags
+        readByte = cpu.Bus.readByte
+        ring = self.ring
+        chunkBytes = self.chunkBytes
+        pack = RECORD.pack_into
+        size = RECORD.size
+
+        def wrap(entry):
+            func, length, cycles, flags = entry
+
+            def traced(operandAddr):
+                pos = self._pos
+                pack(ring, pos, cpu.cycles, (operandAddr - 1) & 0xFFFF, words.SP,
+                     regs.A, cpuFlags.z << 7 | cpuFlags.n << 6 | cpuFlags.h << 5 | cpuFlags.c << 4,
+                     regs.B, regs.C, regs.D, regs.E, regs.H, regs.L,
+                     opCode, readByte(operandAddr), readByte((operandAddr + 1) & 0xFFFF),
+                     readByte((operandAddr + 2) & 0xFFFF))
+                pos += size
+                self._pos = pos
+                self.recorded += 1
+                if pos % chunkBytes == 0:
+                    self._chunkFull()
+                return func(operandAddr)
+            return (traced, length, cycles, flags)
+
+        self._handles.append(cpu.wrapEntry(table, opCode, wrap))
+
+    def _chunkFull(self):
+        end = self._pos
+        if self._queue is not None:
+            self._queue.put((end - self.chunkBytes, end, True))
+        if end == len(self.ring):
+            self._pos = 0
+        if self._queue is not None:
+            # Wait for the writer to be done with the chunk about to be overwritten
+            self._free.acquire()
+
+    def _writer(self):
+        view = memoryview(self.ring)
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            start, end, full = item
+            if self.error is None:
+                try:
+                    self._file.write(view[start:end])
+                except OSError as e:
+                    # Reported by disable(); keep draining so the emulator never blocks
+                    self.error = e
+            if full:
+                self._free.release()
+
+    def recent(self, n=None):
+        """The last n recorded instructions (at most one ring's worth) as a TRACE_DTYPE array."""
+        records = np.frombuffer(self.ring, dtype=TRACE_DTYPE)
+        end = self._pos // RECORD.size
+        if self.recorded > end:
+            # The ring has wrapped, the oldest records start after the newest
+            records = np.concatenate((records[end:], records[:end]))
+        else:
+            records = records[:end].copy()
+        return records if n is None else records[len(records) - min(n, len(records)):]
+
+
+def openTrace(path):
+    """Opens a trace file as a read only TRACE_DTYPE memmap (an empty array for an empty trace)."""
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"{path}: not a trace file")
+    magic, version, recordSize = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION or recordSize != RECORD.size:
+        raise ValueError(f"{path}: not a version {VERSION} trace file")
+    try:
+        return np.memmap(path, dtype=TRACE_DTYPE, mode="r", offset=HEADER.size)
+    except ValueError:
+        # np.memmap refuses to map zero bytes
+        return np.empty(0, dtype=TRACE_DTYPE)
+
+
+def formatDoctor(record):
+    """One record as a gameboy-doctor log line."""
+    return DOCTOR_FORMAT.format(record["a"], record["f"], record["b"], record["c"], record["d"],
+                                record["e"], record["h"], record["l"], record["sp"], record["pc"],
+                                record["opcode"], *record["operands"])
+
+
+def writeDoctorLog(records, path):
+    with open(path, "w") as f:
+        for start in range(0, len(records), DIFF_CHUNK):
+            for (cycles, pc, sp, a, flags, b, c, d, e, h, l, opcode, operands) in records[start:start + DIFF_CHUNK].tolist():
+                f.write(DOCTOR_FORMAT.format(a, flags, b, c, d, e, h, l, sp, pc, opcode, *operands))
+                f.write("\n")
+
+
+def readDoctorLog(path):
+    """Parses a gameboy-doctor log into a TRACE_DTYPE array. Cycles are not in the format and read as 0."""
+    rows = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            fields = dict(part.split(":", 1) for part in line.split())
+            mem = [int(byte, 16) for byte in fields["PCMEM"].split(",")]
+            rows.append((0, int(fields["PC"], 16), int(fields["SP"], 16),
+                         *(int(fields[reg], 16) for reg in "AFBCDEHL"), mem[0], tuple(mem[1:4])))
+    return np.array(rows, dtype=TRACE_DTYPE)
+
+
+def loadTrace(path):
+    """A binary trace, or a gameboy-doctor log for paths ending in .log or .txt."""
+    if str(path).endswith((".log", ".txt")):
+        return readDoctorLog(path)
+    return openTrace(path)
+
+
+def differingFields(a, b, fields=TRACE_DTYPE.names):
+    return [name for name in fields if not np.array_equal(a[name], b[name])]
+
+
+def firstDivergence(a, b, ignore=()):
+    """
+    Index of the first record where traces a and b differ in any field not in `ignore`.
+    When one trace is a prefix of the other the index is the length of the shorter one.
+    Returns None for identical traces.
+    """
+    fields = [name for name in TRACE_DTYPE.names if name not in ignore]
+    common = min(len(a), len(b))
+    for start in range(0, common, DIFF_CHUNK):
+        end = min(start + DIFF_CHUNK, common)
+        left, right = a[start:end], b[start:end]
+        same = np.ones(end - start, dtype=bool)
+        for name in fields:
+            equal = left[name] == right[name]
+            same &= equal.all(axis=1) if equal.ndim > 1 else equal
+        if not same.all():
+            return start + int(np.argmin(same))
+    return None if len(a) == len(b) else common
+
+
+def formatDivergence(a, b, index, ignore=(), context=5):
+    """Describes the divergence at index with the `context` instructions leading up to it."""
+    lines = [f"First divergence at instruction {index}"]
+    for i in range(max(0, index - context), index):
+        lines.append(f"  {i:10d}  {formatDoctor(a[i])}")
+    if index >= len(a) or index >= len(b):
+        shorter = "first" if index >= len(a) else "second"
+        lines.append(f"  the {shorter} trace ends here")
+        return "\n".join(lines)
+
+    fields = [name for name in TRACE_DTYPE.names if name not in ignore]
+    lines.append(f"  {index:10d}  {formatDoctor(a[index])}  cycles {int(a[index]['cycles'])}")
+    lines.append(f"  {'':10}  {formatDoctor(b[index])}  cycles {int(b[index]['cycles'])}")
+    lines.append("  differs in " + ", ".join(differingFields(a[index], b[index], fields)))
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and compare execution traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    diff = commands.add_parser("diff", help="Report the first instruction where two traces differ")
+    diff.add_argument("first", help="Trace file, or gameboy-doctor log (.log/.txt)")
+    diff.add_argument("second", help="Trace file, or gameboy-doctor log (.log/.txt)")
+    diff.add_argument("--ignore", action="append", default=[], choices=TRACE_DTYPE.names,
+                      help="Do not compare this field (repeatable)")
+    diff.add_argument("--context", type=int, default=5, help="Instructions shown before the divergence")
+
+    doctor = commands.add_parser("doctor", help="Convert a trace to a gameboy-doctor log")
+    doctor.add_argument("trace")
+    doctor.add_argument("out")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.command == "doctor":
+        writeDoctorLog(openTrace(args.trace), args.out)
+        return 0
+
+    first, second = loadTrace(args.first), loadTrace(args.second)
+    ignore = set(args.ignore)
+    if any(str(path).endswith((".log", ".txt")) for path in (args.first, args.second)):
+        ignore.add("cycles")
+    index = firstDivergence(first, second, ignore)
+    if index is None:
+        print(f"Traces match ({len(first)} instructions)")
+        return 0
+    print(formatDivergence(first, second, index, ignore, args.context))
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+# Reproducible performance workloads, run with: python -m bench
@@ -0,0 +1,136 @@
+import argparse
+import fnmatch
+import json
+import platform
+import sys
+import time
+
+from bench.workloads import WORKLOADS, addROMWorkloads
+
+# Benchmark runner. Run from the repository root:
+#
+#   python -m bench                                   run everything, print a table
+#   python -m bench --json bench.json                 also write the results as JSON
+#   python -m bench --baseline bench.json             fail on regressions against a stored run
+#   python -m bench "cpu.*" --repeat 5                only the CPU mixes, best of 5
+#   python -m bench --roms gb-test-roms/cpu_instrs    add full test ROM runs
+#
+# Each workload is run `repeat` times and the fastest run is kept, which is the most
+# reproducible number on a machine with background noise.
+
+DEFAULT_REPEAT = 3
+# A workload regresses when its ns/op grows by more than this fraction over the baseline
+DEFAULT_THRESHOLD = 0.10
+
+
+def runWorkload(name, scale=1.0, repeat=DEFAULT_REPEAT):
+    group, func, unit = WORKLOADS[name]
+    best = None
+    for _ in range(repeat):
+        sample = func(scale)
+        if best is None or sample.seconds / max(sample.ops, 1) < best.seconds / max(best.ops, 1):
+            best = sample
+    result = best.metrics()
+    result["group"] = group
+    result["unit"] = unit
+    return result
+
+
+def runBenchmarks(patterns=None, scale=1.0, repeat=DEFAULT_REPEAT, progress=None):
+    names = [name for name in WORKLOADS
+             if not patterns or any(fnmatch.fnmatch(name, pattern) for pattern in patterns)]
+    results = {}
+    for name in names:
+        results[name] = runWorkload(name, scale, repeat)
+        if progress is not None:
+            progress(name, results[name])
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scale": scale,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Returns [(name, baseline ns/op, current ns/op, change, regressed)] for every workload
+    present in both reports. change is the relative growth of ns/op, positive means
+    slower; regressed is True when it is above threshold.
+    """
+    rows = []
+    for name, current in report["results"].items():
+        before = baseline["results"].get(name)
+        if before is None or not before["ns_per_op"]:
+            continue
+        change = current["ns_per_op"] / before["ns_per_op"] - 1.0
+        rows.append((name, before["ns_per_op"], current["ns_per_op"], change, change > threshold))
+    return rows
+
+
+def formatResult(name, result):
+    line = f"{name:24} {result['ns_per_op']:12.1f} ns/{result['unit']:12}"
+    if "mips" in result:
+        line += f" {result['mips']:8.3f} MIPS"
+    if "fps" in result:
+        line += f" {result['fps']:8.2f} fps"
+    return line
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Run the emulator benchmarks")
+    parser.add_argument("patterns", nargs="*", help="Only run workloads matching these glob patterns")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Runs per workload, the best is kept")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for the size of every workload")
+    parser.add_argument("--roms", help="Also run every ROM under this directory (or this ROM file)")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Results of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative ns/op growth counted as a regression (default: 0.10)")
+    parser.add_argument("--list", action="store_true", help="List the workloads and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.roms:
+        from RomHarness import findRoms
+        addROMWorkloads(findRoms(args.roms), args.roms)
+
+    if args.list:
+        for name, (group, _, unit) in WORKLOADS.items():
+            print(f"{name:24} {group:8} per {unit}")
+        return 0
+
+    report = runBenchmarks(args.patterns, args.scale, args.repeat,
+                           progress=lambda name, result: print(formatResult(name, result), flush=True))
+    if not report["results"]:
+        print("No workloads matched")
+        return 2
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = 0
+    print(f"\nAgainst {args.baseline} (regression threshold {args.threshold:+.0%}):")
+    for name, before, after, change, regressed in compare(report, baseline, args.threshold):
+        flag = ""
+        if regressed:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:24} {before:12.1f} -> {after:12.1f} ns/op {change:+8.1%}{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+import os
+import time
+
+import numpy as np
+
+from GameBoy import GameBoy
+from PPU import CYCLES_PER_FRAME, CYCLES_PER_SCANLINE, VISIBLE_SCANLINES
+from RomHarness import romId
+from utils import makeROM
+
+# Reproducible workloads. Every workload takes a scale factor (1.0 is the default size)
+# and returns a Sample of the work done and the time it took. Setup happens outside
+# the timed region, and everything random uses a fixed seed.
+
+class Sample:
+    def __init__(self, ops, seconds, instructions=0, frames=0):
+        # Operations of the workload's own unit (instructions, scanlines, reads, ...)
+        self.ops = ops
+        self.seconds = seconds
+        self.instructions = instructions
+        self.frames = frames
+
+    def metrics(self):
+        seconds = max(self.seconds, 1e-12)
+        result = {
+            "ops": self.ops,
+            "seconds": self.seconds,
+            "ns_per_op": self.seconds / self.ops * 1e9 if self.ops else 0.0,
+        }
+        if self.instructions:
+            result["mips"] = self.instructions / seconds / 1e6
+        if self.frames:
+            result["fps"] = self.frames / seconds
+        return result
+
+
+# name -> (group, function, unit)
+WORKLOADS = {}
+
+def workload(name, group, unit):
+    def register(func):
+        WORKLOADS[name] = (group, func, unit)
+        return func
+    return register
+
+
+def runProgram(program, cycles):
+    """Runs program from the entry point for `cycles` cycles and returns a Sample counted in instructions."""
+    gameboy = GameBoy(makeROM(program))
+    cpu = gameboy.cpu
+    # Warm up so one time setup (e.g. first calls through the dispatch table) is not timed
+    cpu.run_cycles(1000)
+
+    startInstructions = cpu.instructions
+    start = time.perf_counter()
+    cpu.run_cycles(cycles)
+    seconds = time.perf_counter() - start
+    instructions = cpu.instructions - startInstructions
+    return Sample(instructions, seconds, instructions=instructions)
+
+
+#==========================================
+#           CPU INSTRUCTION MIXES
+#==========================================
+
+CPU_CYCLES = 1_000_000
+
+# ADD A,B ; SUB C ; XOR D ; AND E ; OR H ; CP L ; INC A ; DEC B ; ADC A,B ; SBC A,C
+# ADD A,$07 ; XOR $5A ; JR -16
+ALU_PROGRAM = [0x80, 0x91, 0xAA, 0xA3, 0xB4, 0xBD, 0x3C, 0x05, 0x88, 0x99,
+               0xC6, 0x07, 0xEE, 0x5A, 0x18, 0xF0]
+
+# LD HL,$C100 ; LD DE,$C200
+# loop: LD A,(HL) ; LD (DE),A ; LD B,(HL) ; LD (HL),B ; INC L ; INC E ; LD A,(DE) ; LD (HL),A
+#       PUSH HL ; POP HL ; PUSH AF ; POP AF ; JR loop
+MEMORY_PROGRAM = [0x21, 0x00, 0xC1, 0x11, 0x00, 0xC2,
+                  0x7E, 0x12, 0x46, 0x70, 0x2C, 0x1C, 0x1A, 0x77,
+                  0xE5, 0xE1, 0xF5, 0xF1, 0x18, 0xF2]
+
+# loop: LD B,$10 ; inner: DEC B ; JR NZ,inner ; CALL $0110 ; JP loop
+# $0110: OR A ; JR NZ,+0 ; RET Z ; RET
+BRANCH_PROGRAM = [0x06, 0x10, 0x05, 0x20, 0xFD, 0xCD, 0x10, 0x01, 0xC3, 0x00, 0x01,
+                  0x00, 0x00, 0x00, 0x00, 0x00,
+                  0xB7, 0x20, 0x00, 0xC8, 0xC9]
+
+# RLC B ; SWAP A ; BIT 7,H ; SET 3,C ; RES 3,C ; SRL D ; SLA E ; RR L ; BIT 0,(HL) ; JR -20
+CB_PROGRAM = [0xCB, 0x00, 0xCB, 0x37, 0xCB, 0x7C, 0xCB, 0xD9, 0xCB, 0x99,
+              0xCB, 0x3A, 0xCB, 0x23, 0xCB, 0x1D, 0xCB, 0x46, 0x18, 0xEC]
+
+@workload("cpu.alu", "cpu", "instruction")
+def aluMix(scale=1.0):
+    return runProgram(ALU_PROGRAM, int(CPU_CYCLES * scale))
+
+@workload("cpu.memory", "cpu", "instruction")
+def memoryMix(scale=1.0):
+    return runProgram(MEMORY_PROGRAM, int(CPU_CYCLES * scale))
+
+@workload("cpu.branch", "cpu", "instruction")
+def branchMix(scale=1.0):
+    return runProgram(BRANCH_PROGRAM, int(CPU_CYCLES * scale))
+
+@workload("cpu.cb", "cpu", "instruction")
+def cbMix(scale=1.0):
+    return runProgram(CB_PROGRAM, int(CPU_CYCLES * scale))
+
+
+#==========================================
+#           PPU
+#==========================================
+
+PPU_FRAMES = 10
+
+def makePPU():
+    """A PPU with the LCD and background on, showing random tiles."""
+    gameboy = GameBoy()
+    ppu = gameboy.ppu
+    rng = np.random.default_rng(44)
+    ppu.vram[:] = rng.integers(0, 256, size=ppu.vram.shape, dtype=np.uint8)
+    ppu.LCDC = 0x91
+    ppu.BGP = 0xE4
+    return ppu
+
+@workload("ppu.scanline", "ppu", "scanline")
+def scanlineRender(scale=1.0):
+    ppu = makePPU()
+    lines = int(PPU_FRAMES * VISIBLE_SCANLINES * scale)
+
+    start = time.perf_counter()
+    for i in range(lines):
+        ppu.LY = i % VISIBLE_SCANLINES
+        ppu.renderScanline()
+    return Sample(lines, time.perf_counter() - start)
+
+@workload("ppu.frame", "ppu", "frame")
+def frameRender(scale=1.0):
+    ppu = makePPU()
+    frames = max(1, int(PPU_FRAMES * scale))
+    startFrame = ppu.frameCount
+
+    start = time.perf_counter()
+    # One call per scanline, the granularity the CPU loop steps at is much finer but
+    # that cost belongs to the CPU benchmarks
+    for _ in range(frames * CYCLES_PER_FRAME // CYCLES_PER_SCANLINE):
+        ppu.step(CYCLES_PER_SCANLINE)
+    seconds = time.perf_counter() - start
+    return Sample(frames, seconds, frames=ppu.frameCount - startFrame)
+
+
+#==========================================
+#           BUS
+#==========================================
+
+BUS_ACCESSES = 200_000
+
+# ROM, VRAM, WRAM, echo RAM, OAM, IO, HRAM and IE
+READ_ADDRESSES = (0x0150, 0x4000, 0x8800, 0xC123, 0xE123, 0xFE10, 0xFF44, 0xFF85, 0xFFFF)
+# VRAM, WRAM, echo RAM, OAM, IO and HRAM
+WRITE_ADDRESSES = (0x8800, 0xC123, 0xE123, 0xFE10, 0xFF47, 0xFF85)
+
+def addressStream(addresses, count):
+    rng = np.random.default_rng(45)
+    return [addresses[i] for i in rng.integers(0, len(addresses), size=count)]
+
+@workload("bus.read", "bus", "read")
+def busRead(scale=1.0):
+    bus = GameBoy(makeROM([])).bus
+    addresses = addressStream(READ_ADDRESSES, int(BUS_ACCESSES * scale))
+    readByte = bus.readByte
+
+    start = time.perf_counter()
+    for addr in addresses:
+        readByte(addr)
+    return Sample(len(addresses), time.perf_counter() - start)
+
+@workload("bus.write", "bus", "write")
+def busWrite(scale=1.0):
+    bus = GameBoy().bus
+    addresses = addressStream(WRITE_ADDRESSES, int(BUS_ACCESSES * scale))
+    writeByte = bus.writeByte
+
+    start = time.perf_counter()
+    for i, addr in enumerate(addresses):
+        writeByte(addr, i & 0xFF)
+    return Sample(len(addresses), time.perf_counter() - start)
+
+
+#==========================================
+#           WHOLE SYSTEM
+#==========================================
+
+SYSTEM_FRAMES = 10
+
+# LD HL,$FF47 ; LD A,$E4 ; LD (HL),A ; LD L,$40 ; LD A,$91 ; LD (HL),A (BGP, LCD on), then the ALU mix
+SYSTEM_PROGRAM = [0x21, 0x47, 0xFF, 0x3E, 0xE4, 0x77, 0x2E, 0x40, 0x3E, 0x91, 0x77] + ALU_PROGRAM
+
+def runFrames(gameboy, frames):
+    cpu = gameboy.cpu
+    startInstructions = cpu.instructions
+    startFrame = gameboy.ppu.frameCount
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        gameboy.run_frame()
+    seconds = time.perf_counter() - start
+    instructions = cpu.instructions - startInstructions
+    return Sample(frames, seconds, instructions=instructions, frames=gameboy.ppu.frameCount - startFrame)
+
+@workload("system.frame", "system", "frame")
+def systemFrame(scale=1.0):
+    return runFrames(GameBoy(makeROM(SYSTEM_PROGRAM)), max(1, int(SYSTEM_FRAMES * scale)))
+
+ROM_FRAMES = 60
+
+def romWorkload(path):
+    """A workload running the ROM at path for ROM_FRAMES frames."""
+    def run(scale=1.0):
+        with open(path, "rb") as f:
+            gameboy = GameBoy(f.read())
+        return runFrames(gameboy, max(1, int(ROM_FRAMES * scale)))
+    return run
+
+def addROMWorkloads(paths, root=None):
+    """
+    Adds a "rom.<path>" workload per ROM, named by its path relative to root without the
+    extension (as RomHarness keys its results), so ROMs sharing a file name stay apart.
+    """
+    for path in paths:
+        name = "rom." + os.path.splitext(romId(path, root))[0]
+        WORKLOADS[name] = ("rom", romWorkload(path), "frame")
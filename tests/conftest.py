@@ -0,0 +1,17 @@
+#==========================================
+#           SHARED TEST HELPERS
+#==========================================
+
+from utils import ENTRY_POINT, makeROM
+
+# Code loaded into WRAM, where it can be rewritten between runs
+CODE_ADDR = 0xC000
+
+# Test programs are built like the benchmark workloads
+make_rom = makeROM
+
+def load_code(cpu, code, addr=CODE_ADDR):
+    """Writes code to memory through the bus and points PC at it."""
+    for i, byte in enumerate(code):
+        cpu.Bus.writeByte(addr + i, byte)
+    cpu.CoreWords.PC = addr
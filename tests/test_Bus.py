@@ -0,0 +1,146 @@
+import pytest
+
+import numpy as np
+
+from GameBoy import GameBoy
+from Bus import FlatBus, RegionBus
+from CPU import CPU
+
+#==========================================
+#           PYTEST FIXTURES
+#==========================================
+
+@pytest.fixture(scope="function")
+def bus():
+    rom = (np.arange(0x8000) & 0xFF).astype(np.uint8).tobytes()
+    return GameBoy(rom).bus
+
+def read_bytes(bus, start, length):
+    return np.array([bus.readByte((start + i) & 0xFFFF) for i in range(length)], dtype=np.uint8)
+
+#==========================================
+#           READ RANGE TEST CASES
+#==========================================
+
+class TestReadRange:
+
+    view_test_cases = [
+        pytest.param(0x0100, 64, id="ROM"),
+        pytest.param(0x8000, 0x2000, id="All of VRAM"),
+        pytest.param(0xC000, 64, id="WRAM"),
+        pytest.param(0xE010, 16, id="Echo RAM"),
+        pytest.param(0xFF80, 0x7F, id="HRAM"),
+    ]
+
+    @pytest.mark.parametrize("start, length", view_test_cases)
+    def test_single_region_is_a_view(self, bus, start, length):
+        bus.writeByte(0xC000, 0x12)
+        bus.writeByte(0xFF80, 0x34)
+
+        data = bus.readRange(start, length)
+
+        assert data.base is not None, "Expected a view of the backing array"
+        assert not data.flags.writeable
+        np.testing.assert_array_equal(data, read_bytes(bus, start, length))
+
+    gather_test_cases = [
+        pytest.param(0x7FE0, 64, id="ROM into VRAM"),
+        pytest.param(0xDFF0, 32, id="WRAM into Echo RAM"),
+        pytest.param(0xFDF0, 0x40, id="Echo RAM into OAM and unusable area"),
+        pytest.param(0xFF00, 0x100, id="IO registers, HRAM and IE"),
+        pytest.param(0xFFF0, 32, id="Wraps at 0xFFFF"),
+    ]
+
+    @pytest.mark.parametrize("start, length", gather_test_cases)
+    def test_spanning_regions_is_gathered(self, bus, start, length):
+        bus.writeByte(0xDFFF, 0x56)
+        bus.writeByte(0xFE00, 0x78)
+        bus.writeByte(0xFF40, 0x91)
+        bus.writeByte(0xFFFF, 0x1F)
+
+        data = bus.readRange(start, length)
+
+        np.testing.assert_array_equal(data, read_bytes(bus, start, length))
+
+    def test_view_tracks_memory(self, bus):
+        data = bus.readRange(0xC000, 16)
+        bus.writeByte(0xC004, 0xAB)
+
+        assert data[4] == 0xAB
+
+    def test_large_rom_is_limited_to_mapped_area(self):
+        bus = GameBoy(bytes(0x10000)).bus
+        bus.writeByte(0x8000, 0x99)
+
+        assert bus.getMemoryRegion(0x7FF0)[2] == 0x10
+        assert bus.readRange(0x7FFF, 2)[1] == 0x99
+
+#==========================================
+#           FLAT BUS TEST CASES
+#==========================================
+
+class TestFlatBus:
+
+    @pytest.mark.parametrize("addr", [0x0000, 0x4000, 0x8000, 0xFE00, 0xFF00, 0xFF44, 0xFFFF],
+                             ids=["ROM", "Banked ROM", "VRAM", "OAM", "P1", "LY", "IE"])
+    def test_plain_memory_everywhere(self, addr):
+        bus = FlatBus()
+        bus.writeByte(addr, 0x5A)
+        assert bus.readByte(addr) == 0x5A
+        assert bus.memory[addr] == 0x5A
+
+    def test_write_log(self):
+        bus = FlatBus()
+        bus.writeWord(0xC000, 0x1234)
+        bus.writeByte(0x0000, 0x1FF)
+        assert bus.writes == [(0xC000, 0x34), (0xC001, 0x12), (0x0000, 0xFF)]
+        assert bus.readWord(0xC000) == 0x1234
+
+    def test_memory_region(self):
+        bus = FlatBus()
+        mem, offset, available, writable = bus.getMemoryRegion(0x0150)
+        assert mem is bus.memory
+        assert (offset, available, writable) == (0x0150, 0x10000 - 0x0150, True)
+
+    def test_cpu_on_flat_bus(self):
+        bus = FlatBus()
+        # LD HL,$0010 ; LD A,$99 ; LD (HL),A
+        bus.loadROM(bytes(0x100) + bytes([0x21, 0x10, 0x00, 0x3E, 0x99, 0x77]))
+        cpu = CPU(bus)
+        for _ in range(3):
+            cpu.step()
+
+        assert bus.memory[0x0010] == 0x99
+        assert bus.writes == [(0x0010, 0x99)]
+
+    def test_reset(self):
+        bus = FlatBus()
+        bus.writeByte(0x1234, 1)
+        bus.reset()
+        assert not bus.memory.any()
+        assert bus.writes == []
+
+    region_test_cases = [
+        pytest.param(0x0150, (0x0150, 0x8000 - 0x0150, False), id="ROM"),
+        pytest.param(0x9FFF, (0x9FFF, 1, True), id="VRAM end"),
+        pytest.param(0xE000, (0xE000, 0x1E00, True), id="Echo RAM"),
+        pytest.param(0xFF80, (0xFF80, 0x7F, True), id="HRAM"),
+        pytest.param(0xFE00, None, id="OAM"),
+        pytest.param(0xFF44, None, id="IO"),
+        pytest.param(0xFFFF, None, id="IE"),
+    ]
+
+    @pytest.mark.parametrize("addr, expected", region_test_cases)
+    def test_region_bus_layout(self, addr, expected):
+        bus = RegionBus()
+        region = bus.getMemoryRegion(addr)
+        if expected is None:
+            assert region is None
+        else:
+            assert region[0] is bus.memory
+            assert region[1:] == expected
+
+        # Reads and writes stay plain everywhere
+        bus.writeByte(addr, 0x5A)
+        assert bus.readByte(addr) == 0x5A
+
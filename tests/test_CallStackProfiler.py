@@ -0,0 +1,151 @@
+import pytest
+
+from conftest import make_rom
+from GameBoy import GameBoy
+from CallStackProfiler import CallStackProfiler, loadSymbols
+from OpcodeProfiler import OpcodeProfiler
+import SDRBoy
+
+#==========================================
+#           HELPERS
+#==========================================
+
+# $0100: CALL Main ; JR -5
+# $0110 Main: CALL FFT ; NOP ; RET
+# $0120 FFT: LD B,4 ; loop: DEC B ; JR NZ,loop ; RST $08 ; RET
+# $0008: RET
+CODE = {
+    0x0008: [0xC9],
+    0x0040: [0xD9],
+    0x0100: [0xCD, 0x10, 0x01, 0x18, 0xFB],
+    0x0110: [0xCD, 0x20, 0x01, 0x00, 0xC9],
+    0x0120: [0x06, 0x04, 0x05, 0x20, 0xFD, 0xCF, 0xC9],
+}
+
+SYMBOLS = """; File generated by rgblink
+00:0110 Main
+00:0120 FFT
+00:0008 Rst08
+"""
+
+@pytest.fixture(scope="function")
+def gameboy():
+    return GameBoy(make_rom(CODE))
+
+@pytest.fixture(scope="function")
+def symbols(tmp_path):
+    path = tmp_path / "game.sym"
+    path.write_text(SYMBOLS)
+    return loadSymbols(path)
+
+def folded_dict(profiler):
+    return {line.rsplit(" ", 1)[0]: int(line.rsplit(" ", 1)[1]) for line in profiler.folded().splitlines()}
+
+#==========================================
+#           CALL STACK PROFILER TEST CASES
+#==========================================
+
+class TestCallStackProfiler:
+
+    def test_load_symbols(self, symbols):
+        assert symbols == {(0, 0x0110): "Main", (0, 0x0120): "FFT", (0, 0x0008): "Rst08"}
+
+    def test_folded_stacks(self, gameboy, symbols):
+        profiler = CallStackProfiler(gameboy.cpu, symbols).enable()
+        start = gameboy.cpu.cycles
+        gameboy.run_cycles(5000)
+
+        stacks = folded_dict(profiler)
+
+        assert set(stacks) == {"start", "start;Main", "start;Main;FFT", "start;Main;FFT;Rst08"}
+        assert sum(stacks.values()) == gameboy.cpu.cycles - start
+        assert max(stacks, key=stacks.get) == "start;Main;FFT"
+
+    def test_unnamed_routines(self, gameboy):
+        profiler = CallStackProfiler(gameboy.cpu).enable()
+        gameboy.run_cycles(500)
+
+        assert "start;$0110;$0120;RST_08" in folded_dict(profiler)
+
+    def test_stack_unwinds(self, gameboy):
+        profiler = CallStackProfiler(gameboy.cpu).enable()
+        # Through CALL Main, CALL FFT and into the loop
+        for _ in range(4):
+            gameboy.step()
+        assert [frame[1] for frame in profiler.frames] == [0x0110, 0x0120]
+
+        while gameboy.cpu.CoreWords.PC != 0x0103:
+            gameboy.step()
+        assert profiler.frames == []
+
+    def test_interrupt_entry(self, gameboy):
+        cpu = gameboy.cpu
+        profiler = CallStackProfiler(cpu).enable()
+        cpu.InterruptMask.IE = 0x01
+        cpu.InterruptMask.IF = 0x00
+        cpu.InterruptMask.IME = 1
+        cpu.InterruptMask.request(0x01)
+
+        gameboy.step()
+        assert [frame[1] for frame in profiler.frames] == [0x0040]
+        gameboy.step() # RETI
+        gameboy.run_cycles(100)
+
+        assert "start;VBlank" in folded_dict(profiler)
+
+    def test_push_ret_jump_keeps_stack(self):
+        # LD HL,$0110 ; PUSH HL ; RET (a jump to $0110, not a return)
+        code = {0x0100: [0x21, 0x10, 0x01, 0xE5, 0xC9], 0x0110: [0x18, 0xFE]}
+        gb = GameBoy(make_rom(code))
+        profiler = CallStackProfiler(gb.cpu).enable()
+
+        gb.run_cycles(200)
+
+        assert set(folded_dict(profiler)) == {"start"}
+
+    def test_disable_restores_cpu(self, gameboy):
+        cpu = gameboy.cpu
+        opcodes = dict(cpu.lr35902_opCodes)
+
+        profiler = CallStackProfiler(cpu).enable()
+        assert cpu.callStackProfiler is profiler
+        # cpu.profiler is the opcode profiler read by the performance HUD
+        assert cpu.profiler is None
+        profiler.disable()
+
+        assert all(cpu.lr35902_opCodes[op] is opcodes[op] for op in opcodes)
+        assert "interruptHandler" not in cpu.__dict__
+        assert cpu.callStackProfiler is None
+
+    def test_disable_keeps_later_wrappers(self, gameboy):
+        cpu = gameboy.cpu
+        opcodes = dict(cpu.lr35902_opCodes)
+
+        profiler = CallStackProfiler(cpu).enable()
+        opcodeProfiler = OpcodeProfiler(cpu).enable()
+        profiler.disable()
+        gameboy.run_cycles(5000)
+
+        assert opcodeProfiler.counts[0xCD] > 0
+        assert profiler.cycles == {}
+        opcodeProfiler.disable()
+        assert all(cpu.lr35902_opCodes[op] is opcodes[op] for op in opcodes)
+
+    def test_top(self, gameboy, symbols):
+        profiler = CallStackProfiler(gameboy.cpu, symbols).enable()
+        gameboy.run_cycles(5000)
+        profiler.selfCycles()
+
+        top = profiler.top(4)
+        assert top[0][0] == "FFT"
+        assert sum(share for _, share in top) == pytest.approx(100.0)
+
+    def test_main_callstack(self, tmp_path):
+        rom = tmp_path / "game.gb"
+        rom.write_bytes(make_rom(CODE))
+        (tmp_path / "game.sym").write_text(SYMBOLS)
+        out = tmp_path / "stacks.folded"
+
+        assert SDRBoy.main(["--headless", "--cycles", "5000", "--callstack", str(out), str(rom)]) == 0
+
+        assert "start;Main;FFT " in out.read_text()
@@ -0,0 +1,202 @@
+import numpy as np
+import pytest
+
+from conftest import make_rom
+from GameBoy import GameBoy
+from Disassembler import Disassembler
+from Coverage import Coverage, loadCoverage, heatmapImage, heatmapPPM, HEAT_LUT
+from OpcodeProfiler import OpcodeProfiler
+import SDRBoy
+
+#==========================================
+#           HELPERS
+#==========================================
+
+# $0100: LD HL,$C000 ; loop: CALL $4000 ; JR loop
+# $4000: LD (HL),A ; LD A,(HL) ; LD B,$47 ; RET
+PROGRAM = {
+    0x0100: [0x21, 0x00, 0xC0, 0xCD, 0x00, 0x40, 0x18, 0xFB],
+    0x4000: [0x77, 0x7E, 0x06, 0x47, 0xC9],
+}
+LOOP = [0x0103, 0x4000, 0x4001, 0x4002, 0x4004, 0x0106]
+
+@pytest.fixture(scope="function")
+def gameboy():
+    return GameBoy(make_rom(PROGRAM))
+
+def run_instructions(gameboy, count):
+    for _ in range(count):
+        gameboy.step()
+
+#==========================================
+#           COVERAGE TEST CASES
+#==========================================
+
+class TestCoverage:
+
+    def test_executed_addresses(self, gameboy):
+        coverage = Coverage(gameboy.cpu).enable()
+        # LD HL, then the loop three times
+        run_instructions(gameboy, 1 + 3 * len(LOOP))
+
+        executed = coverage.arrays()["executed"]
+        assert executed[0x0100] == 1
+        for addr in LOOP:
+            assert executed[addr] == 3, f"${addr:04X}"
+        # Operand bytes are never counted as instruction starts
+        assert executed[0x0101] == 0
+        assert int(executed.sum()) == 1 + 3 * len(LOOP)
+
+    def test_banked_execution(self, gameboy):
+        coverage = Coverage(gameboy.cpu).enable()
+        run_instructions(gameboy, 1 + len(LOOP))
+
+        rom = coverage.arrays()["rom"]
+        assert rom.shape == (2, 0x4000)
+        assert rom[0, 0x0100] == 1
+        assert rom[1, 0x0000] == 1
+        assert coverage.romCoverage() == [3, 4]
+
+    def test_bank_count_follows_rom_size(self):
+        coverage = Coverage(GameBoy(make_rom(PROGRAM, size=0x10000)).cpu)
+        assert coverage.arrays()["rom"].shape == (4, 0x4000)
+
+    def test_reads_and_writes(self, gameboy):
+        coverage = Coverage(gameboy.cpu).enable()
+        run_instructions(gameboy, 1 + 2 * len(LOOP))
+
+        assert coverage.writes[0xC000] == 2
+        assert coverage.reads[0xC000] == 2
+        # CALL pushes the return address below SP ($FFFE)
+        assert coverage.writes[0xFFFD] == 2
+        assert coverage.writes[0xFFFC] == 2
+        # Instruction fetches are reads
+        assert coverage.reads[0x0103] >= 2
+
+    def test_hotspots(self, gameboy):
+        coverage = Coverage(gameboy.cpu).enable()
+        run_instructions(gameboy, 1 + 4 * len(LOOP))
+
+        hot = coverage.hotspots(3)
+        assert len(hot) == 3
+        assert all(count == 4 for _, count in hot)
+        assert {addr for addr, _ in hot} <= set(LOOP)
+
+    def test_io_accesses(self):
+        # LD A,$E4 ; LD ($FF47),A twice, then read it back with LD A,($FF47)
+        code = {0x0100: [0x3E, 0xE4, 0x21, 0x47, 0xFF, 0x77, 0x77, 0x7E, 0x18, 0xFE]}
+        gb = GameBoy(make_rom(code))
+        coverage = Coverage(gb.cpu).enable()
+        run_instructions(gb, 5)
+
+        assert coverage.ioAccesses() == [("BGP", 1, 2)]
+
+    def test_disable_restores(self, gameboy):
+        cpu = gameboy.cpu
+        opcodes = dict(cpu.lr35902_opCodes)
+        coverage = Coverage(cpu).enable()
+        assert cpu.coverage is coverage
+        coverage.disable()
+
+        assert all(cpu.lr35902_opCodes[op] is opcodes[op] for op in opcodes)
+        assert "readByte" not in gameboy.bus.__dict__
+        assert "writeByte" not in gameboy.bus.__dict__
+        assert cpu.coverage is None
+
+        gameboy.run_cycles(100)
+        assert sum(coverage.executed) == 0
+
+    def test_disable_in_any_order(self, gameboy):
+        cpu = gameboy.cpu
+        opcodes = dict(cpu.lr35902_opCodes)
+
+        coverage = Coverage(cpu).enable()
+        profiler = OpcodeProfiler(cpu).enable()
+        coverage.disable()
+        run_instructions(gameboy, 1 + len(LOOP))
+        assert sum(coverage.executed) == 0
+        assert sum(profiler.counts) == 1 + len(LOOP)
+
+        coverage.enable()
+        profiler.disable()
+        run_instructions(gameboy, len(LOOP))
+        assert sum(coverage.executed) == len(LOOP)
+        assert sum(profiler.counts) == 1 + len(LOOP)
+
+        coverage.disable()
+        assert all(cpu.lr35902_opCodes[op] is opcodes[op] for op in opcodes)
+        assert "readByte" not in gameboy.bus.__dict__
+
+    def test_debugger_reads_are_not_counted(self, gameboy):
+        coverage = Coverage(gameboy.cpu).enable()
+        disassembler = Disassembler(gameboy.cpu, gameboy.bus)
+
+        assert disassembler.disassemble(0x100, 1) == ["0100 2100C0   LD HL,$C000"]
+        disassembler.disassemble(0xFF40, 4)
+        gameboy.bus.readRange(0xFF00, 0x100)
+
+        assert sum(coverage.reads) == 0
+
+    def test_run_cycles_counts(self, gameboy):
+        coverage = Coverage(gameboy.cpu).enable()
+        gameboy.run_cycles(1000)
+
+        assert sum(coverage.executed) == gameboy.cpu.instructions
+
+    def test_reset(self, gameboy):
+        coverage = Coverage(gameboy.cpu).enable()
+        run_instructions(gameboy, 10)
+        coverage.reset()
+        assert sum(coverage.executed) == 0
+
+        # The installed wrappers keep counting into the cleared lists
+        run_instructions(gameboy, 3)
+        assert sum(coverage.executed) == 3
+
+    def test_save_and_load(self, gameboy, tmp_path):
+        coverage = Coverage(gameboy.cpu).enable()
+        run_instructions(gameboy, 20)
+        path = tmp_path / "coverage.npz"
+        coverage.save(path)
+
+        data = loadCoverage(path)
+        assert set(data) == {"executed", "reads", "writes", "rom"}
+        for name, array in coverage.arrays().items():
+            np.testing.assert_array_equal(data[name], array)
+
+    def test_main_coverage(self, tmp_path):
+        rom = tmp_path / "game.gb"
+        rom.write_bytes(make_rom(PROGRAM))
+        out = tmp_path / "coverage.npz"
+
+        assert SDRBoy.main(["--headless", "--cycles", "2000", "--coverage", str(out), str(rom)]) == 0
+
+        data = loadCoverage(out)
+        assert data["executed"][0x4000] > 0
+
+#==========================================
+#           HEATMAP TEST CASES
+#==========================================
+
+class TestHeatmap:
+
+    def test_image_layout(self):
+        counts = np.zeros(0x10000)
+        counts[0xFF47] = 100
+        counts[0xC000] = 1
+        image = heatmapImage(counts)
+
+        assert image.shape == (256, 256, 3)
+        np.testing.assert_array_equal(image[0xFF, 0x47], HEAT_LUT[255])
+        np.testing.assert_array_equal(image[0x00, 0x00], HEAT_LUT[0])
+        # Log scaled, a single access is still visible
+        assert image[0xC0, 0x00].any()
+
+    def test_empty_counts(self):
+        assert not heatmapImage([0] * 0x10000).any()
+
+    def test_ppm(self):
+        ppm = heatmapPPM([0] * 0x10000, scale=2)
+        header = b"P6\n512 512\n255\n"
+        assert ppm.startswith(header)
+        assert len(ppm) == len(header) + 512 * 512 * 3
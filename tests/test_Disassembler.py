@@ -0,0 +1,103 @@
+import pytest
+
+from GameBoy import GameBoy
+from Disassembler import Disassembler, decodeCB
+
+#==========================================
+#           PYTEST FIXTURES
+#==========================================
+
+PROGRAM = [0x00, 0x01, 0x34, 0x12, 0x18, 0xFE, 0xCB, 0x7C, 0xE0, 0x44, 0xFA, 0x00, 0xC0, 0xF8, 0xFB, 0xD3]
+
+@pytest.fixture(scope="function")
+def gameboy():
+    rom = bytearray(0x8000)
+    rom[0x100:0x100 + len(PROGRAM)] = bytes(PROGRAM)
+    return GameBoy(bytes(rom))
+
+@pytest.fixture(scope="function")
+def disassembler(gameboy):
+    return Disassembler(gameboy.cpu, gameboy.bus)
+
+#==========================================
+#           DISASSEMBLER TEST CASES
+#==========================================
+
+class TestDisassembler:
+
+    def test_format_table(self, disassembler):
+        lines = disassembler.disassemble(0x100, 7)
+
+        assert lines == [
+            "0100 00       NOP",
+            "0101 013412   LD BC,$1234",
+            "0104 18FE     JR -2",
+            "0106 CB7C     BIT 7,H",
+            "0108 E044     LDH ($FF44),A",
+            "010A FA00C0   LD A,($C000)",
+            "010D F8FB     LD HL,SP-5",
+        ]
+
+    cb_test_cases = [
+        pytest.param(0x00, "RLC B", id="RLC B"),
+        pytest.param(0x1E, "RR (HL)", id="RR (HL)"),
+        pytest.param(0x37, "SWAP A", id="SWAP A"),
+        pytest.param(0x46, "BIT 0,(HL)", id="BIT 0,(HL)"),
+        pytest.param(0x9D, "RES 3,L", id="RES 3,L"),
+        pytest.param(0xFF, "SET 7,A", id="SET 7,A"),
+    ]
+
+    @pytest.mark.parametrize("cb_opcode, expected", cb_test_cases)
+    def test_decode_cb(self, cb_opcode, expected):
+        assert decodeCB(cb_opcode) == expected
+
+    def test_illegal_opcode(self, disassembler):
+        assert disassembler.disassemble(0x10F, 1) == ["010F: D3 ???"]
+
+    def test_rom_lines_are_cached(self, disassembler):
+        disassembler.disassemble(0x100, 5)
+        calls = []
+        original = disassembler.decodeUncached
+        disassembler.decodeUncached = lambda addr: calls.append(addr) or original(addr)
+
+        disassembler.disassemble(0x100, 5)
+
+        assert calls == []
+        assert (0, 0x0101) in disassembler.cache
+
+    def test_ram_lines_follow_writes(self, gameboy, disassembler):
+        gameboy.bus.writeByte(0xC000, 0x3E) # LD A,$12
+        gameboy.bus.writeByte(0xC001, 0x12)
+        assert disassembler.disassemble(0xC000, 1) == ["C000 3E12     LD A,$12"]
+
+        gameboy.bus.writeByte(0xC001, 0x34)
+        assert disassembler.disassemble(0xC000, 1) == ["C000 3E34     LD A,$34"]
+
+        gameboy.bus.writeByte(0xC000, 0x04) # INC B
+        assert disassembler.disassemble(0xC000, 1) == ["C000 04       INC B"]
+
+    def test_io_is_not_cached(self, disassembler):
+        disassembler.disassemble(0xFF40, 2)
+
+        assert not any(addr >= 0xFF00 for _, addr in disassembler.cache)
+
+    def test_new_rom_clears_cache(self, gameboy, disassembler):
+        disassembler.disassemble(0x100, 1)
+
+        rom = bytearray(0x8000)
+        rom[0x100] = 0x76 # HALT
+        gameboy.loadROM(bytes(rom))
+
+        assert disassembler.disassemble(0x100, 1) == ["0100 76       HALT"]
+
+    def test_wrapped_table_entries(self, gameboy):
+        # Profilers, traces and traps replace table entries with wrappers of other names
+        table = gameboy.cpu.lr35902_opCodes
+        for opcode, (func, length, cycles, flags) in list(table.items()):
+            def wrapped(operandAddr, func=func):
+                return func(operandAddr)
+            table[opcode] = (wrapped, length, cycles, flags)
+
+        lines = Disassembler(gameboy.cpu, gameboy.bus).disassemble(0x100, 2)
+
+        assert lines == ["0100 00       NOP", "0101 013412   LD BC,$1234"]
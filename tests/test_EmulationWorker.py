@@ -0,0 +1,143 @@
+import pytest
+import time
+
+from conftest import make_rom
+from GameBoy import GameBoy
+from EmulationWorker import EmulationWorker, TripleBuffer, FrameSnapshot
+import EmulationWorker as Worker
+
+#==========================================
+#           HELPERS
+#==========================================
+
+# INC A ; JR -3
+LOOP_PROGRAM = [0x3C, 0x18, 0xFD]
+
+def wait_for_frame(worker, predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        frame = worker.frames.latest()
+        if frame is not None and predicate(frame):
+            return frame
+        time.sleep(0.001)
+    pytest.fail("Worker did not publish the expected frame")
+
+@pytest.fixture(scope="function")
+def worker():
+    worker = EmulationWorker(GameBoy(make_rom(LOOP_PROGRAM)))
+    worker.start()
+
+    yield worker
+
+    worker.stop(timeout=5.0)
+
+#==========================================
+#           TRIPLE BUFFER TEST CASES
+#==========================================
+
+class TestTripleBuffer:
+
+    def test_nothing_published(self):
+        buffer = TripleBuffer(list)
+        assert buffer.latest() is None
+
+    def test_latest_wins(self):
+        buffer = TripleBuffer(lambda: [0])
+        for value in (1, 2, 3):
+            buffer.back()[0] = value
+            buffer.publish()
+
+        assert buffer.latest() == [3]
+        assert buffer.latest() is None
+
+    def test_reader_slot_is_not_reused_by_writer(self):
+        buffer = TripleBuffer(lambda: [0])
+        buffer.back()[0] = 1
+        buffer.publish()
+        front = buffer.latest()
+
+        for value in (2, 3, 4):
+            assert buffer.back() is not front
+            buffer.back()[0] = value
+            buffer.publish()
+
+        assert front == [1]
+        assert buffer.latest() == [4]
+
+#==========================================
+#           WORKER TEST CASES
+#==========================================
+
+class TestEmulationWorker:
+
+    def test_starts_paused(self, worker):
+        frame = wait_for_frame(worker, lambda f: True)
+
+        assert frame.paused
+        assert frame.registers["PC"] == 0x0100
+
+    def test_step(self, worker):
+        worker.post(Worker.STEP)
+        frame = wait_for_frame(worker, lambda f: f.registers["PC"] == 0x0101)
+
+        assert frame.cycles == 4
+        worker.post(Worker.STEP)
+        wait_for_frame(worker, lambda f: f.registers["PC"] == 0x0100)
+
+    def test_resume_and_pause(self, worker):
+        worker.post(Worker.RESUME)
+        wait_for_frame(worker, lambda f: f.cycles > 0 and not f.paused)
+
+        worker.post(Worker.PAUSE)
+        paused = wait_for_frame(worker, lambda f: f.paused)
+        time.sleep(0.05)
+
+        # Nothing is published or executed while paused
+        assert worker.frames.latest() is None
+        assert worker.gameboy.cpu.cycles == paused.cycles
+
+    def test_reset(self, worker):
+        worker.post(Worker.RESUME)
+        wait_for_frame(worker, lambda f: f.cycles > 0)
+
+        worker.post(Worker.RESET)
+        frame = wait_for_frame(worker, lambda f: f.paused and f.cycles == 0)
+
+        assert frame.registers["PC"] == 0x0100
+
+    def test_error_pauses_worker(self):
+        worker = EmulationWorker(GameBoy(make_rom([0x21, 0x00, 0x00, 0x77]))) # LD HL,$0000 ; LD (HL),A writes ROM
+        worker.start()
+        worker.post(Worker.RESUME)
+
+        frame = wait_for_frame(worker, lambda f: f.error is not None)
+        worker.stop(timeout=5.0)
+
+        assert frame.paused
+
+    def test_snapshot_copies_framebuffer(self):
+        gb = GameBoy()
+        snapshot = FrameSnapshot()
+        gb.ppu.framebuffer[0, 0] = (9, 9, 9)
+        snapshot.capture(gb, paused=True)
+        gb.ppu.framebuffer[0, 0] = (0, 0, 0)
+
+        assert tuple(snapshot.framebuffer[0, 0]) == (9, 9, 9)
+
+    def test_speed_command(self, worker):
+        worker.post((Worker.SPEED, 0))
+        worker.post(Worker.STEP)
+        wait_for_frame(worker, lambda f: f.registers["PC"] == 0x0101)
+
+        assert worker.pacer.turbo
+
+    def test_locked_cpu_pauses(self):
+        worker = EmulationWorker(GameBoy(make_rom([0xD3]))) # Illegal opcode
+        worker.start()
+        wait_for_frame(worker, lambda f: True) # Initial snapshot
+        worker.post(Worker.RESUME)
+
+        frame = wait_for_frame(worker, lambda f: f.paused)
+        worker.stop(timeout=5.0)
+
+        assert frame.registers["PC"] == 0x0100
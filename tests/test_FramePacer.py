@@ -0,0 +1,94 @@
+import pytest
+
+from FramePacer import FramePacer, FRAME_RATE, MAX_LAG
+from PPU import CYCLES_PER_FRAME
+
+#==========================================
+#           HELPERS
+#==========================================
+
+FRAME_TIME = 1 / FRAME_RATE
+
+class FakeClock:
+    """Clock whose time only moves when the emulator 'works' or the pacer sleeps or spins."""
+
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def __call__(self):
+        # Each clock read while spinning advances time slightly
+        self.now += 0.0001
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+@pytest.fixture(scope="function")
+def clock():
+    return FakeClock()
+
+#==========================================
+#           FRAME PACER TEST CASES
+#==========================================
+
+class TestFramePacer:
+
+    def test_frame_rate(self):
+        assert FRAME_RATE == pytest.approx(59.7275, abs=1e-4)
+
+    @pytest.mark.parametrize("speed", [1.0, 0.5, 2.0])
+    def test_real_time_pacing(self, clock, speed):
+        pacer = FramePacer(speed, clock=clock, sleep=clock.sleep)
+        start = clock.now
+
+        for _ in range(60):
+            clock.now += 0.002 # Emulating a frame takes 2 ms
+            pacer.wait()
+
+        expected = 60 * FRAME_TIME / speed
+        assert clock.now - start == pytest.approx(expected, abs=0.002)
+        stats = pacer.stats()
+        assert stats["realtime_percent"] == pytest.approx(100 * speed, rel=0.01)
+        assert stats["frame_ms"] == pytest.approx(1000 * FRAME_TIME / speed, rel=0.01)
+        assert stats["jitter_ms"] < 0.1
+
+    def test_turbo_never_sleeps(self, clock):
+        pacer = FramePacer(0, clock=clock, sleep=clock.sleep)
+
+        for _ in range(10):
+            clock.now += 0.001
+            assert pacer.wait() == 0.0
+
+        assert clock.slept == []
+        assert pacer.stats()["realtime_percent"] > 1000
+
+    def test_partial_frames_pace_by_cycles(self, clock):
+        pacer = FramePacer(1.0, clock=clock, sleep=clock.sleep)
+        start = clock.now
+
+        for _ in range(4):
+            pacer.wait(CYCLES_PER_FRAME // 4)
+
+        assert clock.now - start == pytest.approx(FRAME_TIME, abs=0.001)
+
+    def test_falling_behind_restarts_schedule(self, clock):
+        pacer = FramePacer(1.0, clock=clock, sleep=clock.sleep)
+
+        clock.now += MAX_LAG + 1.0 # One very slow frame
+        pacer.wait()
+        clock.slept.clear()
+        start = clock.now
+        pacer.wait()
+
+        # The next frame is paced normally rather than skipped to catch up
+        assert clock.now - start == pytest.approx(FRAME_TIME, abs=0.001)
+
+    def test_set_speed_resets_stats(self, clock):
+        pacer = FramePacer(1.0, clock=clock, sleep=clock.sleep)
+        pacer.wait()
+        pacer.setSpeed(0)
+
+        assert pacer.turbo
+        assert pacer.stats()["frames"] == 0
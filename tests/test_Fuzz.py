@@ -0,0 +1,151 @@
+import json
+
+import numpy as np
+import pytest
+
+import Fuzz
+from Fuzz import (ENGINES, Engine, MATCH, MISMATCH, ERROR, makeCPU, loadState, captureState, runCase,
+                  runBatch, runFuzz, instructionCases, idiomCases, regionIdiomCases, stepOne, runOne, main)
+from Idioms import IDIOMS
+
+#==========================================
+#           HELPERS
+#==========================================
+
+# LD A,$42 with every register and memory byte chosen by the case
+CASE = {"A": 0x01, "F": 0xB0, "B": 0x02, "C": 0x03, "D": 0x04, "E": 0x05, "H": 0xC0, "L": 0x10,
+        "SP": 0xD000, "PC": 0x2000, "seed": 7, "code": [0x3E, 0x42]}
+
+def broken_engine(damage):
+    """The run engine with `damage(cpu)` applied after each instruction."""
+    def execute(cpu, case):
+        runOne(cpu, case)
+        damage(cpu)
+    return Engine("broken", instructionCases, execute, stepOne)
+
+@pytest.fixture(scope="module")
+def cpus():
+    return makeCPU(), makeCPU()
+
+#==========================================
+#           STATE TEST CASES
+#==========================================
+
+class TestFuzzState:
+
+    def test_load_state(self):
+        cpu = makeCPU()
+        loadState(cpu, CASE)
+        state = captureState(cpu)
+
+        for name in ("A", "F", "B", "C", "D", "E", "H", "L", "SP", "PC"):
+            assert state[name] == CASE[name], name
+        assert state["cycles"] == 0
+        assert list(cpu.Bus.memory[0x2000:0x2002]) == [0x3E, 0x42]
+        assert cpu.Bus.writes == []
+
+    def test_memory_is_reproducible(self):
+        first, second = makeCPU(), makeCPU()
+        loadState(first, CASE)
+        loadState(second, CASE)
+        np.testing.assert_array_equal(first.Bus.memory, second.Bus.memory)
+
+    def test_instruction_cases(self):
+        cases = instructionCases(np.random.default_rng(1), 50, [0x00, 0xCB])
+        assert len(cases) == 50
+        assert {case["code"][0] for case in cases} <= {0x00, 0xCB}
+        assert all(case["F"] & 0x0F == 0 for case in cases)
+
+    def test_idiom_cases(self):
+        for case in idiomCases(np.random.default_rng(2), 50):
+            kind, param = IDIOMS[bytes(case["code"])]
+            counter = case["B"] << 8 | case["C"] if kind == "copy" else case[param[0]]
+            assert 1 <= counter <= Fuzz.MAX_LOOP
+
+    def test_region_idiom_cases(self):
+        for case in regionIdiomCases(np.random.default_rng(3), 50):
+            for high, low in (("H", "L"), ("D", "E")):
+                addr = case[high] << 8 | case[low]
+                distance = min(min(abs(addr - bound), 0x10000 - abs(addr - bound)) for bound in Fuzz.REGION_BOUNDARIES)
+                assert distance <= Fuzz.MAX_LOOP
+
+#==========================================
+#           COMPARISON TEST CASES
+#==========================================
+
+class TestFuzzComparison:
+
+    def test_match(self, cpus):
+        assert runCase(ENGINES["run"], *cpus, CASE) == (MATCH, None)
+
+    def test_register_mismatch(self, cpus):
+        def damage(cpu):
+            cpu.Flags.c = 1 - cpu.Flags.c
+        status, details = runCase(broken_engine(damage), *cpus, CASE)
+
+        assert status == MISMATCH
+        assert set(details) == {"F"}
+
+    def test_memory_mismatch(self, cpus):
+        status, details = runCase(broken_engine(lambda cpu: cpu.Bus.writeByte(0xC123, 0xEE)), *cpus, CASE)
+
+        assert status == MISMATCH
+        assert details["writes"][1] == [(0xC123, 0xEE)]
+        assert details["memory"][0][0] == 0xC123
+
+    def test_exception_mismatch(self, cpus):
+        def damage(cpu):
+            raise ValueError("boom")
+        assert runCase(broken_engine(damage), *cpus, CASE) == (MISMATCH, {"exception": [None, "ValueError"]})
+
+    def test_shared_exception(self, cpus):
+        def execute(cpu, case):
+            raise KeyError(case["PC"])
+        engine = Engine("both", instructionCases, execute, execute)
+        assert runCase(engine, *cpus, CASE) == (ERROR, "KeyError")
+
+#==========================================
+#           HARNESS TEST CASES
+#==========================================
+
+class TestFuzzHarness:
+
+    @pytest.mark.parametrize("engine", sorted(ENGINES))
+    def test_engines_match_reference(self, engine):
+        result = runBatch(engine, seed=3, index=0, size=100)
+
+        assert result["counts"][MISMATCH] == 0, result["mismatches"]
+        assert sum(result["counts"].values()) == 100
+
+    def test_batches_are_deterministic(self):
+        assert runBatch("run", 5, 2, 50) == runBatch("run", 5, 2, 50)
+
+    def test_opcode_filter(self):
+        result = runBatch("run", 0, 0, 20, opcodes=[0x00])
+        assert result["counts"][MATCH] == 20
+
+    def test_pool_matches_serial(self):
+        serial = runFuzz("run", cases=120, seed=4, jobs=1, batch=50)
+        pooled = runFuzz("run", cases=120, seed=4, jobs=2, batch=50)
+
+        assert sum(serial["counts"].values()) == 120
+        assert pooled == serial
+
+    def test_main(self, tmp_path, capsys):
+        out = tmp_path / "fuzz.json"
+        assert main(["run", "--cases", "60", "--jobs", "1", "--json", str(out)]) == 0
+
+        assert "run      60 cases" in capsys.readouterr().out
+        results = json.loads(out.read_text())
+        assert results[0]["engine"] == "run"
+
+    def test_strict_fails_on_errors(self, capsys):
+        # E8 (ADD SP,e8) raises in both engines on negative offsets
+        args = ["run", "--cases", "60", "--jobs", "1", "--opcodes", "E8"]
+        assert main(args) == 0
+        assert main(args + ["--strict"]) == 1
+        assert "both raise  E8" in capsys.readouterr().out
+
+    def test_unknown_engine(self):
+        with pytest.raises(SystemExit):
+            main(["jit"])
@@ -0,0 +1,64 @@
+import pytest
+
+from GameBoy import GameBoy
+
+#==========================================
+#       MACHINE OWNERSHIP TEST CASES
+#==========================================
+
+class TestGameBoy:
+
+    def test_components_are_wired(self):
+        gb = GameBoy()
+
+        assert gb.cpu.Bus is gb.bus
+        assert gb.ppu.Bus is gb.bus
+        assert gb.bus.cpu is gb.cpu
+        assert gb.bus.ppu is gb.ppu
+        assert gb.bus.interrupts is gb.cpu.InterruptMask
+
+    def test_instances_are_independent(self):
+        gb1 = GameBoy()
+        gb2 = GameBoy()
+
+        for a, b in [(gb1.bus, gb2.bus), (gb1.cpu, gb2.cpu), (gb1.ppu, gb2.ppu),
+                     (gb1.cpu.CoreReg, gb2.cpu.CoreReg), (gb1.cpu.Flags, gb2.cpu.Flags),
+                     (gb1.cpu.CoreWords, gb2.cpu.CoreWords), (gb1.cpu.InterruptMask, gb2.cpu.InterruptMask)]:
+            assert a is not b
+
+        gb1.cpu.CoreReg.A = 0x12
+        gb2.cpu.CoreReg.A = 0x34
+        gb1.bus.writeByte(0xC000, 0xAA)
+        gb1.bus.writeByte(0x8000, 0xBB)
+        gb1.bus.writeByte(0xFFFF, 0x1F)
+
+        assert gb1.cpu.CoreReg.A == 0x12
+        assert gb2.cpu.CoreReg.A == 0x34
+        assert gb2.bus.readByte(0xC000) == 0x00
+        assert gb2.bus.readByte(0x8000) == 0x00
+        assert gb2.bus.readByte(0xFFFF) == 0x00
+
+    def test_instances_run_independently(self):
+        # LD A,$01 ; INC A ; JR -3
+        program = bytes([0x3E, 0x01, 0x3C, 0x18, 0xFD])
+        rom = bytearray(0x8000)
+        rom[0x100:0x100 + len(program)] = program
+
+        gb1 = GameBoy(bytes(rom))
+        gb2 = GameBoy(bytes(rom))
+
+        gb1.run_cycles(1000)
+        gb2.run_cycles(100)
+
+        assert gb1.cpu.cycles != gb2.cpu.cycles
+        assert gb1.cpu.CoreReg.A != gb2.cpu.CoreReg.A
+
+    def test_reset(self):
+        gb = GameBoy()
+        gb.bus.writeByte(0xC000, 0x55)
+        gb.cpu.CoreWords.PC = 0x1234
+
+        gb.reset()
+
+        assert gb.bus.readByte(0xC000) == 0x00
+        assert gb.cpu.CoreWords.PC == 0x0100
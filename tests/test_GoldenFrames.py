@@ -0,0 +1,138 @@
+import os
+import struct
+import zlib
+
+import pytest
+
+import numpy as np
+
+from conftest import make_rom
+import GoldenFrames
+from GoldenFrames import shadeIndices, frameHash, findROM, renderROM, checkFrame, loadManifest, TEST_ROM_ROOT
+from PPU import DMG_COLORS
+from Screen import encodePNG
+
+#==========================================
+#           HELPERS
+#==========================================
+
+# LD HL,$FF47 ; LD A,$E4 ; LD (HL),A ; LD L,$40 ; LD A,$91 ; LD (HL),A ; JR -2   (BGP = E4, LCD and BG on)
+LCD_ON_PROGRAM = [0x21, 0x47, 0xFF, 0x3E, 0xE4, 0x77, 0x2E, 0x40, 0x3E, 0x91, 0x77, 0x18, 0xFE]
+
+# tests/roms/checkerboard.gb, the golden frame always checked:
+# LD HL,$FF40 ; XOR A ; LD (HL),A                                  (LCD off)
+# LD HL,$8010 ; LD B,16 ; LD A,$FF ; tile: LD (HL+),A ; DEC B ; JR NZ,tile   (tile 1 black)
+# LD HL,$9800 ; map: LD A,L ; RRCA x5 ; XOR L ; AND 1 ; LD (HL+),A ; LD A,H ; CP $9C ; JR NZ,map
+# LD HL,$FF47 ; LD A,$E4 ; LD (HL),A ; LD L,$40 ; LD A,$91 ; LD (HL),A ; JR -2
+CHECKERBOARD_PROGRAM = [0x21, 0x40, 0xFF, 0xAF, 0x77,
+                        0x21, 0x10, 0x80, 0x06, 0x10, 0x3E, 0xFF, 0x22, 0x05, 0x20, 0xFC,
+                        0x21, 0x00, 0x98, 0x7D, 0x0F, 0x0F, 0x0F, 0x0F, 0x0F, 0xAD, 0xE6, 0x01,
+                        0x22, 0x7C, 0xFE, 0x9C, 0x20, 0xF1,
+                        0x21, 0x47, 0xFF, 0x3E, 0xE4, 0x77, 0x2E, 0x40, 0x3E, 0x91, 0x77, 0x18, 0xFE]
+
+def shade_frame(shades):
+    return np.array(DMG_COLORS, dtype=np.uint8)[shades]
+
+def decode_png(data):
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    pos, idat = 8, b""
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        assert struct.unpack(">I", data[pos + 8 + length:pos + 12 + length])[0] == zlib.crc32(kind + body)
+        if kind == b"IHDR":
+            width, height = struct.unpack(">II", body[:8])
+        elif kind == b"IDAT":
+            idat += body
+        pos += 12 + length
+    rows = np.frombuffer(zlib.decompress(idat), dtype=np.uint8).reshape(height, width * 3 + 1)
+    assert not rows[:, 0].any()
+    return rows[:, 1:].reshape(height, width, 3)
+
+@pytest.fixture(scope="function")
+def shades():
+    return np.random.default_rng(43).integers(0, 4, size=(144, 160), dtype=np.uint8)
+
+#==========================================
+#           GOLDEN FRAME TEST CASES
+#==========================================
+
+class TestGoldenFrames:
+
+    def test_shade_indices(self, shades):
+        np.testing.assert_array_equal(shadeIndices(shade_frame(shades)), shades)
+
+    def test_hash_is_stable_and_sensitive(self, shades):
+        digest = frameHash(shade_frame(shades))
+        assert digest == frameHash(shade_frame(shades.copy()))
+
+        shades[143, 159] ^= 1
+        assert frameHash(shade_frame(shades)) != digest
+
+    def test_png_only_written_on_mismatch(self, shades, tmp_path):
+        frame = shade_frame(shades)
+        png = tmp_path / "out" / "frame.png"
+
+        assert checkFrame(frame, frameHash(frame), png) == frameHash(frame)
+        assert not png.exists()
+
+        checkFrame(frame, "0" * 32, png)
+        np.testing.assert_array_equal(decode_png(png.read_bytes()), frame)
+
+    def test_encode_png(self, shades):
+        frame = shade_frame(shades)
+        np.testing.assert_array_equal(decode_png(encodePNG(frame)), frame)
+
+    def test_render_rom(self, tmp_path):
+        path = tmp_path / "lcd_on.gb"
+        path.write_bytes(make_rom(LCD_ON_PROGRAM))
+
+        framebuffer = renderROM(path, 3)
+
+        # Blank tile data with BGP = E4 is shade 0 everywhere
+        assert frameHash(framebuffer) == frameHash(shade_frame(np.zeros((144, 160), dtype=np.uint8)))
+
+    def test_checkerboard_rom(self):
+        path = os.path.join(TEST_ROM_ROOT, "checkerboard.gb")
+        with open(path, "rb") as f:
+            assert f.read() == make_rom(CHECKERBOARD_PROGRAM)
+
+        # 8x8 black and white squares, white in the top left corner
+        rows, cols = np.indices((144, 160))
+        expected = 3 * (((rows // 8) + (cols // 8)) % 2)
+        np.testing.assert_array_equal(shadeIndices(renderROM(path, 3)), expected)
+
+    def test_main_update_and_check(self, tmp_path):
+        (tmp_path / "roms").mkdir()
+        (tmp_path / "roms" / "lcd_on.gb").write_bytes(make_rom(LCD_ON_PROGRAM))
+        manifest = tmp_path / "golden.json"
+        manifest.write_text('{"lcd_on.gb": {"frames": 2, "hash": null}, "missing.gb": {"frames": 2, "hash": null}}')
+        args = ["--manifest", str(manifest), "--roms", str(tmp_path / "roms"), "--out", str(tmp_path / "out")]
+
+        assert GoldenFrames.main(args + ["--update"]) == 0
+        assert loadManifest(manifest)["lcd_on.gb"]["hash"] is not None
+        assert GoldenFrames.main(args) == 0
+        assert not (tmp_path / "out").exists()
+
+        data = loadManifest(manifest)
+        data["lcd_on.gb"]["hash"] = "0" * 32
+        GoldenFrames.saveManifest(data, manifest)
+        assert GoldenFrames.main(args) == 1
+        assert (tmp_path / "out" / "lcd_on.png").exists()
+
+#==========================================
+#           GOLDEN FRAMES FROM THE MANIFEST
+#==========================================
+
+@pytest.mark.parametrize("rom, entry", sorted(loadManifest().items()))
+def test_golden_frame(rom, entry, tmp_path):
+    path = findROM(rom)
+    if path is None:
+        pytest.skip(f"{rom} not found in gb-test-roms or tests/roms")
+    if entry["hash"] is None:
+        pytest.skip(f"No golden hash recorded for {rom} (python GoldenFrames.py --update)")
+
+    png = tmp_path / "mismatch.png"
+    actual = checkFrame(renderROM(path, entry["frames"]), entry["hash"], png)
+
+    assert actual == entry["hash"], f"Frame differs from the golden frame, written to {png}"
@@ -0,0 +1,109 @@
+import os
+import pytest
+import subprocess
+import sys
+
+import numpy as np
+
+from conftest import make_rom
+from GameBoy import GameBoy
+from Headless import runHeadless, dumpFramebuffer
+import SDRBoy
+
+#==========================================
+#           HELPERS
+#==========================================
+
+# Sends "Hi", waiting for each transfer to finish:
+# LD HL,$FF01 ; LD A,'H' ; LD (HL+),A ; LD A,$81 ; LD (HL),A ; wait: BIT 7,(HL) ; JR NZ,wait ; DEC L
+# LD A,'i' ; LD (HL+),A ; LD A,$81 ; LD (HL),A ; wait: BIT 7,(HL) ; JR NZ,wait ; JR -2
+SERIAL_PROGRAM = [0x21, 0x01, 0xFF, 0x3E, 0x48, 0x22, 0x3E, 0x81, 0x77, 0xCB, 0x7E, 0x20, 0xFC, 0x2D,
+                  0x3E, 0x69, 0x22, 0x3E, 0x81, 0x77, 0xCB, 0x7E, 0x20, 0xFC, 0x18, 0xFE]
+
+@pytest.fixture(scope="function")
+def rom_path(tmp_path):
+    path = tmp_path / "serial.gb"
+    path.write_bytes(make_rom(SERIAL_PROGRAM))
+    return path
+
+#==========================================
+#           HEADLESS TEST CASES
+#==========================================
+
+class TestHeadless:
+
+    def test_cycle_budget(self):
+        gb = GameBoy(make_rom(SERIAL_PROGRAM))
+        result = runHeadless(gb, cycles=100000)
+
+        assert result.reason == "cycles"
+        assert 100000 <= result.cycles < 100000 + 24
+        assert gb.cpu.cycles == result.cycles
+
+    def test_frame_budget(self):
+        gb = GameBoy(make_rom(SERIAL_PROGRAM))
+        gb.ppu.LCDC = 0x91
+        result = runHeadless(gb, frames=3)
+
+        assert result.reason == "frames"
+        assert result.frames == 3
+        assert gb.ppu.frameCount == 3
+
+    def test_first_budget_wins(self):
+        gb = GameBoy(make_rom(SERIAL_PROGRAM))
+        result = runHeadless(gb, cycles=1000, frames=100, seconds=60)
+
+        # Budgets are checked between frames when a frame budget is given
+        assert result.reason == "cycles"
+        assert result.frames == 1
+
+    def test_seconds_budget(self):
+        gb = GameBoy(make_rom(SERIAL_PROGRAM))
+        result = runHeadless(gb, seconds=0.05)
+
+        assert result.reason == "seconds"
+        assert result.cycles > 0
+
+    def test_locked_cpu_stops(self):
+        gb = GameBoy(make_rom([0xD3])) # Illegal opcode
+        result = runHeadless(gb, frames=10)
+
+        assert result.reason == "locked"
+
+    def test_budget_required(self):
+        with pytest.raises(ValueError):
+            runHeadless(GameBoy())
+
+    def test_dump_framebuffer(self, tmp_path):
+        gb = GameBoy()
+        gb.ppu.framebuffer[10, 20] = (1, 2, 3)
+
+        dumpFramebuffer(gb.ppu, tmp_path / "frame.npy")
+        np.testing.assert_array_equal(np.load(tmp_path / "frame.npy"), gb.ppu.framebuffer)
+
+        dumpFramebuffer(gb.ppu, tmp_path / "frame.ppm")
+        data = (tmp_path / "frame.ppm").read_bytes()
+        header = b"P6\n160 144\n255\n"
+        assert data.startswith(header)
+        assert data[len(header) + (10 * 160 + 20) * 3:][:3] == bytes((1, 2, 3))
+
+    def test_main_headless(self, rom_path, tmp_path):
+        serial = tmp_path / "serial.txt"
+        frame = tmp_path / "frame.ppm"
+
+        exit_code = SDRBoy.main(["--headless", "--frames", "2", "--serial-out", str(serial),
+                                 "--dump-frame", str(frame), str(rom_path)])
+
+        assert exit_code == 0
+        assert serial.read_bytes() == b"Hi"
+        assert frame.exists()
+
+    def test_headless_does_not_import_tkinter(self, rom_path):
+        # In a fresh interpreter, other tests in this process may already have imported it
+        script = ("import sys, SDRBoy\n"
+                  f"code = SDRBoy.main(['--headless', '--frames', '1', {str(rom_path)!r}])\n"
+                  "sys.exit(code or ('tkinter' in sys.modules and 'tkinter imported'))\n")
+        result = subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(SDRBoy.__file__),
+                                capture_output=True, text=True)
+
+        assert result.returncode == 0, result.stderr
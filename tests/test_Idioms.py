@@ -0,0 +1,171 @@
+import pytest
+
+from conftest import CODE_ADDR, load_code
+from GameBoy import GameBoy
+from Idioms import COPY_LOOP_BC, COPY_LOOP_CB, FILL_LOOP_INC_B, FILL_LOOP_DEC_C
+import numpy as np
+
+#==========================================
+#           PYTEST FIXTURES
+#==========================================
+
+@pytest.fixture(scope="function")
+def gameboy():
+    return GameBoy()
+
+@pytest.fixture(scope="function")
+def bus(gameboy):
+    return gameboy.bus
+
+@pytest.fixture(scope="function")
+def cpu(gameboy):
+    cpu = gameboy.cpu
+    cpu.Flags.flagReset()
+    return cpu
+
+#==========================================
+#           HELPERS
+#==========================================
+
+LOOP_ADDR = CODE_ADDR
+
+def snapshot(cpu):
+    return {
+        "A": int(cpu.CoreReg.A),
+        "F": int(cpu.Flags.F),
+        "BC": int(cpu.CoreWords.BC),
+        "DE": int(cpu.CoreWords.DE),
+        "HL": int(cpu.CoreWords.HL),
+        "SP": int(cpu.CoreWords.SP),
+        "PC": int(cpu.CoreWords.PC),
+    }
+
+def run_until(cpu, end_pc, limit=200000):
+    cycles = 0
+    steps = 0
+    while int(cpu.CoreWords.PC) != end_pc:
+        cycles += cpu.step()
+        steps += 1
+        assert steps < limit, "Loop did not terminate"
+    return cycles, steps
+
+def run_both(cpu, setup, code):
+    """Runs the loop once stepped and once bulk executed, returning both results."""
+    results = []
+    for idioms in (False, True):
+        cpu.reset()
+        cpu.Bus.reset()
+        cpu.Bus.ppu.reset()
+        load_code(cpu, code)
+        setup(cpu)
+        cpu.Idioms.enabled = idioms
+        cycles, steps = run_until(cpu, LOOP_ADDR + len(code))
+        memory = (cpu.Bus.wram.copy(), cpu.Bus.ppu.vram.copy(), cpu.Bus.hram.copy())
+        results.append((snapshot(cpu), cycles, steps, memory))
+    return results
+
+#==========================================
+#           IDIOM TEST CASES
+#==========================================
+
+class TestIdioms:
+
+    copy_test_cases = [
+        # code, source, destination, count, id
+        pytest.param(COPY_LOOP_BC, 0xC100, 0x8000, 0x0010, id="Copy WRAM -> VRAM"),
+        pytest.param(COPY_LOOP_BC, 0xD000, 0xC200, 0x0001, id="Copy single byte"),
+        pytest.param(COPY_LOOP_CB, 0xC100, 0x9800, 0x0400, id="Copy tile map (LD A,C / OR B)"),
+        pytest.param(COPY_LOOP_BC, 0xC200, 0xC100, 0x0180, id="Copy overlapping, destination below source"),
+    ]
+
+    @pytest.mark.parametrize("code, source, destination, count", copy_test_cases)
+    def test_copy_loop_matches_stepping(self, cpu, code, source, destination, count):
+        pattern = np.arange(count, dtype=np.uint32) * 7 + 3
+
+        def setup(c):
+            for i in range(count):
+                c.Bus.writeByte(source + i, int(pattern[i] & 0xFF))
+            c.CoreWords.HL = source
+            c.CoreWords.DE = destination
+            c.CoreWords.BC = count
+            c.Flags.c = 1
+
+        stepped, bulk = run_both(cpu, setup, code)
+
+        assert bulk[2] == 1, "Bulk execution should finish the loop in a single step"
+        assert bulk[0] == stepped[0], "Registers and flags must match stepped execution"
+        assert bulk[1] == stepped[1], "Cycle count must match stepped execution"
+        for stepped_mem, bulk_mem in zip(stepped[3], bulk[3]):
+            np.testing.assert_array_equal(bulk_mem, stepped_mem)
+
+    fill_test_cases = [
+        # code, start, count, value, id
+        pytest.param(FILL_LOOP_INC_B, 0x8000, 0x20, 0x00, id="Clear VRAM with LD (HL+),A / DEC B"),
+        pytest.param(FILL_LOOP_INC_B, 0xFF80, 0x00, 0x5A, id="Fill HRAM with B = 0 (256 iterations would overflow)"),
+        pytest.param(FILL_LOOP_INC_B, 0xC100, 0x00, 0xA5, id="Fill 256 bytes of WRAM"),
+        pytest.param(FILL_LOOP_DEC_C, 0xDFFF, 0x40, 0x11, id="Fill downwards with LD (HL-),A / DEC C"),
+    ]
+
+    @pytest.mark.parametrize("code, start, count, value", fill_test_cases)
+    def test_fill_loop_matches_stepping(self, cpu, code, start, count, value):
+        counter = "C" if code == FILL_LOOP_DEC_C else "B"
+
+        def setup(c):
+            c.CoreReg.A = value
+            c.CoreWords.HL = start
+            setattr(c.CoreReg, counter, count)
+            c.Flags.c = 1
+
+        if start == 0xFF80:
+            # 256 bytes starting in HRAM would reach the IE register, so the loop must be stepped.
+            cpu.reset()
+            load_code(cpu, code)
+            setup(cpu)
+            assert cpu.Idioms.tryExecute(LOOP_ADDR) is None
+            return
+
+        stepped, bulk = run_both(cpu, setup, code)
+
+        assert bulk[2] == 1
+        assert bulk[0] == stepped[0]
+        assert bulk[1] == stepped[1]
+        for stepped_mem, bulk_mem in zip(stepped[3], bulk[3]):
+            np.testing.assert_array_equal(bulk_mem, stepped_mem)
+
+    def test_overlapping_forward_copy_is_stepped(self, cpu):
+        load_code(cpu, COPY_LOOP_BC)
+        cpu.CoreWords.HL = 0xC100
+        cpu.CoreWords.DE = 0xC101
+        cpu.CoreWords.BC = 0x10
+
+        assert cpu.Idioms.tryExecute(LOOP_ADDR) is None
+
+    def test_io_destination_is_stepped(self, cpu):
+        load_code(cpu, COPY_LOOP_BC)
+        cpu.CoreWords.HL = 0xC100
+        cpu.CoreWords.DE = 0xFF40
+        cpu.CoreWords.BC = 0x04
+
+        assert cpu.Idioms.tryExecute(LOOP_ADDR) is None
+
+    def test_self_overwriting_loop_is_stepped(self, cpu):
+        load_code(cpu, FILL_LOOP_INC_B)
+        cpu.CoreWords.HL = LOOP_ADDR - 2
+        cpu.CoreReg.B = 0x08
+
+        assert cpu.Idioms.tryExecute(LOOP_ADDR) is None
+
+    def test_loop_overwritten_through_echo_ram_is_stepped(self, cpu):
+        # $E000-$FDFF mirrors the WRAM holding the loop
+        load_code(cpu, FILL_LOOP_INC_B)
+        cpu.CoreWords.HL = LOOP_ADDR + 0x2000 - 2
+        cpu.CoreReg.B = 0x08
+
+        assert cpu.Idioms.tryExecute(LOOP_ADDR) is None
+
+        load_code(cpu, COPY_LOOP_BC)
+        cpu.CoreWords.HL = 0xC100
+        cpu.CoreWords.DE = LOOP_ADDR + 0x2000
+        cpu.CoreWords.BC = 0x04
+
+        assert cpu.Idioms.tryExecute(LOOP_ADDR) is None
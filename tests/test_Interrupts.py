@@ -0,0 +1,133 @@
+import pytest
+
+from conftest import CODE_ADDR, load_code
+from GameBoy import GameBoy
+
+#==========================================
+#           PYTEST FIXTURES
+#==========================================
+
+@pytest.fixture(scope="function")
+def gameboy():
+    return GameBoy()
+
+@pytest.fixture(scope="function")
+def bus(gameboy):
+    return gameboy.bus
+
+@pytest.fixture(scope="function")
+def cpu(gameboy):
+    cpu = gameboy.cpu
+    cpu.Flags.flagReset()
+    cpu.Bus.writeByte(0xFF0F, 0x00)
+    return cpu
+
+#==========================================
+#           INTERRUPT TEST CASES
+#==========================================
+
+class TestInterrupts:
+
+    priority_test_cases = [
+        # IE, IF, expected handler, expected IF afterwards, id
+        pytest.param(0x1F, 0x01, 0x40, 0x00, id="VBLANK"),
+        pytest.param(0x1F, 0x02, 0x48, 0x00, id="LCD STAT"),
+        pytest.param(0x1F, 0x04, 0x50, 0x00, id="TIMER"),
+        pytest.param(0x1F, 0x08, 0x58, 0x00, id="SERIAL"),
+        pytest.param(0x1F, 0x10, 0x60, 0x00, id="JOYPAD"),
+        pytest.param(0x1F, 0x06, 0x48, 0x04, id="LCD STAT beats TIMER"),
+        pytest.param(0x1C, 0x07, 0x50, 0x03, id="Disabled interrupts are skipped"),
+    ]
+
+    @pytest.mark.parametrize("ie, if_reg, expected_pc, expected_if", priority_test_cases)
+    def test_dispatch(self, cpu, ie, if_reg, expected_pc, expected_if):
+        load_code(cpu, [0x00])
+        cpu.CoreWords.SP = 0xDFF0
+        cpu.Bus.writeByte(0xFFFF, ie)
+        cpu.Bus.writeByte(0xFF0F, if_reg)
+        cpu.InterruptMask.IME = 1
+
+        cycles = cpu.step()
+
+        assert cycles == 20
+        assert cpu.CoreWords.PC == expected_pc
+        assert cpu.CoreWords.SP == 0xDFEE
+        # The return address (not SP) is pushed
+        assert cpu.Bus.readWord(0xDFEE) == CODE_ADDR
+        assert cpu.Bus.readByte(0xFF0F) & 0x1F == expected_if
+        assert cpu.InterruptMask.IME == 0
+
+    def test_no_dispatch_without_ime(self, cpu):
+        load_code(cpu, [0x00])
+        cpu.Bus.writeByte(0xFFFF, 0x01)
+        cpu.Bus.writeByte(0xFF0F, 0x01)
+
+        assert cpu.InterruptMask.pending is False
+        assert cpu.step() == 4
+        assert cpu.CoreWords.PC == CODE_ADDR + 1
+
+    def test_pending_bit_tracks_register_writes(self, cpu):
+        imask = cpu.InterruptMask
+        imask.IME = 1
+        assert imask.pending is False
+
+        cpu.Bus.writeByte(0xFFFF, 0x04)
+        assert imask.pending is False
+        cpu.Bus.writeByte(0xFF0F, 0x04)
+        assert imask.pending is True
+        cpu.Bus.writeByte(0xFFFF, 0x00)
+        assert imask.pending is False
+
+    def test_ei_takes_effect_after_next_instruction(self, cpu):
+        load_code(cpu, [0xFB, 0x00, 0x00]) # EI ; NOP ; NOP
+        cpu.Bus.writeByte(0xFFFF, 0x01)
+        cpu.Bus.writeByte(0xFF0F, 0x01)
+
+        cpu.step() # EI
+        assert cpu.InterruptMask.IME == 0
+        cpu.step() # NOP still runs with interrupts disabled
+        assert cpu.CoreWords.PC == CODE_ADDR + 2
+
+        assert cpu.step() == 20
+        assert cpu.CoreWords.PC == 0x40
+        assert cpu.Bus.readWord(cpu.CoreWords.SP) == CODE_ADDR + 2
+
+    def test_di_cancels_pending_ei(self, cpu):
+        load_code(cpu, [0xFB, 0xF3, 0x00]) # EI ; DI ; NOP
+        cpu.Bus.writeByte(0xFFFF, 0x01)
+        cpu.Bus.writeByte(0xFF0F, 0x01)
+
+        cpu.step()
+        cpu.step()
+        assert cpu.step() == 4
+        assert cpu.CoreWords.PC == CODE_ADDR + 3
+        assert cpu.InterruptMask.pending is False
+
+    def test_halt_wakes_without_ime(self, cpu):
+        load_code(cpu, [0x76, 0x00]) # HALT ; NOP
+        cpu.Bus.writeByte(0xFFFF, 0x04)
+
+        cpu.step()
+        assert cpu.Halted
+        assert cpu.step() == 4
+        assert cpu.Halted
+
+        cpu.Bus.writeByte(0xFF0F, 0x04)
+        cpu.step()
+        assert not cpu.Halted
+        assert cpu.CoreWords.PC == CODE_ADDR + 2
+
+    def test_vblank_serviced_by_run_loop(self, cpu):
+        ppu = cpu.Bus.ppu
+        ppu.LCDC = 0x91
+        load_code(cpu, [0x18, 0xFE]) # JR -2
+        cpu.CoreWords.SP = 0xDFF0
+        cpu.Bus.writeByte(0xFFFF, 0x01)
+        cpu.InterruptMask.IME = 1
+
+        cpu.run_frame()
+        assert ppu.frameCount == 1
+
+        assert cpu.run_cycles(1) == 20
+        assert cpu.CoreWords.PC == 0x40
+        assert cpu.Bus.readWord(0xDFEE) == CODE_ADDR
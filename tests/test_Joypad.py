@@ -0,0 +1,112 @@
+import pytest
+
+from GameBoy import GameBoy
+
+#==========================================
+#           PYTEST FIXTURES
+#==========================================
+
+@pytest.fixture(scope="function")
+def gameboy():
+    gb = GameBoy()
+    gb.bus.writeByte(0xFF0F, 0x00)
+    return gb
+
+def p1(gb):
+    return int(gb.bus.readByte(0xFF00))
+
+#==========================================
+#           JOYPAD TEST CASES
+#==========================================
+
+class TestJoypad:
+
+    def test_nothing_pressed(self, gameboy):
+        assert p1(gameboy) == 0xFF
+        gameboy.bus.writeByte(0xFF00, 0x10)
+        assert p1(gameboy) == 0xDF
+
+    read_test_cases = [
+        # pressed, select, expected
+        pytest.param(["RIGHT", "UP"], 0x20, 0xEA, id="Directions selected"),
+        pytest.param(["RIGHT", "UP"], 0x10, 0xDF, id="Directions pressed, actions selected"),
+        pytest.param(["A", "START"], 0x10, 0xD6, id="Actions selected"),
+        pytest.param(["DOWN", "B"], 0x00, 0xC5, id="Both groups selected"),
+        pytest.param(["DOWN", "B"], 0x30, 0xFF, id="Neither group selected"),
+    ]
+
+    @pytest.mark.parametrize("pressed, select, expected", read_test_cases)
+    def test_p1_read(self, gameboy, pressed, select, expected):
+        gameboy.bus.writeByte(0xFF00, select)
+        for button in pressed:
+            gameboy.joypad.press(button)
+        gameboy.joypad.processEvents()
+
+        assert p1(gameboy) == expected
+
+    def test_events_wait_for_frame(self, gameboy):
+        gameboy.bus.writeByte(0xFF00, 0x20)
+        gameboy.joypad.press("LEFT")
+
+        assert p1(gameboy) == 0xEF
+
+        gameboy.run_frame()
+        assert p1(gameboy) == 0xED
+
+        gameboy.joypad.release("LEFT")
+        gameboy.run_frame()
+        assert p1(gameboy) == 0xEF
+
+    def test_press_requests_interrupt(self, gameboy):
+        gameboy.bus.writeByte(0xFF00, 0x10) # Actions selected
+        gameboy.joypad.press("A")
+        gameboy.joypad.processEvents()
+
+        assert gameboy.cpu.InterruptMask.IF & 0x10
+
+    def test_unselected_press_does_not_interrupt(self, gameboy):
+        gameboy.bus.writeByte(0xFF00, 0x10) # Actions selected
+        gameboy.joypad.press("UP")
+        gameboy.joypad.processEvents()
+
+        assert not gameboy.cpu.InterruptMask.IF & 0x10
+
+        # Selecting the group with the held button pulls a line low
+        gameboy.bus.writeByte(0xFF00, 0x20)
+        assert gameboy.cpu.InterruptMask.IF & 0x10
+
+    def test_release_does_not_interrupt(self, gameboy):
+        gameboy.bus.writeByte(0xFF00, 0x10)
+        gameboy.joypad.press("B")
+        gameboy.joypad.processEvents()
+        gameboy.bus.writeByte(0xFF0F, 0x00)
+
+        gameboy.joypad.release("B")
+        gameboy.joypad.processEvents()
+
+        assert not gameboy.cpu.InterruptMask.IF & 0x10
+
+    def test_press_wakes_stop(self, gameboy):
+        rom = bytearray(0x8000)
+        rom[0x100:0x104] = bytes([0x10, 0x00, 0x18, 0xFE]) # STOP ; JR -2
+        gameboy.loadROM(bytes(rom))
+        gameboy.bus.writeByte(0xFF00, 0x10)
+
+        gameboy.step()
+        assert gameboy.cpu.Stopped
+        gameboy.run_frame()
+        assert gameboy.cpu.Stopped
+
+        gameboy.joypad.press("START")
+        gameboy.run_frame()
+        assert not gameboy.cpu.Stopped
+        assert gameboy.cpu.CoreWords.PC == 0x0102
+
+    def test_reset_releases_buttons(self, gameboy):
+        gameboy.bus.writeByte(0xFF00, 0x10)
+        gameboy.joypad.press("A")
+        gameboy.joypad.processEvents()
+
+        gameboy.reset()
+
+        assert p1(gameboy) == 0xFF
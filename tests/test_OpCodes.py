@@ -1,7 +1,6 @@
 import pytest
 
-from CPU import CPU
-from Bus import Bus
+from GameBoy import GameBoy
 import numpy as np
 
 #==========================================
@@ -9,29 +8,18 @@ import numpy as np
 #==========================================
 
 @pytest.fixture(scope="function")
-def cpu(bus): # Added bus dependency
-    cpu = CPU()
-    cpu.Flags.flagReset()
-    # cpu.Bus is already the singleton, which 'bus' fixture also uses/resets.
-    # We don't strictly need to assign cpu.Bus = bus because it's a singleton,
-    # but the dependency ensures 'bus' fixture runs first (init PPU).
-    
-    yield cpu 
+def gameboy():
+    return GameBoy()
 
-    cpu.reset() # Reset Singleton state for next test
+@pytest.fixture(scope="function")
+def bus(gameboy):
+    return gameboy.bus
 
 @pytest.fixture(scope="function")
-def bus():
-    bus = Bus()
-    # Ensure PPU is initialized and attached
-    from PPU import PPU
-    bus.ppu = PPU()
-    
-    yield bus
-
-    bus.reset()
-    if bus.ppu:
-        bus.ppu.reset() # Reset PPU singleton too
+def cpu(gameboy):
+    cpu = gameboy.cpu
+    cpu.Flags.flagReset()
+    return cpu
 
 #==========================================
 #           OP CODE TEST CASES            
@@ -548,7 +536,7 @@ class TestOpCodes:
     ldh_test_cases = [
         # --- LDH A, (C) ---
         pytest.param("_ldh_a_mc", 0x42, 0x00, 0x55, 0x55, 0x55, id="LDH A, (C): Load 0x55"),
-        pytest.param("_ldh_a_mc", 0x00, 0xFF, 0xAA, 0xAA, 0xAA, id="LDH A, (C): C=0x00, Load 0xAA"),
+        pytest.param("_ldh_a_mc", 0x80, 0xFF, 0xAA, 0xAA, 0xAA, id="LDH A, (C): C=0x80, Load 0xAA"),
 
         # --- LDH (C), A ---
         pytest.param("_ldh_mc_a", 0x43, 0x66, 0x00, 0x66, 0x66, id="LDH (C), A: Store 0x66"),
@@ -0,0 +1,149 @@
+import json
+
+import pytest
+
+from Coverage import Coverage
+from Disassembler import Disassembler
+from conftest import make_rom
+from GameBoy import GameBoy
+from OpcodeProfiler import OpcodeProfiler, CB_OFFSET
+import SDRBoy
+
+#==========================================
+#           HELPERS
+#==========================================
+
+# loop: ADD A,B ; SWAP A ; INC C ; JR loop
+PROGRAM = [0x80, 0xCB, 0x37, 0x0C, 0x18, 0xFA]
+
+class FakeClock:
+    """Advances half a second per reading, so every timed dispatch takes exactly 0.5s."""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 0.5
+        return self.now
+
+@pytest.fixture(scope="function")
+def gameboy():
+    return GameBoy(make_rom(PROGRAM))
+
+def run_loops(gameboy, loops):
+    for _ in range(loops * 4): # ADD, SWAP, INC, JR
+        gameboy.step()
+
+#==========================================
+#           OPCODE PROFILER TEST CASES
+#==========================================
+
+class TestOpcodeProfiler:
+
+    def test_counts(self, gameboy):
+        profiler = OpcodeProfiler(gameboy.cpu).enable()
+        run_loops(gameboy, 10)
+
+        assert profiler.counts[0x80] == 10
+        assert profiler.counts[CB_OFFSET + 0x37] == 10
+        assert profiler.counts[0x0C] == 10
+        assert profiler.counts[0xCB] == 0
+        assert sum(profiler.counts) == 40
+
+    def test_run_loop_is_profiled(self, gameboy):
+        profiler = OpcodeProfiler(gameboy.cpu).enable()
+        gameboy.run_cycles(1000)
+
+        assert profiler.counts[0x18] == gameboy.cpu.instructions // 4
+
+    def test_sampling(self, gameboy):
+        profiler = OpcodeProfiler(gameboy.cpu, sampleEvery=4, clock=FakeClock()).enable()
+        run_loops(gameboy, 10)
+
+        assert profiler.sampled[0x80] == 2
+        assert profiler.sampledTime[0x80] == pytest.approx(1.0)
+        row = next(row for row in profiler.stats() if row["opcode"] == "80")
+        assert row["name"] == "ADD A,B"
+        assert row["estimated_seconds"] == pytest.approx(5.0)
+
+    def test_disable_restores_tables(self, gameboy):
+        cpu = gameboy.cpu
+        opcodes = dict(cpu.lr35902_opCodes)
+        cb = dict(cpu.cb_prefix_table)
+
+        profiler = OpcodeProfiler(cpu).enable()
+        assert cpu.lr35902_opCodes[0x80] is not opcodes[0x80]
+        assert cpu.profiler is profiler
+
+        profiler.disable()
+        assert cpu.lr35902_opCodes == opcodes
+        assert all(cpu.lr35902_opCodes[op] is opcodes[op] for op in opcodes)
+        assert all(cpu.cb_prefix_table[op] is cb[op] for op in cb)
+        assert cpu.profiler is None
+
+        run_loops(gameboy, 5)
+        assert sum(profiler.counts) == 0
+
+    def test_disable_keeps_later_wrappers(self, gameboy):
+        cpu = gameboy.cpu
+        original = cpu.lr35902_opCodes[0x80]
+        hits = []
+
+        profiler = OpcodeProfiler(cpu).enable()
+        cpu.setTrap(0x80, lambda c: hits.append(c) and False)
+        profiler.disable()
+        run_loops(gameboy, 2)
+
+        assert len(hits) == 2
+        assert sum(profiler.counts) == 0
+        cpu.clearTrap(0x80)
+        assert cpu.lr35902_opCodes[0x80] is original
+
+    def test_profiling_does_not_change_execution(self):
+        plain = GameBoy(make_rom(PROGRAM))
+        profiled = GameBoy(make_rom(PROGRAM))
+        OpcodeProfiler(profiled.cpu, sampleEvery=1).enable()
+
+        plain.run_cycles(5000)
+        profiled.run_cycles(5000)
+
+        assert profiled.cpu.cycles == plain.cpu.cycles
+        assert int(profiled.cpu.CoreWords.PC) == int(plain.cpu.CoreWords.PC)
+        assert int(profiled.cpu.CoreReg.A) == int(plain.cpu.CoreReg.A)
+
+    def test_reset_keeps_counting(self, gameboy):
+        profiler = OpcodeProfiler(gameboy.cpu).enable()
+        run_loops(gameboy, 3)
+        profiler.reset()
+        run_loops(gameboy, 2)
+
+        assert profiler.counts[0x80] == 2
+
+    def test_top_and_table(self, gameboy):
+        profiler = OpcodeProfiler(gameboy.cpu, sampleEvery=1, clock=FakeClock()).enable()
+        run_loops(gameboy, 4)
+        gameboy.step() # One extra ADD A,B
+
+        top = profiler.top(2)
+        assert top[0] == ("ADD A,B", pytest.approx(100 * 5 / 17))
+        assert sum(share for _, share in profiler.top(10)) == pytest.approx(100.0)
+        assert "CB 37   CB SWAP A" in profiler.table()
+
+    def test_names_and_disassembly_with_wrapped_tables(self, gameboy):
+        # Another feature wrapped the table first; the profiler still names the handlers
+        Coverage(gameboy.cpu).enable()
+        profiler = OpcodeProfiler(gameboy.cpu).enable()
+        run_loops(gameboy, 1)
+
+        assert {name for name, _ in profiler.top(10)} == {"ADD A,B", "CB SWAP A", "INC C", "JR r8"}
+        assert Disassembler(gameboy.cpu, gameboy.bus).disassemble(0x100, 1) == ["0100 80       ADD A,B"]
+
+    def test_main_profile(self, tmp_path):
+        rom = tmp_path / "loop.gb"
+        rom.write_bytes(make_rom(PROGRAM))
+        out = tmp_path / "profile.json"
+
+        assert SDRBoy.main(["--headless", "--cycles", "2000", f"--profile={out}", str(rom)]) == 0
+
+        data = json.loads(out.read_text())
+        names = {row["name"] for row in data["opcodes"]}
+        assert names == {"ADD A,B", "CB SWAP A", "INC C", "JR r8"}
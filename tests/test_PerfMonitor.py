@@ -0,0 +1,88 @@
+import pytest
+
+from conftest import make_rom
+from GameBoy import GameBoy
+from PerfMonitor import PerfMonitor, formatStats
+from FramePacer import CPU_CLOCK_HZ
+
+#==========================================
+#           HELPERS
+#==========================================
+
+class FakeClock:
+    def __init__(self):
+        self.now = 10.0
+
+    def __call__(self):
+        return self.now
+
+class FakeProfiler:
+    def top(self, n):
+        return [("_ld_b_b", 42.0)][:n]
+
+#==========================================
+#           PERF MONITOR TEST CASES
+#==========================================
+
+class TestPerfMonitor:
+
+    def test_instruction_counters(self):
+        gb = GameBoy(make_rom([0x00, 0x00, 0x18, 0xFC])) # NOP ; NOP ; JR -4
+
+        gb.cpu.step()
+        gb.cpu.run_cycles(16 * 3)
+
+        # 1 stepped + 16 * 3 cycles of NOP/NOP/JR (4 + 4 + 12 cycles per pass)
+        assert gb.cpu.instructions == 1 + 8
+        gb.cpu.reset()
+        assert gb.cpu.instructions == 0
+
+    def test_rates(self):
+        gb = GameBoy(make_rom([0x18, 0xFE]))
+        clock = FakeClock()
+        monitor = PerfMonitor(gb, clock=clock)
+
+        gb.ppu.LCDC = 0x91
+        for _ in range(3):
+            gb.cpu.run_frame()
+        gb.ppu.renderTime = 0.1
+        clock.now += 2.0
+
+        stats = monitor.sample(emulationTime=0.5, guiTime=0.2)
+
+        assert stats["fps"] == pytest.approx(1.5)
+        assert stats["mips"] == pytest.approx(gb.cpu.instructions / 2.0 / 1e6)
+        assert stats["realtime_percent"] == pytest.approx(100.0 * gb.cpu.cycles / CPU_CLOCK_HZ / 2.0)
+        assert stats["cpu_percent"] == pytest.approx(20.0)
+        assert stats["ppu_percent"] == pytest.approx(5.0)
+        assert stats["gui_percent"] == pytest.approx(10.0)
+        assert stats["top"] is None
+
+    def test_reset_skips_sample(self):
+        gb = GameBoy(make_rom([0x18, 0xFE]))
+        clock = FakeClock()
+        monitor = PerfMonitor(gb, clock=clock)
+        gb.cpu.run_cycles(1000)
+        clock.now += 1.0
+        monitor.sample()
+
+        gb.cpu.reset()
+        clock.now += 1.0
+
+        assert monitor.sample() is None
+        clock.now += 1.0
+        assert monitor.sample() is not None
+
+    def test_profiler_top(self):
+        gb = GameBoy(make_rom([0x18, 0xFE]))
+        clock = FakeClock()
+        monitor = PerfMonitor(gb, clock=clock)
+        gb.cpu.profiler = FakeProfiler()
+        clock.now += 1.0
+
+        lines = formatStats(monitor.sample())
+
+        assert lines[-1] == "Top _ld_b_b 42%"
+
+    def test_format_without_sample(self):
+        assert len(formatStats(None)) == 2
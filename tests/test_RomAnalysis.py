@@ -0,0 +1,132 @@
+import pytest
+
+from conftest import make_rom
+from GameBoy import GameBoy
+from Disassembler import Disassembler
+from RomAnalysis import analyzeROM, loadAnalysis, FALL, JUMP, BRANCH, CALL, TABLE
+
+#==========================================
+#           HELPERS
+#==========================================
+
+# Vectors are RET so they form tiny functions of their own
+VECTORS = {vector: [0xC9] for vector in (0x00, 0x08, 0x10, 0x18, 0x20, 0x28, 0x30, 0x38, 0x40, 0x48, 0x50, 0x58, 0x60)}
+
+def analysis_rom(code):
+    """code maps address -> list of bytes, written over the vectors"""
+    return make_rom({**{vector: ret for vector, ret in VECTORS.items() if vector not in code}, **code})
+
+@pytest.fixture(scope="function")
+def disassembler():
+    gb = GameBoy()
+    return Disassembler(gb.cpu, gb.bus)
+
+PROGRAM = {
+    0x0100: [0x00, 0xC3, 0x50, 0x01],              # NOP ; JP $0150
+    0x0150: [0x06, 0x05,                           # LD B,$05
+             0x05,                                 # loop: DEC B
+             0x20, 0xFD,                           # JR NZ,loop
+             0xCD, 0x00, 0x02,                     # CALL $0200
+             0xC3, 0x00, 0xC0],                    # JP $C000 (RAM)
+    0x0200: [0x3C, 0xC9],                          # INC A ; RET
+}
+
+#==========================================
+#           ROM ANALYSIS TEST CASES
+#==========================================
+
+class TestRomAnalysis:
+
+    def test_blocks_and_edges(self, disassembler):
+        analysis = analyzeROM(analysis_rom(PROGRAM), disassembler)
+        blocks = analysis.blocks
+
+        assert blocks[0x0100].successors == [(JUMP, 0x0150)]
+        # The loop target splits the block after LD B,$05
+        assert blocks[0x0150].end == 0x0152
+        assert blocks[0x0150].successors == [(FALL, 0x0152)]
+        assert blocks[0x0152].successors == [(BRANCH, 0x0152), (FALL, 0x0155)]
+        assert blocks[0x0155].successors == [(CALL, 0x0200), (FALL, 0x0158)]
+        assert blocks[0x0158].successors == [(JUMP, 0xC000)]
+        assert blocks[0x0200].successors == []
+
+        assert 0x0200 in analysis.functions
+        assert 0x0100 in analysis.functions
+        assert analysis.externalTargets == {0xC000}
+        assert sorted(analysis.predecessors(0x0152)) == [0x0150, 0x0152]
+
+    def test_block_lookup_and_lines(self, disassembler):
+        analysis = analyzeROM(analysis_rom(PROGRAM), disassembler)
+
+        assert analysis.blockAt(0x0153).start == 0x0152
+        assert analysis.blockAt(0x0154) is None
+        assert (0x0155, 3, "0155 CD0002   CALL $0200") in analysis.lines()
+
+    def test_data_after_jump_is_not_decoded(self, disassembler):
+        rom = analysis_rom({0x0100: [0x18, 0x02, 0xD3, 0xDB, 0x76, 0x18, 0xFE]}) # JR +2 ; data ; HALT ; JR -2
+        analysis = analyzeROM(rom, disassembler)
+
+        assert analysis.blockAt(0x0102) is None
+        assert analysis.blockAt(0x0104).start == 0x0104
+        assert not analysis.illegal
+
+    def test_jump_table_dispatcher(self, disassembler):
+        rom = analysis_rom({
+            # RST $28 dispatcher: ADD A,A ; POP HL ; LD E,A ; LD D,$00 ; ADD HL,DE ; LD A,(HL+) ; LD H,(HL) ; LD L,A ; JP HL
+            0x0028: [0x87, 0xE1, 0x5F, 0x16, 0x00, 0x19, 0x2A, 0x66, 0x6F, 0xE9],
+            0x0100: [0xEF,                          # RST $28
+                     0x00, 0x03, 0x10, 0x03,        # dw $0300, $0310
+                     0xFF, 0xFF],                   # not a table entry
+            0x0300: [0xC9],
+            0x0310: [0x18, 0xFE],
+        })
+        analysis = analyzeROM(rom, disassembler)
+
+        assert analysis.jumpTables == {0x0101: [0x0300, 0x0310]}
+        assert analysis.blocks[0x0100].successors == [(CALL, 0x0028), (TABLE, 0x0300), (TABLE, 0x0310)]
+        assert analysis.blockAt(0x0101) is None
+        assert 0x0310 in analysis.blocks
+
+    def test_cache_round_trip(self, disassembler, tmp_path):
+        rom = analysis_rom(PROGRAM)
+        first = loadAnalysis(rom, disassembler, cacheDir=tmp_path)
+        files = list(tmp_path.iterdir())
+        assert len(files) == 1
+        assert first.romHash in files[0].name
+
+        second = loadAnalysis(rom, None, cacheDir=tmp_path) # No disassembler needed on a cache hit
+
+        assert sorted(second.blocks) == sorted(first.blocks)
+        assert second.lines() == first.lines()
+
+    def test_corrupt_cache_is_rebuilt(self, disassembler, tmp_path):
+        rom = analysis_rom(PROGRAM)
+        loadAnalysis(rom, disassembler, cacheDir=tmp_path)
+        path = next(tmp_path.iterdir())
+        path.write_bytes(b"not a pickle")
+
+        analysis = loadAnalysis(rom, disassembler, cacheDir=tmp_path)
+
+        assert 0x0150 in analysis.blocks
+
+    def test_preload_disassembler(self):
+        gb = GameBoy(analysis_rom(PROGRAM))
+        disassembler = Disassembler(gb.cpu, gb.bus)
+        disassembler.preload(analyzeROM(gb.bus.rom_data, disassembler))
+        disassembler.decodeUncached = None # Every line must come from the cache
+
+        assert disassembler.disassemble(0x0150, 3) == ["0150 0605     LD B,$05", "0152 05       DEC B", "0153 20FD     JR NZ,-3"]
+
+    def test_disassembler_analyzes_loaded_roms(self, tmp_path):
+        gb = GameBoy(analysis_rom(PROGRAM))
+        disassembler = Disassembler(gb.cpu, gb.bus, analyze=True, cacheDir=tmp_path)
+
+        assert 0x0150 in disassembler.analysis.blocks
+        assert (0, 0x0153) in disassembler.cache
+        assert len(list(tmp_path.iterdir())) == 1
+
+        # A new ROM is analyzed when the disassembler next runs
+        gb.loadROM(analysis_rom({0x0100: [0xC3, 0x00, 0x02], 0x0200: [0x18, 0xFE]})) # JP $0200 ; JR -2
+        assert disassembler.disassemble(0x0200, 1) == ["0200 18FE     JR -2"]
+        assert 0x0200 in disassembler.analysis.blocks
+        assert 0x0150 not in disassembler.analysis.blocks
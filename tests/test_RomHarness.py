@@ -0,0 +1,154 @@
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from conftest import make_rom
+import RomHarness
+from RomHarness import (findRoms, romId, runRom, runSuite, findRegressions, writeJUnit, PASSED, FAILED, TIMEOUT, LOCKED,
+                        MOONEYE)
+
+#==========================================
+#           HELPERS
+#==========================================
+
+# Prints the zero terminated string at $0200 over the serial port, then loops forever
+PRINT_PROGRAM = [0x11, 0x00, 0x02, 0x21, 0x01, 0xFF,
+                 0x1A, 0xA7, 0x28, 0x0E, 0x22, 0x3E, 0x81, 0x32,
+                 0x2C, 0x7E, 0x2D, 0xCB, 0x7F, 0x20, 0xF9, 0x13, 0x18, 0xEE,
+                 0x18, 0xFE]
+
+# LD B,b ; LD C,c ; LD D,d ; LD E,e ; LD H,h ; LD L,l ; LD B,B ; JR -2
+def mooneye_program(b, c, d, e, h, l):
+    return [0x06, b, 0x0E, c, 0x16, d, 0x1E, e, 0x26, h, 0x2E, l, 0x40, 0x18, 0xFE]
+
+def print_rom(text):
+    return make_rom({0x100: PRINT_PROGRAM, 0x200: text})
+
+@pytest.fixture(scope="function")
+def rom_dir(tmp_path):
+    suite = tmp_path / "cpu_instrs"
+    (suite / "individual").mkdir(parents=True)
+    (suite / "individual" / "01-special.gb").write_bytes(print_rom(b"01-special\n\n\nPassed\n"))
+    (suite / "individual" / "02-interrupts.gb").write_bytes(print_rom(b"02-interrupts\n\n\nFailed #4\n"))
+    (suite / "individual" / "03-op sp,hl.gb").write_bytes(print_rom(b"03-op sp,hl\n\n\n"))
+    (suite / "individual" / "04-op r,imm.gb").write_bytes(make_rom([0xD3]))
+    (suite / "readme.txt").write_text("not a ROM")
+    return suite
+
+@pytest.fixture(scope="function")
+def mooneye_dir(tmp_path):
+    suite = tmp_path / "acceptance"
+    suite.mkdir()
+    (suite / "div_timing.gb").write_bytes(make_rom(mooneye_program(3, 5, 8, 13, 21, 34)))
+    (suite / "ei_timing.gb").write_bytes(make_rom(mooneye_program(*[0x42] * 6)))
+    (suite / "halt_ime0_ei.gb").write_bytes(make_rom([0x18, 0xFE]))
+    return suite
+
+#==========================================
+#           HARNESS TEST CASES
+#==========================================
+
+class TestRomHarness:
+
+    def test_find_roms(self, rom_dir):
+        names = [path.rsplit("/", 1)[-1] for path in findRoms(str(rom_dir))]
+        assert names == ["01-special.gb", "02-interrupts.gb", "03-op sp,hl.gb", "04-op r,imm.gb"]
+
+    rom_test_cases = [
+        pytest.param("01-special.gb", PASSED, "", id="Passed"),
+        pytest.param("02-interrupts.gb", FAILED, "Failed #4", id="Failed"),
+        pytest.param("03-op sp,hl.gb", TIMEOUT, "No verdict after", id="No verdict"),
+        pytest.param("04-op r,imm.gb", LOCKED, "Illegal opcode at $0100", id="Illegal opcode"),
+    ]
+
+    @pytest.mark.parametrize("rom, expected_status, expected_message", rom_test_cases)
+    def test_run_rom(self, rom_dir, rom, expected_status, expected_message):
+        result = runRom(str(rom_dir / "individual" / rom), cycles=200000)
+
+        assert result["status"] == expected_status
+        assert result["message"].startswith(expected_message)
+
+    def test_missing_rom_is_error(self, tmp_path):
+        result = runRom(str(tmp_path / "missing.gb"))
+
+        assert result["status"] == "error"
+        assert "FileNotFoundError" in result["message"]
+
+    def test_parallel_matches_serial(self, rom_dir):
+        roms = findRoms(str(rom_dir))
+
+        parallel = runSuite(roms, jobs=2, cycles=200000)
+        serial = runSuite(roms, jobs=1, cycles=200000)
+
+        assert [r["status"] for r in parallel] == [r["status"] for r in serial]
+        assert [r["output"] for r in parallel] == [r["output"] for r in serial]
+
+    def test_regressions(self):
+        baseline = {"results": [{"id": "a.gb", "status": PASSED}, {"id": "b.gb", "status": FAILED},
+                                {"id": "c.gb", "status": PASSED}]}
+        results = [{"id": "a.gb", "status": TIMEOUT}, {"id": "b.gb", "status": FAILED}, {"id": "c.gb", "status": PASSED}]
+
+        assert findRegressions(results, baseline) == ["a.gb"]
+
+    def test_same_name_in_different_directories(self, tmp_path):
+        (tmp_path / "mbc1").mkdir()
+        (tmp_path / "mbc5").mkdir()
+        (tmp_path / "mbc1" / "rom_512kb.gb").write_bytes(print_rom(b"Passed\n"))
+        (tmp_path / "mbc5" / "rom_512kb.gb").write_bytes(print_rom(b"Passed\n"))
+        baseline = {"results": runSuite(findRoms(str(tmp_path)), jobs=1, cycles=200000, root=str(tmp_path))}
+        assert [r["id"] for r in baseline["results"]] == ["mbc1/rom_512kb.gb", "mbc5/rom_512kb.gb"]
+
+        (tmp_path / "mbc5" / "rom_512kb.gb").write_bytes(print_rom(b"Failed\n"))
+        results = runSuite(findRoms(str(tmp_path)), jobs=1, cycles=200000, root=str(tmp_path))
+
+        assert findRegressions(results, baseline) == ["mbc5/rom_512kb.gb"]
+
+    def test_rom_id(self, tmp_path):
+        rom = str(tmp_path / "acceptance" / "bits" / "reg_f.gb")
+
+        assert romId(rom, str(tmp_path)) == "acceptance/bits/reg_f.gb"
+        assert romId(rom) == "reg_f.gb"
+
+    def test_junit_report(self, rom_dir, tmp_path):
+        results = runSuite(findRoms(str(rom_dir)), jobs=1, cycles=200000, root=str(rom_dir))
+        writeJUnit(results, tmp_path / "report.xml")
+
+        suite = ET.parse(tmp_path / "report.xml").getroot()
+        assert suite.get("tests") == "4"
+        assert suite.get("failures") == "3"
+        cases = {case.get("name"): case for case in suite.iter("testcase")}
+        assert cases["individual/01-special.gb"].find("failure") is None
+        assert cases["individual/02-interrupts.gb"].find("failure").get("message") == "Failed #4"
+        assert cases["individual/02-interrupts.gb"].get("classname") == "individual"
+
+    def test_main_exit_codes(self, rom_dir, tmp_path):
+        report = tmp_path / "report.json"
+        args = [str(rom_dir), "-j", "2", "--cycles", "200000"]
+
+        assert RomHarness.main(args + ["--json", str(report)]) == 1
+        data = json.loads(report.read_text())
+        assert data["summary"] == {PASSED: 1, FAILED: 1, TIMEOUT: 1, LOCKED: 1}
+
+        # Known failures in the baseline do not fail the run
+        assert RomHarness.main(args + ["--baseline", str(report)]) == 0
+
+        # A ROM that passed in the baseline and now fails does
+        (rom_dir / "individual" / "01-special.gb").write_bytes(print_rom(b"Failed\n"))
+        assert RomHarness.main(args + ["--baseline", str(report)]) == 1
+
+    def test_main_no_roms(self, tmp_path):
+        assert RomHarness.main([str(tmp_path)]) == 2
+
+    def test_mooneye_signatures(self, mooneye_dir):
+        results = runSuite(findRoms(str(mooneye_dir)), jobs=2, cycles=100000, mode=MOONEYE)
+        by_name = {r["name"]: r for r in results}
+
+        assert by_name["div_timing"]["status"] == PASSED
+        assert by_name["ei_timing"]["status"] == FAILED
+        assert by_name["ei_timing"]["message"] == "Register signature B=42 C=42 D=42 E=42 H=42 L=42"
+        assert by_name["halt_ime0_ei"]["status"] == TIMEOUT
+
+    def test_main_mooneye(self, mooneye_dir):
+        assert RomHarness.main([str(mooneye_dir / "div_timing.gb"), "--mooneye"]) == 0
+        assert RomHarness.main([str(mooneye_dir / "ei_timing.gb"), "--mooneye"]) == 1
@@ -0,0 +1,222 @@
+import pytest
+
+from conftest import CODE_ADDR, load_code
+from GameBoy import GameBoy
+from PPU import CYCLES_PER_FRAME
+from CPU import Breakpoint
+
+#==========================================
+#           PYTEST FIXTURES
+#==========================================
+
+@pytest.fixture(scope="function")
+def gameboy():
+    return GameBoy()
+
+@pytest.fixture(scope="function")
+def bus(gameboy):
+    return gameboy.bus
+
+@pytest.fixture(scope="function")
+def cpu(gameboy):
+    cpu = gameboy.cpu
+    cpu.Flags.flagReset()
+    return cpu
+
+#==========================================
+#           HELPERS
+#==========================================
+
+# LD A,$3C ; LD B,$05 ; ADD A,B ; SWAP A ; DEC B ; JR NZ,-5 ; JR -2
+PROGRAM = [0x3E, 0x3C, 0x06, 0x05, 0x80, 0xCB, 0x37, 0x05, 0x20, 0xFA, 0x18, 0xFE]
+
+def snapshot(cpu):
+    return (int(cpu.CoreReg.A), int(cpu.Flags.F), int(cpu.CoreWords.BC), int(cpu.CoreWords.DE),
+            int(cpu.CoreWords.HL), int(cpu.CoreWords.SP), int(cpu.CoreWords.PC), cpu.cycles)
+
+#==========================================
+#           RUN LOOP TEST CASES
+#==========================================
+
+class TestRunLoop:
+
+    def test_run_cycles_matches_step(self, cpu):
+        load_code(cpu, PROGRAM)
+        stepped = 0
+        while stepped < 400:
+            stepped += cpu.step()
+        expected = snapshot(cpu)
+
+        cpu.reset()
+        cpu.Flags.flagReset()
+        load_code(cpu, PROGRAM)
+        executed = cpu.run_cycles(400)
+
+        assert executed == stepped
+        assert snapshot(cpu) == expected
+
+    def test_run_cycles_honours_budget(self, cpu):
+        load_code(cpu, [0x18, 0xFE]) # JR -2
+        executed = cpu.run_cycles(1000)
+
+        # Overshoot is bounded by the length of the last instruction
+        assert 1000 <= executed < 1000 + 12
+        assert cpu.CoreWords.PC == CODE_ADDR
+
+    def test_cb_prefix_dispatch(self, cpu):
+        load_code(cpu, [0xCB, 0x37, 0xCB, 0xCF]) # SWAP A ; SET 1,A
+        cpu.CoreReg.A = 0x12
+
+        assert cpu.step() == 8
+        assert cpu.CoreReg.A == 0x21
+        assert cpu.step() == 8
+        assert cpu.CoreReg.A == 0x23
+        assert cpu.CoreWords.PC == CODE_ADDR + 4
+
+    def test_run_frame_stops_at_vblank(self, cpu):
+        ppu = cpu.Bus.ppu
+        ppu.LCDC = 0x91
+        load_code(cpu, [0x18, 0xFE])
+
+        # First frame may start part way through, later frames are exactly one frame long
+        cpu.run_frame()
+        assert ppu.frameCount == 1
+        assert ppu.LY == 144
+
+        executed = cpu.run_frame()
+        assert ppu.frameCount == 2
+        assert abs(executed - CYCLES_PER_FRAME) < 12
+
+    def test_run_frame_with_lcd_off(self, cpu):
+        load_code(cpu, [0x18, 0xFE])
+
+        executed = cpu.run_frame()
+
+        assert cpu.Bus.ppu.frameCount == 0
+        assert CYCLES_PER_FRAME <= executed < CYCLES_PER_FRAME + 12
+
+    def test_ppu_catches_up_on_large_steps(self, cpu):
+        ppu = cpu.Bus.ppu
+        ppu.LCDC = 0x91
+
+        ppu.step(456 * 10 + 100)
+
+        assert ppu.LY == 10
+        assert ppu.cycleCounter == 100
+
+#==========================================
+#           OPCODE TRAP TEST CASES
+#==========================================
+
+# LD B,$03 ; INC C ; LD B,B ; INC D ; JR -5
+TRAP_PROGRAM = [0x06, 0x03, 0x0C, 0x40, 0x14, 0x18, 0xFB]
+
+class TestOpcodeTraps:
+
+    def test_trap_stops_run_before_instruction(self, cpu):
+        load_code(cpu, TRAP_PROGRAM)
+        initial_d = int(cpu.CoreReg.D)
+        hits = []
+        cpu.setTrap(0x40, lambda c: hits.append(int(c.CoreReg.B)) or True)
+
+        executed = cpu.run_cycles(1000)
+
+        assert hits == [3]
+        assert executed == 12
+        assert cpu.CoreWords.PC == CODE_ADDR + 3
+        assert cpu.breakpoint.opCode == 0x40
+        assert cpu.breakpoint.pc == CODE_ADDR + 3
+        assert cpu.CoreReg.D == initial_d
+
+    def test_trap_can_continue(self, cpu):
+        load_code(cpu, TRAP_PROGRAM)
+        hits = []
+        cpu.setTrap(0x40, lambda c: hits.append(int(c.CoreReg.C)) and False)
+
+        cpu.run_cycles(200)
+
+        assert cpu.breakpoint is None
+        assert len(hits) > 1
+        assert hits == [(hits[0] + i) & 0xFF for i in range(len(hits))]
+
+    def test_step_raises_breakpoint(self, cpu):
+        load_code(cpu, TRAP_PROGRAM)
+        cpu.setTrap(0x40, lambda c: True)
+        cpu.step()
+        cpu.step()
+
+        with pytest.raises(Breakpoint):
+            cpu.step()
+
+    def test_clear_trap_restores_table(self, cpu):
+        original = cpu.lr35902_opCodes[0x40]
+        cpu.setTrap(0x40, lambda c: True)
+        cpu.setTrap(0x40, lambda c: False)
+        assert cpu.lr35902_opCodes[0x40] is not original
+
+        cpu.clearTrap(0x40)
+        assert cpu.lr35902_opCodes[0x40] is original
+
+        load_code(cpu, TRAP_PROGRAM)
+        cpu.run_cycles(100)
+        assert cpu.breakpoint is None
+
+    def test_clear_trap_keeps_later_wrappers(self, cpu):
+        original = cpu.lr35902_opCodes[0x40]
+        calls = []
+
+        def counter(entry):
+            func, length, cycles, flags = entry
+
+            def counted(operandAddr):
+                calls.append(operandAddr)
+                return func(operandAddr)
+            return (counted, length, cycles, flags)
+
+        cpu.setTrap(0x40, lambda c: True)
+        handle = cpu.wrapEntry(cpu.lr35902_opCodes, 0x40, counter)
+        cpu.clearTrap(0x40)
+
+        load_code(cpu, TRAP_PROGRAM)
+        cpu.run_cycles(100)
+        assert cpu.breakpoint is None
+        assert calls
+
+        cpu.unwrapEntry(handle)
+        assert cpu.lr35902_opCodes[0x40] is original
+
+#==========================================
+#           ENTRY WRAPPING
+#==========================================
+
+class TestWrapEntry:
+    def test_unwrap_in_any_order(self, cpu):
+        table = {0: "entry"}
+        first = cpu.wrapEntry(table, 0, lambda entry: ("first", entry))
+        second = cpu.wrapEntry(table, 0, lambda entry: ("second", entry))
+        assert table[0] == ("second", ("first", "entry"))
+
+        cpu.unwrapEntry(first)
+        assert table[0] == ("second", "entry")
+        cpu.unwrapEntry(first)
+        assert table[0] == ("second", "entry")
+
+        cpu.unwrapEntry(second)
+        assert table == {0: "entry"}
+
+    def test_shadowed_method_is_deleted_again(self, cpu, bus):
+        readByte = bus.readByte
+        handle = cpu.wrapEntry(bus.__dict__, "readByte", lambda read: lambda addr: 0x42,
+                               default=readByte)
+        assert bus.readByte(0xC000) == 0x42
+
+        cpu.unwrapEntry(handle)
+        assert "readByte" not in bus.__dict__
+
+    def test_replaced_entry_is_left_alone(self, cpu):
+        table = {0: "entry"}
+        handle = cpu.wrapEntry(table, 0, lambda entry: ("wrapped", entry))
+        table[0] = "replaced"
+
+        cpu.unwrapEntry(handle)
+        assert table == {0: "replaced"}
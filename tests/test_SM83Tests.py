@@ -0,0 +1,148 @@
+import json
+
+import pytest
+
+from Bus import FlatBus
+from CPU import CPU
+from SM83Tests import findTestFiles, opcodeName, runCase, runFile, runSuite, expectedWrites, main
+
+#==========================================
+#           HELPERS
+#==========================================
+
+def state(pc, ram, **regs):
+    values = {"a": 0, "f": 0, "b": 0, "c": 0, "d": 0, "e": 0, "h": 0, "l": 0, "sp": 0xFFFE, "ime": 0}
+    values.update(regs)
+    values["pc"] = pc
+    values["ram"] = ram
+    return values
+
+# LD A,d8
+LD_A_D8 = {
+    "name": "3e 0000",
+    "initial": state(0x0100, [[0x0100, 0x3E], [0x0101, 0x12]], a=0x01),
+    "final": state(0x0102, [[0x0100, 0x3E], [0x0101, 0x12]], a=0x12),
+    "cycles": [[0x0100, 0x3E, "r-m"], [0x0101, 0x12, "r-m"]],
+}
+
+# LD (HL),A
+LD_MHL_A = {
+    "name": "77 0000",
+    "initial": state(0x4000, [[0x4000, 0x77], [0xC000, 0x00]], a=0x5A, h=0xC0),
+    "final": state(0x4001, [[0x4000, 0x77], [0xC000, 0x5A]], a=0x5A, h=0xC0),
+    "cycles": [[0x4000, 0x77, "r-m"], [0xC000, 0x5A, "-wm"]],
+}
+
+# PUSH BC: high byte first, with an internal cycle before the writes
+PUSH_BC = {
+    "name": "c5 0000",
+    "initial": state(0x0200, [[0x0200, 0xC5]], b=0x12, c=0x34, sp=0xD000),
+    "final": state(0x0201, [[0x0200, 0xC5], [0xCFFF, 0x12], [0xCFFE, 0x34]], b=0x12, c=0x34, sp=0xCFFE),
+    "cycles": [[0x0200, 0xC5, "r-m"], None, [0xCFFF, 0x12, "-wm"], [0xCFFE, 0x34, "-wm"]],
+}
+
+def with_final(case, **changes):
+    broken = json.loads(json.dumps(case))
+    broken["name"] = case["name"][:2] + " 0001"
+    broken["final"].update(changes)
+    return broken
+
+def write_suite(root, files):
+    root.mkdir(exist_ok=True)
+    for name, cases in files.items():
+        (root / f"{name}.json").write_text(json.dumps(cases))
+    return root
+
+@pytest.fixture(scope="function")
+def cpu():
+    cpu = CPU(FlatBus())
+    cpu.Idioms.enabled = False
+    return cpu
+
+@pytest.fixture(scope="function")
+def suite(tmp_path):
+    return write_suite(tmp_path / "v1", {
+        "3e": [LD_A_D8],
+        "77": [LD_MHL_A],
+        "c5": [PUSH_BC, with_final(PUSH_BC, b=0x99)],
+    })
+
+#==========================================
+#           CASE TEST CASES
+#==========================================
+
+class TestSM83Case:
+
+    @pytest.mark.parametrize("case", [LD_A_D8, LD_MHL_A, PUSH_BC], ids=["LD A,d8", "LD (HL),A", "PUSH BC"])
+    def test_passing_case(self, cpu, case):
+        assert runCase(cpu, case) == []
+
+    def test_register_mismatch(self, cpu):
+        assert runCase(cpu, with_final(LD_A_D8, a=0x13, pc=0x0103)) == ["A 12, expected 13", "PC 0102, expected 0103"]
+
+    def test_ram_mismatch(self, cpu):
+        broken = with_final(LD_MHL_A, ram=[[0xC000, 0x00]])
+        assert runCase(cpu, broken) == ["(C000) 5A, expected 00"]
+
+    def test_cycle_and_write_mismatch(self, cpu):
+        broken = json.loads(json.dumps(LD_MHL_A))
+        broken["cycles"] = [[0x4000, 0x77, "r-m"], None, [0xC001, 0x5A, "-wm"]]
+
+        diffs = runCase(cpu, broken)
+        assert diffs[0] == "8 cycles, expected 12"
+        assert diffs[1].startswith("writes [(49152, 90)]")
+
+    def test_raising_handler(self, cpu):
+        # DAA's handler has no return value
+        case = {"name": "27 0000", "initial": state(0x0100, [[0x0100, 0x27]]),
+                "final": state(0x0101, [[0x0100, 0x27]]), "cycles": [[0x0100, 0x27, "r-m"]]}
+        diffs = runCase(cpu, case)
+        assert len(diffs) == 1 and diffs[0].startswith("raised TypeError")
+
+    def test_expected_writes(self):
+        cycles = [[1, 2, "r-m"], None, [None, None, "---"], [3, 4, "-wm"]]
+        assert expectedWrites(cycles) == [(3, 4)]
+
+#==========================================
+#           SUITE TEST CASES
+#==========================================
+
+class TestSM83Suite:
+
+    def test_find_files(self, suite):
+        assert [opcodeName(path) for path in findTestFiles(suite)] == ["3e", "77", "c5"]
+        assert findTestFiles(suite / "missing") == []
+
+    def test_run_file(self, suite):
+        result = runFile(str(suite / "c5.json"))
+
+        assert (result["opcode"], result["cases"], result["passed"], result["failed"]) == ("c5", 2, 1, 1)
+        assert result["failures"] == [{"name": "c5 0001", "differences": ["B 12, expected 99"]}]
+
+    def test_run_file_limit(self, suite):
+        assert runFile(str(suite / "c5.json"), limit=1)["failed"] == 0
+
+    def test_bad_file(self, tmp_path):
+        path = tmp_path / "00.json"
+        path.write_text("{not json")
+        assert runFile(str(path))["error"].startswith("JSONDecodeError")
+
+    def test_pool_matches_serial(self, suite):
+        paths = findTestFiles(suite)
+        strip = lambda results: [{k: v for k, v in r.items() if k != "seconds"} for r in results]
+        assert strip(runSuite(paths, jobs=2)) == strip(runSuite(paths, jobs=1))
+
+    def test_main(self, suite, tmp_path, capsys):
+        out = tmp_path / "report.json"
+        assert main([str(suite), "--jobs", "1", "--json", str(out)]) == 1
+
+        printed = capsys.readouterr().out
+        assert "FAILED   c5: 1 of 2 cases" in printed
+        assert "4 cases from 3 opcodes" in printed
+        assert len(json.loads(out.read_text())["results"]) == 3
+
+    def test_main_opcode_filter(self, suite):
+        assert main([str(suite), "--jobs", "1", "--opcodes", "3E,77"]) == 0
+
+    def test_main_no_files(self, tmp_path):
+        assert main([str(tmp_path / "missing")]) == 2
@@ -0,0 +1,33 @@
+import pytest
+
+import numpy as np
+
+from Screen import ScreenBuffer
+
+#==========================================
+#           SCREEN BUFFER TEST CASES
+#==========================================
+
+class TestScreenBuffer:
+
+    @pytest.mark.parametrize("scale", [1, 2, 3])
+    def test_scaled_ppm(self, scale):
+        rng = np.random.default_rng(scale)
+        framebuffer = rng.integers(0, 256, size=(144, 160, 3), dtype=np.uint8)
+        screen = ScreenBuffer(scale)
+
+        data = screen.update(framebuffer)
+
+        header = f"P6\n{160 * scale} {144 * scale}\n255\n".encode("ascii")
+        assert bytes(data[:len(header)]) == header
+        pixels = np.frombuffer(bytes(data[len(header):]), dtype=np.uint8).reshape(144 * scale, 160 * scale, 3)
+        expected = framebuffer.repeat(scale, axis=0).repeat(scale, axis=1)
+        np.testing.assert_array_equal(pixels, expected)
+
+    def test_update_reuses_buffer(self):
+        screen = ScreenBuffer(3)
+        first = screen.update(np.zeros((144, 160, 3), dtype=np.uint8))
+        second = screen.update(np.full((144, 160, 3), 0x7F, dtype=np.uint8))
+
+        assert first is second
+        assert screen.pixels[431, 479, 2] == 0x7F
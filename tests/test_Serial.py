@@ -0,0 +1,126 @@
+import pytest
+
+from conftest import make_rom
+from GameBoy import GameBoy
+from Headless import runHeadless
+from Serial import (BufferSink, CallbackSink, FileSink, PatternSink, CYCLES_PER_TRANSFER,
+                    SERIAL_INTERRUPT, IDLE)
+
+#==========================================
+#           HELPERS
+#==========================================
+
+# Prints the zero terminated string at $0200, waiting for each transfer, then loops forever:
+# LD DE,$0200 ; LD HL,$FF01
+# next: LD A,(DE) ; AND A ; JR Z,done ; LD (HL+),A ; LD A,$81 ; LD (HL-),A
+# wait: INC L ; LD A,(HL) ; DEC L ; BIT 7,A ; JR NZ,wait ; INC DE ; JR next
+# done: JR done
+PRINT_PROGRAM = [0x11, 0x00, 0x02, 0x21, 0x01, 0xFF,
+                 0x1A, 0xA7, 0x28, 0x0E, 0x22, 0x3E, 0x81, 0x32,
+                 0x2C, 0x7E, 0x2D, 0xCB, 0x7F, 0x20, 0xF9, 0x13, 0x18, 0xEE,
+                 0x18, 0xFE]
+
+def print_rom(text):
+    return make_rom({0x100: PRINT_PROGRAM, 0x200: text})
+
+@pytest.fixture(scope="function")
+def gameboy():
+    gb = GameBoy()
+    gb.bus.writeByte(0xFF0F, 0x00)
+    return gb
+
+def start_transfer(gb, value):
+    gb.bus.writeByte(0xFF01, value)
+    gb.bus.writeByte(0xFF02, 0x81)
+
+#==========================================
+#           SERIAL TEST CASES
+#==========================================
+
+class TestSerial:
+
+    def test_transfer_timing(self, gameboy):
+        sink = gameboy.serial.addSink(BufferSink())
+        start_transfer(gameboy, 0x41)
+
+        assert int(gameboy.bus.readByte(0xFF02)) == 0xFF
+        gameboy.cpu.cycles += CYCLES_PER_TRANSFER - 4
+        gameboy.cpu.step()
+        assert sink.data == b""
+
+        gameboy.cpu.step()
+        assert sink.data == b"A"
+        assert int(gameboy.bus.readByte(0xFF01)) == 0xFF
+        assert int(gameboy.bus.readByte(0xFF02)) == 0x7F
+        assert gameboy.cpu.InterruptMask.IF & SERIAL_INTERRUPT
+
+    def test_external_clock_never_completes(self, gameboy):
+        sink = gameboy.serial.addSink(BufferSink())
+        gameboy.bus.writeByte(0xFF01, 0x41)
+        gameboy.bus.writeByte(0xFF02, 0x80)
+
+        gameboy.cpu.cycles += 10 * CYCLES_PER_TRANSFER
+        gameboy.cpu.step()
+
+        assert sink.data == b""
+        assert int(gameboy.bus.readByte(0xFF02)) == 0xFE
+
+    def test_reset_cancels_transfer(self, gameboy):
+        start_transfer(gameboy, 0x41)
+        gameboy.reset()
+
+        assert int(gameboy.bus.readByte(0xFF02)) == 0x7E
+        assert gameboy.serial.due == IDLE
+
+    def test_program_output(self):
+        gb = GameBoy(print_rom(b"Hello\n"))
+        buffer = gb.serial.addSink(BufferSink())
+
+        runHeadless(gb, frames=2)
+
+        assert buffer.text() == "Hello\n"
+
+    def test_file_sink(self, tmp_path):
+        gb = GameBoy(print_rom(b"log"))
+        sink = gb.serial.addSink(FileSink(tmp_path / "serial.txt"))
+
+        runHeadless(gb, frames=1)
+        sink.close()
+
+        assert (tmp_path / "serial.txt").read_bytes() == b"log"
+
+    def test_callback_requests_stop(self):
+        gb = GameBoy(print_rom(b"abcdef"))
+        seen = []
+        gb.serial.addSink(CallbackSink(lambda value: seen.append(value) or value == ord("c")))
+
+        result = runHeadless(gb, frames=10)
+
+        assert result.reason == "serial"
+        assert result.frames == 1
+        assert bytes(seen) == b"abc"
+
+    pattern_test_cases = [
+        pytest.param(b"06-ld r,r\n\nPassed\n", "Passed", id="Passed"),
+        pytest.param(b"01-special\n\nFailed #2\n", "Failed", id="Failed"),
+    ]
+
+    @pytest.mark.parametrize("text, expected", pattern_test_cases)
+    def test_pattern_sink_stops_run(self, text, expected):
+        gb = GameBoy(print_rom(text))
+        sink = gb.serial.addSink(PatternSink())
+
+        result = runHeadless(gb, frames=10)
+
+        assert result.reason == "serial"
+        assert sink.matched == expected
+        assert sink.text() == text.decode()
+
+    def test_pattern_sink_no_match(self):
+        gb = GameBoy(print_rom(b"Running...\n"))
+        sink = gb.serial.addSink(PatternSink())
+
+        result = runHeadless(gb, frames=2)
+
+        assert result.reason == "frames"
+        assert sink.matched is None
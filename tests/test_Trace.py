@@ -0,0 +1,207 @@
+import numpy as np
+import pytest
+
+from conftest import make_rom
+from GameBoy import GameBoy
+from OpcodeProfiler import OpcodeProfiler
+from Trace import (TraceRecorder, TRACE_DTYPE, openTrace, formatDoctor, writeDoctorLog, readDoctorLog,
+                   firstDivergence, formatDivergence, main)
+import SDRBoy
+
+#==========================================
+#           HELPERS
+#==========================================
+
+# LD A,$12 ; LD B,$34 ; loop: INC A ; DEC B ; JR NZ,loop ; JR -2
+PROGRAM = [0x3E, 0x12, 0x06, 0x34, 0x3C, 0x05, 0x20, 0xFC, 0x18, 0xFE]
+
+def record(gameboy, count, **kwargs):
+    recorder = TraceRecorder(gameboy.cpu, **kwargs).enable()
+    for _ in range(count):
+        gameboy.step()
+    recorder.disable()
+    return recorder
+
+@pytest.fixture(scope="function")
+def gameboy():
+    return GameBoy(make_rom(PROGRAM))
+
+@pytest.fixture(scope="function")
+def trace_file(tmp_path):
+    path = tmp_path / "run.trace"
+    record(GameBoy(make_rom(PROGRAM)), 100, path=str(path), chunk=8, chunks=2)
+    return path
+
+#==========================================
+#           RECORDER TEST CASES
+#==========================================
+
+class TestTraceRecorder:
+
+    def test_records_state_before_each_instruction(self, gameboy):
+        cpu = gameboy.cpu
+        startCycles = cpu.cycles
+        sp = int(cpu.CoreWords.SP)
+        records = record(gameboy, 5).recent()
+
+        assert records.dtype == TRACE_DTYPE
+        assert list(records["pc"]) == [0x0100, 0x0102, 0x0104, 0x0105, 0x0106]
+        assert list(records["opcode"]) == [0x3E, 0x06, 0x3C, 0x05, 0x20]
+        assert list(records[0]["operands"]) == [0x12, 0x06, 0x34]
+        assert list(records["cycles"]) == [startCycles + c for c in (0, 8, 16, 20, 24)]
+        assert all(records["sp"] == sp)
+        # Registers are those before the instruction ran
+        assert records[2]["a"] == 0x12 and records[2]["b"] == 0x34
+        assert records[3]["a"] == 0x13
+
+    def test_flags(self, gameboy):
+        recorder = TraceRecorder(gameboy.cpu).enable()
+        for _ in range(4):
+            gameboy.step()
+        flags = int(gameboy.cpu.Flags.F)
+        gameboy.step()
+        recorder.disable()
+
+        assert recorder.recent(1)[0]["f"] == flags
+
+    def test_ring_wraps(self, gameboy):
+        recorder = record(gameboy, 21, chunk=4, chunks=2)
+
+        assert recorder.recorded == 21
+        recent = recorder.recent()
+        assert len(recent) == 8
+        # The newest record is the 21st, all in execution order
+        assert np.all(np.diff(recent["cycles"].astype(np.int64)) > 0)
+        assert list(recorder.recent(3)) == list(recent[-3:])
+
+    def test_file_matches_memory(self, trace_file):
+        trace = openTrace(trace_file)
+        reference = record(GameBoy(make_rom(PROGRAM)), 100, chunk=128).recent()
+
+        assert len(trace) == 100
+        np.testing.assert_array_equal(np.asarray(trace), reference)
+
+    def test_disable_restores_table(self, gameboy):
+        opcodes = dict(gameboy.cpu.lr35902_opCodes)
+        record(gameboy, 3)
+        assert all(gameboy.cpu.lr35902_opCodes[op] is opcodes[op] for op in opcodes)
+
+    def test_disable_keeps_later_wrappers(self, gameboy):
+        cpu = gameboy.cpu
+        opcodes = dict(cpu.lr35902_opCodes)
+
+        recorder = TraceRecorder(cpu).enable()
+        profiler = OpcodeProfiler(cpu).enable()
+        recorder.disable()
+        for _ in range(3):
+            gameboy.step()
+
+        assert recorder.recorded == 0
+        assert sum(profiler.counts) == 3
+        profiler.disable()
+        assert all(cpu.lr35902_opCodes[op] is opcodes[op] for op in opcodes)
+
+    def test_run_cycles(self, gameboy, tmp_path):
+        path = tmp_path / "run.trace"
+        recorder = TraceRecorder(gameboy.cpu, str(path), chunk=64).enable()
+        gameboy.run_cycles(5000)
+        recorder.disable()
+
+        assert len(openTrace(path)) == recorder.recorded == gameboy.cpu.instructions
+
+#==========================================
+#           TRACE FILE TEST CASES
+#==========================================
+
+class TestTraceFiles:
+
+    def test_bad_header(self, tmp_path):
+        path = tmp_path / "bad.trace"
+        path.write_bytes(b"not a trace at all")
+        with pytest.raises(ValueError):
+            openTrace(path)
+
+    def test_empty_trace(self, gameboy, tmp_path):
+        path = tmp_path / "empty.trace"
+        record(gameboy, 0, path=str(path))
+        assert len(openTrace(path)) == 0
+
+    def test_doctor_format(self, trace_file):
+        line = formatDoctor(openTrace(trace_file)[0])
+        assert line.startswith("A:")
+        assert line.endswith("SP:FFFE PC:0100 PCMEM:3E,12,06,34")
+
+    def test_doctor_round_trip(self, trace_file, tmp_path):
+        trace = openTrace(trace_file)
+        log = tmp_path / "run.log"
+        writeDoctorLog(trace, log)
+
+        lines = log.read_text().splitlines()
+        assert len(lines) == 100
+        assert lines[1] == formatDoctor(trace[1])
+
+        parsed = readDoctorLog(log)
+        assert all(parsed["cycles"] == 0)
+        for name in TRACE_DTYPE.names[1:]:
+            np.testing.assert_array_equal(parsed[name], trace[name])
+
+#==========================================
+#           DIFF TEST CASES
+#==========================================
+
+class TestTraceDiff:
+
+    def test_identical(self, trace_file):
+        trace = openTrace(trace_file)
+        assert firstDivergence(trace, trace) is None
+
+    def test_divergence(self, trace_file):
+        trace = openTrace(trace_file)
+        other = np.array(trace)
+        other[42]["b"] ^= 0xFF
+
+        assert firstDivergence(trace, other) == 42
+        assert firstDivergence(trace, other, ignore=("b",)) is None
+        report = formatDivergence(trace, other, 42)
+        assert "instruction 42" in report
+        assert "differs in b" in report
+
+    def test_operand_divergence(self, trace_file):
+        trace = openTrace(trace_file)
+        other = np.array(trace)
+        other[7]["operands"][2] += 1
+        assert firstDivergence(trace, other) == 7
+
+    def test_prefix(self, trace_file):
+        trace = openTrace(trace_file)
+        assert firstDivergence(trace, trace[:60]) == 60
+        assert "second trace ends" in formatDivergence(trace, trace[:60], 60)
+
+    def test_main_diff(self, trace_file, tmp_path, capsys):
+        assert main(["diff", str(trace_file), str(trace_file)]) == 0
+        assert "Traces match (100 instructions)" in capsys.readouterr().out
+
+        other = tmp_path / "other.trace"
+        record(GameBoy(make_rom(PROGRAM[:3] + [0x35] + PROGRAM[4:])), 100, path=str(other))
+        assert main(["diff", str(trace_file), str(other)]) == 1
+        # The changed loop count is already visible in the first instruction's PCMEM
+        out = capsys.readouterr().out
+        assert "First divergence at instruction 0" in out
+        assert "differs in operands" in out
+
+    def test_main_diff_doctor_log(self, trace_file, tmp_path):
+        log = tmp_path / "reference.log"
+        assert main(["doctor", str(trace_file), str(log)]) == 0
+        # The log has no cycle counts, they are not compared
+        assert main(["diff", str(trace_file), str(log)]) == 0
+
+    def test_sdrboy_trace(self, tmp_path):
+        rom = tmp_path / "game.gb"
+        rom.write_bytes(make_rom(PROGRAM))
+        out = tmp_path / "run.trace"
+
+        assert SDRBoy.main(["--headless", "--cycles", "2000", "--trace", str(out), str(rom)]) == 0
+
+        trace = openTrace(out)
+        assert len(trace) > 0
+        assert trace[0]["pc"] == 0x0100
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from conftest import make_rom
+from bench.workloads import WORKLOADS, addROMWorkloads
+from bench.__main__ import runWorkload, runBenchmarks, compare, main
+from RomHarness import findRoms
+
+#==========================================
+#           HELPERS
+#==========================================
+
+SCALE = 0.01
+
+def make_report(ns_per_op):
+    return {"results": {name: {"ns_per_op": value} for name, value in ns_per_op.items()}}
+
+#==========================================
+#           BENCHMARK TEST CASES
+#==========================================
+
+class TestBench:
+
+    @pytest.mark.parametrize("name", sorted(WORKLOADS))
+    def test_workload_runs(self, name):
+        result = runWorkload(name, scale=SCALE, repeat=1)
+
+        assert result["ops"] > 0
+        assert result["ns_per_op"] > 0
+        assert result["group"] == name.split(".")[0]
+        if result["group"] in ("cpu", "system"):
+            assert result["mips"] > 0
+        if result["unit"] == "frame":
+            assert result["fps"] > 0
+
+    def test_cpu_mix_executes_instructions(self):
+        # At 4-24 cycles per instruction, 10000 cycles is at least ~400 instructions
+        assert runWorkload("cpu.alu", scale=SCALE, repeat=1)["ops"] >= 400
+
+    def test_compare(self):
+        baseline = make_report({"a": 100.0, "b": 100.0, "gone": 5.0})
+        report = make_report({"a": 120.0, "b": 95.0, "new": 1.0})
+
+        rows = {name: (change, regressed) for name, _, _, change, regressed in compare(report, baseline)}
+
+        assert set(rows) == {"a", "b"}
+        assert rows["a"] == (pytest.approx(0.20), True)
+        assert rows["b"] == (pytest.approx(-0.05), False)
+
+        # Only growth above the threshold is a regression
+        assert [row[4] for row in compare(report, baseline, threshold=0.25)] == [False, False]
+
+    def test_report_filter(self):
+        report = runBenchmarks(["bus.*"], scale=SCALE, repeat=1)
+        assert sorted(report["results"]) == ["bus.read", "bus.write"]
+
+    def test_main_baseline(self, tmp_path):
+        current = tmp_path / "current.json"
+        assert main(["bus.read", "--scale", str(SCALE), "--repeat", "1", "--json", str(current)]) == 0
+        measured = json.loads(current.read_text())["results"]["bus.read"]["ns_per_op"]
+
+        slow = tmp_path / "slow.json"
+        slow.write_text(json.dumps(make_report({"bus.read": measured * 100})))
+        assert main(["bus.read", "--scale", str(SCALE), "--repeat", "1", "--baseline", str(slow)]) == 0
+
+        fast = tmp_path / "fast.json"
+        fast.write_text(json.dumps(make_report({"bus.read": measured / 100})))
+        assert main(["bus.read", "--scale", str(SCALE), "--repeat", "1", "--baseline", str(fast)]) == 1
+
+    def test_rom_workloads(self, tmp_path):
+        # Both suites ship a spin.gb; the workloads are named by the path under the root
+        for suite in ("a", "b"):
+            (tmp_path / suite).mkdir()
+            (tmp_path / suite / "spin.gb").write_bytes(make_rom([0x18, 0xFE])) # JR -2
+
+        addROMWorkloads(findRoms(str(tmp_path)), str(tmp_path))
+        try:
+            assert "rom.a/spin" in WORKLOADS and "rom.b/spin" in WORKLOADS
+            result = runWorkload("rom.a/spin", scale=SCALE, repeat=1)
+        finally:
+            del WORKLOADS["rom.a/spin"], WORKLOADS["rom.b/spin"]
+
+        assert result["ops"] == 1
+        assert result["mips"] > 0
@@ -0,0 +1,34 @@
+import pytest
+
+import numpy as np
+
+from utils import hexDump
+
+#==========================================
+#           HEX DUMP TEST CASES
+#==========================================
+
+def reference_dump(start, data, width=8):
+    lines = []
+    for row in range(0, len(data), width):
+        chunk = data[row:row + width]
+        hex_str = " ".join(f"{b:02X}" for b in chunk)
+        ascii_chars = "".join(chr(b) if 32 <= b <= 126 else "." for b in chunk)
+        lines.append(f"{(start + row) & 0xFFFF:04X}  {hex_str:<{width * 3 - 1}}  {ascii_chars}")
+    return "\n".join(lines)
+
+class TestHexDump:
+
+    @pytest.mark.parametrize("start, length", [(0xC000, 64), (0xFFF8, 11), (0x0000, 256), (0x1234, 1)])
+    def test_matches_reference(self, start, length):
+        data = np.random.default_rng(length).integers(0, 256, size=length, dtype=np.uint8)
+
+        assert hexDump(start, data) == reference_dump(start, data)
+
+    def test_width(self):
+        data = np.frombuffer(b"ABCDEFGHIJKLMNOP", dtype=np.uint8)
+
+        assert hexDump(0x8000, data, width=16) == reference_dump(0x8000, data, width=16)
+
+    def test_empty(self):
+        assert hexDump(0, np.zeros(0, dtype=np.uint8)) == ""
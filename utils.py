@@ -1,6 +1,62 @@
 import inspect
+import numpy as np
 
 def print_function():
     caller_frame = inspect.currentframe().f_back
     function_name = caller_frame.f_code.co_name
-    print(f'\n{function_name}\n')
\ No newline at end of file
+    print(f'\n{function_name}\n')
+
+# Execution starts here after the boot ROM
+ENTRY_POINT = 0x0100
+
+def makeROM(code, size=0x8000):
+    """
+    A ROM of `size` bytes holding code: a list of bytes placed at $0100, or a dict
+    mapping addresses to lists of bytes. Everything else is zero (NOP).
+    """
+    if not isinstance(code, dict):
+        code = {ENTRY_POINT: code}
+    rom = bytearray(size)
+    for addr, program in code.items():
+        rom[addr:addr + len(program)] = bytes(program)
+    return bytes(rom)
+
+HEX_DIGITS = np.frombuffer(b"0123456789ABCDEF", dtype=np.uint8)
+
+def hexDump(start, data, width=8):
+    """
+    Formats data as lines of "AAAA  HH HH ..  ascii", width bytes per line.
+    The whole dump is built as one character array, there is no per byte Python work.
+    """
+    data = np.asarray(data, dtype=np.uint8)
+    rows = -(-len(data) // width)
+    if rows == 0:
+        return ""
+
+    padded = np.zeros(rows * width, dtype=np.uint8)
+    padded[:len(data)] = data
+    padded = padded.reshape(rows, width)
+    valid = (np.arange(rows * width) < len(data)).reshape(rows, width)
+
+    hexWidth = width * 3 - 1
+    asciiStart = 4 + 2 + hexWidth + 2
+    chars = np.full((rows, asciiStart + width + 1), ord(" "), dtype=np.uint8)
+    chars[:, -1] = ord("\n")
+
+    # Address column
+    addrs = (start + np.arange(rows) * width) & 0xFFFF
+    for i, shift in enumerate((12, 8, 4, 0)):
+        chars[:, i] = HEX_DIGITS[(addrs >> shift) & 0xF]
+
+    # Hex column: two digits per byte, separated by spaces
+    hexCols = 6 + np.arange(width) * 3
+    chars[:, hexCols] = np.where(valid, HEX_DIGITS[padded >> 4], ord(" "))
+    chars[:, hexCols + 1] = np.where(valid, HEX_DIGITS[padded & 0xF], ord(" "))
+
+    # ASCII column, non-printable bytes shown as '.'
+    printable = (padded >= 32) & (padded <= 126)
+    chars[:, asciiStart:asciiStart + width] = np.where(valid, np.where(printable, padded, ord(".")), ord(" "))
+
+    lines = chars.tobytes().decode("ascii").split("\n")[:-1]
+    lines[-1] = lines[-1].rstrip()
+    return "\n".join(lines)